@@ -0,0 +1,105 @@
+"""Core client benchmarks.
+
+Covers client startup (WSDL load and fix-up), cloning a warmed up client,
+single call latency, bulk fetch throughput, edit/save round trips and the
+polymorphic array encoding done by :py:func:`testtrackpro._polymprphic_cast`.
+"""
+import harness
+
+
+def bench_startup(server, options):
+    def startup(i):
+        ttp = harness.connect(server)
+        ttp.DatabaseLogoff()
+    return harness.measure('client startup + logon', startup,
+                           max(options.number // 10, 5))
+
+
+def bench_clone(server, options):
+    ttp = harness.connect(server)
+    ttp.warm_up()
+    try:
+        def clone_and_call(i):
+            ttp.clone().getDefect(i % options.defects + 1)
+        return harness.measure('warm clone + first getDefect', clone_and_call,
+                               options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def bench_single_call(server, options):
+    ttp = harness.connect(server)
+    try:
+        return harness.measure(
+            'getDefect', lambda i: ttp.getDefect(i % options.defects + 1),
+            options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def bench_bulk_fetch(server, options):
+    ttp = harness.connect(server)
+    try:
+        def fetch_all(i):
+            for record in ttp.getRecordListForTable('Defect', '', []).records:
+                ttp.getDefectByRecordID(record.recordid)
+        return harness.measure('bulk fetch (all defects)', fetch_all, 1,
+                               items=options.defects)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def bench_edit_round_trip(server, options):
+    ttp = harness.connect(server)
+    try:
+        def edit(i):
+            with ttp.editDefect(i % options.defects + 1) as defect:
+                defect.summary = 'benchmark edit %d' % i
+        return harness.measure('editDefect/saveDefect', edit, options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def bench_polymorphic_encoding(server, options):
+    ttp = harness.connect(server)
+    try:
+        defect = ttp.getDefect(1)
+        fields = []
+        for i in xrange(50):
+            for kind, value in (('CStringField', 'text'),
+                                ('CIntegerField', i),
+                                ('CBooleanField', True),
+                                ('CDropdownField', 'Windows')):
+                field = ttp.create(kind)
+                field.name = '%s %d' % (kind, i)
+                field.recordid = 0
+                field.value = value
+                fields.append(field)
+        defect.customFieldvalues = fields
+        method = ttp._client.service.saveDefect.method
+        binding = method.binding.input
+        return harness.measure(
+            'encode saveDefect (200 fields)',
+            lambda i: binding.get_message(method, (ttp._cookie, defect), {}),
+            options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def main():
+    parser = harness.option_parser()
+    options, args = parser.parse_args()
+    with harness.stub_server(options.latency,
+                             defects=options.defects) as server:
+        results = [
+            bench_startup(server, options),
+            bench_clone(server, options),
+            bench_single_call(server, options),
+            bench_bulk_fetch(server, options),
+            bench_edit_round_trip(server, options),
+            bench_polymorphic_encoding(server, options),
+        ]
+    harness.report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Entity creation benchmarks.
+
+Compares building entities with the `suds`_ factory, which builds each one
+from the schema, against :py:meth:`testtrackpro.TTP.create` and
+:py:meth:`testtrackpro.TTP.create_many`, which copy a prototype built once.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import harness
+
+TYPES = ('CDefect', 'CTestCase', 'CTableColumn', 'CStringField')
+
+
+def main():
+    parser = harness.option_parser()
+    options, args = parser.parse_args()
+    results = []
+    with harness.stub_server(options.latency, defects=0) as server:
+        ttp = harness.connect(server)
+        try:
+            factory = ttp._client.factory
+            for name in TYPES:
+                results.append(harness.measure(
+                    'suds factory %s' % name,
+                    lambda i: factory.create(name), options.number))
+                results.append(harness.measure(
+                    'TTP.create %s' % name,
+                    lambda i: ttp.create(name), options.number))
+            results.append(harness.measure(
+                'TTP.create_many CDefect x100',
+                lambda i: ttp.create_many('CDefect', 100, recordid=0),
+                max(options.number // 100, 1), items=100))
+        finally:
+            ttp.DatabaseLogoff()
+    harness.report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Bulk fetch decoding benchmarks.
+
+Compares decoding replies into :py:func:`testtrackpro.entity_to_dict` data
+with `suds`_ in the fetching threads against
+:py:func:`testtrackpro.decode.fetch_dicts`, which decodes the reply XML in a
+pool of processes. Also times decoding a single reply both ways, without
+the network.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import harness
+
+import testtrackpro
+from testtrackpro.decode import decode_reply, fetch_dicts, type_table
+from testtrackpro.pool import TTPWorkerPool
+
+
+def main():
+    parser = harness.option_parser()
+    parser.add_option('--workers', type='int', default=4,
+                      help="parallel fetches [default: %default]")
+    parser.add_option('--processes', type='int', default=2,
+                      help="decoding processes [default: %default]")
+    options, args = parser.parse_args()
+    results = []
+    with harness.stub_server(options.latency,
+                             defects=options.defects) as server:
+        ttp = harness.connect(server)
+        try:
+            recordids = [r for r, row in ttp.record_list('Defect')]
+
+            raw = ttp.clone()
+            raw._client.set_options(retxml=True)
+            reply = raw.getDefectByRecordID(recordids[0])
+            method = ttp._client.service.getDefectByRecordID.method
+            binding = method.binding.output
+            types = type_table(ttp)
+            results.append(harness.measure(
+                'decode reply, suds', lambda i: testtrackpro.entity_to_dict(
+                    binding.get_reply(method, reply)), options.number))
+            results.append(harness.measure(
+                'decode reply, decode_reply',
+                lambda i: decode_reply(reply, types), options.number))
+
+            fetch = lambda client, recordid: testtrackpro.entity_to_dict(
+                client.getDefectByRecordID(recordid))
+            results.append(harness.measure(
+                'bulk fetch, threads', lambda i: list(
+                    TTPWorkerPool(ttp, options.workers).imap_unordered(
+                        fetch, recordids)), 1, items=len(recordids)))
+            results.append(harness.measure(
+                'bulk fetch, %d processes' % options.processes,
+                lambda i: list(fetch_dicts(
+                    ttp, 'getDefectByRecordID', recordids, options.workers,
+                    options.processes)), 1, items=len(recordids)))
+        finally:
+            ttp.DatabaseLogoff()
+    harness.report(results)
+
+if __name__ == '__main__':
+    main()
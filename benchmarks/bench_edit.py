@@ -0,0 +1,51 @@
+"""Edit context benchmarks.
+
+Runs ``with ttp.editDefect(n) as defect:`` edit/save cycles against the
+stand-in server, 10,000 of them by default, and separately measures the
+client side cost of setting up the edit context entity, without any network
+traffic, so changes to the context machinery show up clearly.
+"""
+import harness
+
+
+def bench_edit_cycles(server, options):
+    ttp = harness.connect(server)
+    try:
+        def edit(i):
+            with ttp.editDefect(i % options.defects + 1) as defect:
+                defect.summary = 'benchmark edit %d' % i
+        return harness.measure('editDefect/saveDefect cycle', edit,
+                               options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def bench_context_setup(server, options):
+    ttp = harness.connect(server)
+    try:
+        entity = ttp.getDefect(1)
+        ## stands in for the server call, so only the context work is timed
+        edit = lambda cookie, number, attachments: entity
+        build = ttp.editDefect.func
+        def setup(i):
+            build(ttp, 'editDefect', edit, i, False)
+        return harness.measure('edit context setup (no network)', setup,
+                               options.number)
+    finally:
+        ttp.DatabaseLogoff()
+
+
+def main():
+    parser = harness.option_parser()
+    parser.set_defaults(number=10000)
+    options, args = parser.parse_args()
+    with harness.stub_server(options.latency,
+                             defects=options.defects) as server:
+        results = [
+            bench_context_setup(server, options),
+            bench_edit_cycles(server, options),
+        ]
+    harness.report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Hedged read benchmarks.
+
+Times ``getDefect`` calls against a server with a latency tail, where a
+share of the calls are many times slower than the rest, with and without a
+:py:class:`testtrackpro.hedge.TTPHedger`. The hedger warms up with a round
+of calls first, so its delay is known when timing starts.
+"""
+import harness
+
+from testtrackpro.hedge import TTPHedger
+from testtrackpro.stub import TTPStubServer
+
+
+def main():
+    parser = harness.option_parser()
+    parser.set_defaults(latency=0.02, number=200)
+    parser.add_option('--slow-calls', type='float', default=0.05,
+                      help="share of slow calls [default: %default]")
+    parser.add_option('--slow-latency', type='float', default=0.5,
+                      help="latency of slow calls [default: %default]")
+    parser.add_option('--percentile', type='float', default=0.9,
+                      help="hedge after this percentile of the latencies "
+                           "[default: %default]")
+    parser.add_option('--budget', type='float', default=0.1,
+                      help="share of calls which may be hedged "
+                           "[default: %default]")
+    options, args = parser.parse_args()
+    server = TTPStubServer(latency=options.latency,
+                           slow_calls=options.slow_calls,
+                           slow_latency=options.slow_latency)
+    server.populate(defects=options.defects)
+    results = []
+    with server:
+        ttp = harness.connect(server)
+        hedger = TTPHedger(percentile=options.percentile,
+                           budget=options.budget)
+        hedged = harness.connect(server, hedge=hedger)
+        try:
+            get = lambda client: lambda i: client.getDefect(
+                i % options.defects + 1)
+            results.append(harness.measure('getDefect', get(ttp),
+                                           options.number))
+            for i in xrange(50):
+                hedged.getDefect(i % options.defects + 1)
+            results.append(harness.measure('getDefect, hedged', get(hedged),
+                                           options.number))
+        finally:
+            ttp.DatabaseLogoff()
+            hedged.DatabaseLogoff()
+    harness.report(results)
+    print hedger.stats()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Import time benchmarks.
+
+Every run starts a fresh interpreter, as short lived hook scripts do.
+``import testtrackpro`` does not import `suds`_, which is only loaded when
+the first :py:class:`testtrackpro.TTP` is created, so scripts which only
+use helper functions like :py:func:`testtrackpro.edit_lock_failed` start
+much faster. The first client benchmark shows the cost is moved to the
+first client, not removed, and the last one the first client started from a
+:py:mod:`testtrackpro.schema` bundle.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import harness
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    def start(i):
+        subprocess.check_call([sys.executable, '-c', code], cwd=_root)
+    return start
+
+
+def main():
+    parser = harness.option_parser()
+    parser.set_defaults(number=20)
+    options, args = parser.parse_args()
+    results = [
+        harness.measure('python startup', run('pass'), options.number),
+        harness.measure('import suds.client', run('import suds.client'),
+                        options.number),
+        harness.measure('import testtrackpro',
+                        run('import testtrackpro'), options.number),
+        harness.measure('import + helper', run(
+            'import testtrackpro\n'
+            'testtrackpro.is_edit_context_entity(None)\n'
+            'testtrackpro.table_display_name("TestCase")'), options.number),
+    ]
+    with harness.stub_server(options.latency, defects=1) as server:
+        results.append(harness.measure('import + first client', run(
+            'import testtrackpro\n'
+            'testtrackpro.TTP(%r)' % server.url), options.number))
+        directory = tempfile.mkdtemp()
+        try:
+            code = ('import testtrackpro\n'
+                    'testtrackpro.TTP(%r, schema_bundle=%r)' % (
+                        server.url, os.path.join(directory, 'ttp.schema')))
+            run(code)(0)
+            results.append(harness.measure(
+                'import + first client, bundle', run(code), options.number))
+        finally:
+            shutil.rmtree(directory)
+    harness.report(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Replay benchmark and profiler.
+
+Replays a recorded session with :py:class:`testtrackpro.transport.TTPReplayTransport`
+so the encode and decode paths can be timed and profiled without any network
+or server. When the archive does not exist a session is first recorded against
+the stand-in server; an archive recorded against a real server can be used
+instead, as long as the workload matches the recording.
+
+    python benchmarks/bench_replay.py session.ttr.gz --profile
+"""
+import cProfile
+import os
+import pstats
+
+import harness
+import testtrackpro
+from testtrackpro.transport import TTPRecordingTransport, TTPReplayTransport
+
+
+def workload(ttp, options):
+    """Deterministic mix of calls; must be identical on record and replay.
+    """
+    ttp.getTableList()
+    ttp.getColumnsForTable('Defect')
+    records = ttp.getRecordListForTable('Defect', '', []).records
+    for record in records[:options.number]:
+        ttp.getDefectByRecordID(record.recordid)
+    for number in xrange(1, min(options.number, len(records)) // 4 + 1):
+        with ttp.editDefect(number) as defect:
+            defect.summary = 'replay edit %d' % number
+
+
+def record(path, options):
+    with harness.stub_server(options.latency,
+                             defects=options.defects) as server:
+        with TTPRecordingTransport(path) as transport:
+            with harness.connect(server, transport=transport) as ttp:
+                workload(ttp, options)
+        return server.url
+
+
+def replay(path, url, options):
+    transport = TTPReplayTransport(path, realtime=options.realtime)
+    with testtrackpro.TTP(url, harness.PROJECT, harness.USERNAME,
+                          harness.PASSWORD, transport=transport) as ttp:
+        workload(ttp, options)
+    return transport
+
+
+def main():
+    parser = harness.option_parser(usage="%prog [options] archive")
+    parser.add_option('--url', default=None,
+                      help="server url used when the archive was recorded "
+                           "[default: from the archive]")
+    parser.add_option('--realtime', action='store_true', default=False,
+                      help="replay with the recorded timings")
+    parser.add_option('--profile', action='store_true', default=False,
+                      help="print a CPU profile of one replay")
+    parser.add_option('--repeat', type='int', default=5,
+                      help="number of timed replays [default: %default]")
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error("an archive path is required")
+    path = args[0]
+    url = options.url
+    if not os.path.exists(path):
+        url = record(path, options)
+    if not url:
+        url = TTPReplayTransport(path).wsdl_url
+
+    results = [harness.measure('replay session',
+                               lambda i: replay(path, url, options),
+                               options.repeat)]
+    harness.report(results)
+    if options.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(replay, path, url, options)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+if __name__ == '__main__':
+    main()
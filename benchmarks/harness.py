@@ -0,0 +1,112 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks run against :py:class:`testtrackpro.stub.TTPStubServer`, so
+no TestTrack server or license is required. Run them from the top of the
+source tree, for example::
+
+    python benchmarks/bench_client.py --latency=0.02
+"""
+import contextlib
+import optparse
+import os
+import sys
+import time
+
+## allow running from a source checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+PROJECT = 'Stub Project'
+USERNAME = 'bench'
+PASSWORD = 'bench'
+
+
+def option_parser(usage=None):
+    """Option parser with the options common to all benchmarks.
+    """
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('--latency', type='float', default=0.0,
+                      help="artificial server latency per call in seconds "
+                           "[default: %default]")
+    parser.add_option('--defects', type='int', default=200,
+                      help="number of defects on the server [default: %default]")
+    parser.add_option('--number', type='int', default=100,
+                      help="iterations per benchmark [default: %default]")
+    return parser
+
+
+@contextlib.contextmanager
+def stub_server(latency=0.0, **populate):
+    """Start a populated stand-in server for the duration of the block.
+    """
+    server = TTPStubServer(latency=latency)
+    server.populate(**populate)
+    with server:
+        yield server
+
+
+def connect(server, **kwdargs):
+    """Logged in :py:class:`testtrackpro.TTP` client for the stub server.
+    """
+    return testtrackpro.TTP(server.url, PROJECT, USERNAME, PASSWORD, **kwdargs)
+
+
+class Result(object):
+    """Timings for a single benchmark.
+    """
+    def __init__(self, name, times, items=1):
+        self.name = name
+        self.times = sorted(times)
+        self.items = items
+
+    @property
+    def total(self):
+        return sum(self.times)
+
+    def percentile(self, pct):
+        index = int(round((len(self.times) - 1) * pct / 100.0))
+        return self.times[index]
+
+    @property
+    def rate(self):
+        if not self.total:
+            return float('inf')
+        return len(self.times) * self.items / self.total
+
+    def row(self):
+        return '%-32s %7d %10.3f %10.3f %10.3f %10.3f %12.1f' % (
+            self.name, len(self.times), self.total,
+            self.percentile(0) * 1000, self.percentile(50) * 1000,
+            self.percentile(95) * 1000, self.rate)
+
+
+def measure(name, func, number, items=1, setup=None):
+    """Call ``func`` ``number`` times, timing each call individually.
+
+    :param str name: Benchmark name used in the report.
+    :param callable func: Function to time, called with the iteration index.
+    :param int number: Number of timed iterations.
+    :param int items: Items processed per call, for the rate column.
+    :param callable setup: Optional untimed call made before each iteration.
+    """
+    times = []
+    timer = time.time
+    for i in xrange(number):
+        if setup:
+            setup(i)
+        start = timer()
+        func(i)
+        times.append(timer() - start)
+    return Result(name, times, items)
+
+
+def report(results, out=sys.stdout):
+    """Print a table of benchmark results.
+    """
+    out.write('%-32s %7s %10s %10s %10s %10s %12s\n' % (
+        'benchmark', 'n', 'total s', 'min ms', 'p50 ms', 'p95 ms', 'items/s'))
+    out.write('-' * 97 + '\n')
+    for result in results:
+        out.write(result.row() + '\n')
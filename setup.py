@@ -9,7 +9,8 @@ setup(
     author="Doug Napoleone",
     author_email="doug.napoleone+testtrackpro@gmail.com",
     license="BSD",
-    py_modules=['testtrackpro'],
+    packages=['testtrackpro'],
+    package_data={'testtrackpro': ['ttsoapcgi.wsdl']},
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Programming Language :: Python",
@@ -0,0 +1,60 @@
+"""Only calls which get no answer from the server open the circuit."""
+import socket
+import unittest
+
+import testtrackpro
+from testtrackpro.breaker import TTPCircuitBreaker
+from testtrackpro.stub import TTPStubServer
+
+
+def raising(error):
+    def call():
+        raise error
+    return call
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def test_local_errors_do_not_open_the_circuit(self):
+        breaker = TTPCircuitBreaker(failures=2)
+        for count in xrange(5):
+            self.assertRaises(TypeError, breaker.call,
+                              raising(TypeError('bad argument')))
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        self.assertEqual(breaker.stats()['errors'], 0)
+
+    def test_transport_errors_open_the_circuit(self):
+        breaker = TTPCircuitBreaker(failures=2)
+        self.assertRaises(socket.error, breaker.call,
+                          raising(socket.timeout('timed out')))
+        ## suds raises HTTP errors as the status and reason
+        self.assertRaises(Exception, breaker.call,
+                          raising(Exception((503, 'Service Unavailable'))))
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertRaises(testtrackpro.TTPConnectionError, breaker.call,
+                          lambda: None)
+
+    def test_local_error_in_a_trial_leaves_the_circuit_half_open(self):
+        breaker = TTPCircuitBreaker(failures=1, reset_timeout=0)
+        self.assertRaises(socket.error, breaker.call,
+                          raising(socket.error('refused')))
+        self.assertRaises(ValueError, breaker.call,
+                          raising(ValueError('bad value')))
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        breaker.call(lambda: None)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_stopped_server_opens_the_circuit(self):
+        server = TTPStubServer()
+        server.start()
+        breaker = TTPCircuitBreaker(failures=2, reset_timeout=3600)
+        ttp = testtrackpro.TTP(server.url, 'Stub Project', 'user', 'pass',
+                               breaker=breaker)
+        server.stop()
+        for count in xrange(2):
+            self.assertRaises(testtrackpro.TTPConnectionError,
+                              ttp.getDefect, 1)
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+if __name__ == '__main__':
+    unittest.main()
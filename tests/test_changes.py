@@ -0,0 +1,62 @@
+"""Watches fetch only changed records, and see errors of their poller."""
+import logging
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro import changes
+from testtrackpro.stub import TTPStubServer
+
+
+class WatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=50)
+        self.server.start()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+
+    def test_baseline_fetches_no_entities(self):
+        poller = changes._Poller(None, self.ttp, 'Defect', None,
+                                 'Date Modified', 2)
+        published = []
+        poller.publish = published.append
+        self.server.reset_counters()
+        self.assertFalse(poller.poll())
+        self.assertEqual(self.server.calls.keys(), ['getRecordListForTable'])
+
+        self.server.modify_record('Defect', 7, summary='Changed')
+        self.server.reset_counters()
+        self.assertTrue(poller.poll())
+        self.assertEqual(self.server.calls.get('getDefectByRecordID'), 1)
+        self.assertEqual([(c.kind, c.number) for c in published],
+                         [(changes.TTPChange.MODIFIED, 7)])
+
+        ## the second change of a record has field level differences. The
+        ## modified column is in whole seconds.
+        time.sleep(1.1)
+        self.server.modify_record('Defect', 7, summary='Changed again')
+        poller.poll()
+        self.assertEqual(published[-1].changes,
+                         [('summary', 'Changed', 'Changed again')])
+
+    def test_poller_errors_reach_watches(self):
+        def broken(poller):
+            raise ValueError('broken poll')
+        poll = changes._Poller.poll
+        changes._Poller.poll = broken
+        logging.disable(logging.ERROR)
+        try:
+            watch = self.ttp.watch('Defect', interval=0.05, timeout=5)
+            self.assertRaises(ValueError, watch.next)
+        finally:
+            logging.disable(logging.NOTSET)
+            changes._Poller.poll = poll
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Clones used from many threads at once must each get their own replies."""
+import threading
+import unittest
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+from testtrackpro.stub import TTPStubServer
+
+
+class CloneTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TTPStubServer()
+        cls.server.populate(defects=300)
+        cls.server.start()
+        cls.ttp = testtrackpro.TTP(cls.server.url, 'Stub Project', 'user',
+                                   'pass')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ttp.DatabaseLogoff()
+        cls.server.stop()
+
+    def test_pool_records_match_keys(self):
+        numbers = range(1, 301)
+        results = TTPWorkerPool(self.ttp, 8).imap_unordered(
+            lambda client, number: client.getDefect(number), numbers)
+        seen = []
+        for number, defect, error in results:
+            self.assertIsNone(error)
+            self.assertEqual(defect.defectnumber, number)
+            seen.append(number)
+        self.assertEqual(sorted(seen), numbers)
+
+    def test_clone_threads_records_match_keys(self):
+        wrong = []
+
+        def fetch(client, start):
+            for number in xrange(start, 301, 8):
+                defect = client.getDefectByRecordID(number)
+                if defect.recordid != number:
+                    wrong.append((number, defect.recordid))
+
+        threads = [threading.Thread(target=fetch,
+                                    args=(self.ttp.clone(), start))
+                   for start in xrange(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(wrong, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""Only calls which get no answer from the server cut the limit."""
+import socket
+import unittest
+
+from testtrackpro.concurrency import TTPAdaptiveLimiter
+
+
+def raising(error):
+    def call():
+        raise error
+    return call
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+
+    def test_local_errors_keep_the_limit(self):
+        limiter = TTPAdaptiveLimiter(initial=8)
+        for count in xrange(5):
+            self.assertRaises(TypeError, limiter.call,
+                              raising(TypeError('bad argument')))
+        stats = limiter.stats()
+        self.assertEqual((stats['limit'], stats['errors'],
+                          stats['decreases']), (8, 0, 0))
+        ## and do not count as the fastest call there is
+        self.assertEqual(limiter.baseline, None)
+
+    def test_transport_errors_cut_the_limit(self):
+        limiter = TTPAdaptiveLimiter(initial=8)
+        self.assertRaises(socket.timeout, limiter.call,
+                          raising(socket.timeout('timed out')))
+        stats = limiter.stats()
+        self.assertEqual((stats['limit'], stats['errors'], stats['inflight']),
+                         (4, 1, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Created entities are copies of one prototype per type."""
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+
+class CreateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.start()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+
+    def test_matches_the_suds_factory(self):
+        self.ttp.create('CDefect')
+        self.assertEqual(
+            testtrackpro.entity_to_dict(self.ttp.create('CDefect')),
+            testtrackpro.entity_to_dict(
+                self.ttp._client.factory.create('CDefect')))
+        defect = self.ttp.create('CDefect')
+        self.assertEqual((defect.recordid, defect.defectnumber), (None, None))
+
+    def test_copies_are_independent(self):
+        first = self.ttp.create('CDefect', recordid=0, summary='first')
+        second = self.ttp.create('CDefect')
+        second.summary = 'second'
+        self.assertEqual((first.recordid, first.summary), (0, 'first'))
+        self.assertEqual((second.recordid, second.summary), (None, 'second'))
+        self.assertEqual(self.ttp.create('CDefect').summary, None)
+
+    def test_create_many(self):
+        defects = self.ttp.create_many('CDefect', 3, recordid=0,
+                                       product='Product')
+        defects[0].product = 'Other'
+        self.assertEqual([(d.recordid, d.product) for d in defects],
+                         [(0, 'Other'), (0, 'Product'), (0, 'Product')])
+
+    def test_new_defect_is_added(self):
+        defect = self.ttp.create('CDefect', recordid=0, summary='New defect')
+        number = self.ttp.addDefect(defect)
+        self.assertEqual(self.ttp.getDefect(number).summary, 'New defect')
+
+if __name__ == '__main__':
+    unittest.main()
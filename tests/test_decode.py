@@ -0,0 +1,55 @@
+"""Process side decoding matches suds, multi-references included."""
+import unittest
+
+import testtrackpro
+from testtrackpro import decode
+from testtrackpro.stub import TTPStubServer
+
+
+def multiref(reply):
+    """The reply with the event list and the entity moved out of the
+    response into multi-referenced elements, like some SOAP servers send.
+    The text is edited, as namespace prefixes are used in attribute values.
+    """
+    for tag, id in (('eventlist', 'id0'), ('pDefect', 'id1')):
+        start = reply.index('<%s ' % tag)
+        end = reply.index('</%s>' % tag, start) + len(tag) + 3
+        element = reply[start:end]
+        reply = reply[:start] + '<%s href="#%s"/>' % (tag, id) + reply[end:]
+        reply = reply.replace('</SOAP-ENV:Body>', '<multiRef id="%s" %s'
+                              '</multiRef></SOAP-ENV:Body>' % (
+                                  id, element[len(tag) + 2:-len(tag) - 3]))
+    return reply
+
+
+class DecodeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=3)
+        self.server.start()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+
+    def test_multiref_reply(self):
+        raw = self.ttp.clone()
+        raw._client.set_options(retxml=True)
+        reply = raw.getDefect(2)
+        referenced = multiref(reply)
+        self.assertTrue('<eventlist href="#id0"/>' in referenced)
+
+        types = decode.type_table(self.ttp)
+        data = decode.decode_reply(referenced, types)
+        self.assertEqual(data, decode.decode_reply(reply, types))
+        self.assertEqual(len(data['eventlist']), 2)
+        ## and the same as suds makes of it
+        entity = self.ttp._client.service.getDefect(
+            __inject={'reply': referenced})
+        self.assertEqual(data, testtrackpro.entity_to_dict(entity))
+
+if __name__ == '__main__':
+    unittest.main()
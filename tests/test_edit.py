@@ -0,0 +1,83 @@
+"""Edit contexts save on success, and release the lock on errors."""
+import logging
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+
+class EditContextTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=3, testcases=2)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.ttp = self.session()
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def session(self):
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass')
+        self.addCleanup(ttp.DatabaseLogoff)
+        return ttp
+
+    def summary(self, table='Defect', number=1):
+        return self.server.get_record(table, number)['summary']
+
+    def test_saves_on_exit(self):
+        with self.ttp.editDefect(1) as defect:
+            defect.summary = 'Saved'
+        self.assertTrue(testtrackpro.was_saved(defect))
+        self.assertFalse(testtrackpro.have_edit_lock(defect))
+        self.assertEqual(self.summary(), 'Saved')
+
+        recordid = self.server.get_record('TestCase', 2)['recordid']
+        with self.ttp.editTestCaseByRecordID(recordid) as testcase:
+            testcase.summary = 'By record id'
+        self.assertEqual(self.summary('TestCase', 2), 'By record id')
+
+    def test_one_class_per_table(self):
+        first = testtrackpro._get_context(self.ttp.editDefect(1))
+        self.ttp.cancelSave(first.entity)
+        second = testtrackpro._get_context(self.ttp.editDefectByRecordID(
+            first.entity.recordid))
+        self.ttp.cancelSave(second.entity)
+        self.assertTrue(type(first) is type(second))
+        self.assertEqual((first.table, first.cname), ('Defect', 'CDefect'))
+
+    def test_errors_cancel(self):
+        original = self.summary()
+        try:
+            with self.ttp.editDefect(1) as defect:
+                defect.summary = 'Not saved'
+                raise RuntimeError('stop')
+        except RuntimeError:
+            pass
+        self.assertTrue(testtrackpro.has_errored(defect))
+        self.assertFalse(testtrackpro.was_saved(defect))
+        self.assertEqual(self.summary(), original)
+        ## the lock was released
+        with self.session().editDefect(1):
+            pass
+
+    def test_ignored_lock_error(self):
+        other = self.session()
+        with self.ttp.editDefect(2):
+            with other.editDefect(2, ignoreEditLockError=True) as defect:
+                testtrackpro.break_context_on_edit_lock_failure(defect)
+                self.fail('edited a locked record')
+            self.assertTrue(testtrackpro.edit_lock_failed(defect))
+
+    def test_clones_save_their_edits(self):
+        clone = self.ttp.clone()
+        self.server.reset_counters()
+        with clone.editDefect(3) as defect:
+            defect.summary = 'From a clone'
+        self.assertEqual(self.summary(number=3), 'From a clone')
+        self.assertEqual(self.server.calls, {'editDefect': 1,
+                                             'saveDefect': 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Exports resume from their checkpoint, and go on past missing records."""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import testtrackpro
+from testtrackpro.export import export
+from testtrackpro.stub import TTPStubServer
+
+
+class ExportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=20)
+        self.server.start()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'defects.jsonl')
+        self.checkpoint = os.path.join(self.directory, 'defects.ckpt')
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def numbers(self):
+        with open(self.output) as output:
+            return sorted(json.loads(line)['defectnumber'] for line in output)
+
+    def export(self, **kwdargs):
+        return export(self.ttp, 'Defect', self.output, workers=4,
+                      checkpoint=self.checkpoint, progress=None,
+                      batch_size=5, **kwdargs)
+
+    def test_resume_writes_nothing_twice(self):
+        self.assertEqual(self.export(), 20)
+        self.assertEqual(self.export(), 0)
+        self.assertEqual(self.numbers(), range(1, 21))
+
+    def test_csv(self):
+        self.assertEqual(self.export(format='csv'), 20)
+        with open(self.output) as output:
+            self.assertEqual(len(output.readlines()), 21)
+
+    def delete_after_listing(self, number):
+        listing = self.ttp.record_list
+
+        def record_list(*args):
+            listed = listing(*args)
+            self.server.delete_record('Defect', number)
+            return listed
+        self.ttp.record_list = record_list
+
+    def test_records_deleted_during_the_export_are_left_out(self):
+        self.delete_after_listing(5)
+        self.assertEqual(self.export(), 19)
+        self.assertEqual(self.numbers(), [n for n in xrange(1, 21) if n != 5])
+
+    def test_records_deleted_are_left_out_when_decoding_in_processes(self):
+        self.delete_after_listing(5)
+        self.assertEqual(self.export(processes=2), 19)
+        self.assertEqual(self.numbers(), [n for n in xrange(1, 21) if n != 5])
+
+    def test_missing_output_starts_over(self):
+        self.export()
+        os.remove(self.output)
+        self.assertEqual(self.export(), 20)
+        self.assertEqual(self.numbers(), range(1, 21))
+
+if __name__ == '__main__':
+    unittest.main()
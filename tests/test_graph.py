@@ -0,0 +1,70 @@
+"""Graphs fetch every linked record once, level by level."""
+import logging
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+SPEC = {
+    'TestCase': [('linkedrecords', 'TestRun')],
+    'TestRun': ['testcasenumber'],
+}
+
+
+class GraphTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(testcases=3, testruns=6)
+        self.server.start()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+        self.server.reset_counters()
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+
+    def runs(self, node):
+        return sorted(run.number for run in node.linked('TestRun'))
+
+    def test_records_are_fetched_once(self):
+        graph = self.ttp.load_graph('TestCase', [1, 2, 3, 2], SPEC)
+        self.assertEqual(self.server.calls, {'getTestCase': 3,
+                                             'getTestRunByRecordID': 6})
+        self.assertEqual(len(graph), 9)
+        self.assertEqual([node.number for node in graph.roots], [1, 2, 3, 2])
+        self.assertEqual([self.runs(node) for node in graph.roots[:3]],
+                         [[3, 6], [2, 4, 5], [1]])
+        ## test case numbers lead back to the loaded nodes
+        for root in graph.roots:
+            for run in root.linked('TestRun'):
+                self.assertEqual(run.linked(field='testcasenumber'), [root])
+
+    def test_depth(self):
+        graph = self.ttp.load_graph('TestCase', [2], SPEC, depth=1)
+        self.assertEqual(len(graph), 4)
+        for run in graph.roots[0].linked():
+            self.assertEqual(run.links, [])
+
+    def test_entity_roots(self):
+        testcase = self.ttp.getTestCase(3)
+        graph = self.ttp.load_graph('TestCase', [testcase], SPEC)
+        self.assertTrue(graph.roots[0].entity is testcase)
+        self.assertEqual(self.runs(graph.roots[0]), [1])
+        self.assertEqual(graph.calls, 1)
+
+    def test_missing_records_are_errors(self):
+        recordid = self.server.get_record('TestRun', 2)['recordid']
+        self.server.delete_record('TestRun', 2)
+        logging.disable(logging.ERROR)
+        try:
+            graph = self.ttp.load_graph('TestCase', [2], SPEC)
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(self.runs(graph.roots[0]), [4, 5])
+        self.assertEqual([(table, ref) for table, ref, error in graph.errors],
+                         [('TestRun', ('recordid', recordid))])
+
+if __name__ == '__main__':
+    unittest.main()
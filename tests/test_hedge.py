@@ -0,0 +1,67 @@
+"""Hedged calls reuse their threads and keep to the client's deadline."""
+import logging
+import sys
+import threading
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.hedge import TTPHedger
+from testtrackpro.stub import TTPStubServer
+
+
+class HedgeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer(latency=0.01)
+        self.server.populate(defects=20)
+        self.server.start()
+        self.hedger = TTPHedger(min_samples=5, budget=1.0, threads=4)
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass', hedge=self.hedger)
+        for number in xrange(1, 6):
+            self.ttp.getDefect(number)
+
+    def tearDown(self):
+        self.server.latency = self.server.slow_latency = 0.0
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+
+    def test_threads_are_reused(self):
+        self.assertTrue(self.hedger.stats()['delay'] is not None)
+        started = []
+
+        def count(frame, event, arg):
+            ## the profile hook of new threads, taken out again at once
+            sys.setprofile(None)
+            started.append(threading.current_thread().name)
+        threading.setprofile(count)
+        try:
+            for number in xrange(1, 21):
+                self.assertEqual(self.ttp.getDefect(number).defectnumber,
+                                 number)
+        finally:
+            threading.setprofile(None)
+        ## the idle threads kept, and those which were still finishing
+        ## the previous call when the next one started
+        self.assertTrue(started.count('TTPHedger') <= 4 + 2, started)
+
+    def test_calls_keep_to_the_deadline(self):
+        self.server.slow_calls = 1.0
+        self.server.slow_latency = 2.0
+        start = time.time()
+        logging.disable(logging.ERROR)
+        try:
+            with self.ttp.deadline(0.3):
+                self.assertRaises(testtrackpro.TTPConnectionError,
+                                  self.ttp.getDefect, 1)
+            self.assertTrue(time.time() - start < 1.0)
+            ## the abandoned requests finish on their own
+            while (self.hedger.stats()['discarded'] < 2 and
+                   time.time() - start < 5.0):
+                time.sleep(0.05)
+        finally:
+            logging.disable(logging.NOTSET)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""The import journal marks only adds which were sent as uncertain."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.breaker import TTPCircuitBreaker
+from testtrackpro.importer import bulk_import
+from testtrackpro.stub import TTPStubServer
+
+
+class JournalTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.start()
+        self.directory = tempfile.mkdtemp()
+        self.journal = os.path.join(self.directory, 'import.journal')
+        self.records = [{'id': 'src-%d' % i, 'summary': 'Imported %d' % i,
+                         'product': 'Widget'} for i in xrange(6)]
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def entries(self, kind):
+        with open(self.journal) as journal:
+            return [line.split()[1] for line in journal
+                    if line.startswith(kind + ' ')]
+
+    def test_adds_rejected_before_sending_are_retried(self):
+        breaker = TTPCircuitBreaker(reset_timeout=3600)
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass', breaker=breaker)
+        try:
+            ## an open circuit fails every add before it is sent
+            breaker._state = breaker.OPEN
+            breaker._opened = time.time()
+            stats = bulk_import(ttp, 'Defect', self.records, self.journal,
+                                workers=2, progress=None)
+            self.assertEqual(stats['failed'], 6)
+            self.assertEqual(self.entries('P'), [])
+
+            breaker.reset()
+            stats = bulk_import(ttp, 'Defect', self.records, self.journal,
+                                workers=2, progress=None)
+            self.assertEqual((stats['added'], stats['uncertain']), (6, 0))
+            self.assertEqual(sorted(self.entries('P')),
+                             sorted(self.entries('D')))
+        finally:
+            ttp.DatabaseLogoff()
+
+if __name__ == '__main__':
+    unittest.main()
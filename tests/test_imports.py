@@ -0,0 +1,65 @@
+"""suds is only imported, and patched, for the first client."""
+import os
+import subprocess
+import sys
+import unittest
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=_root,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+    return process.returncode, output
+
+
+class DeferredImportTests(unittest.TestCase):
+
+    def assertRuns(self, code):
+        returncode, output = run(code)
+        self.assertEqual(returncode, 0, output)
+
+    def test_helpers_do_not_import_suds(self):
+        self.assertRuns(
+            'import sys\n'
+            'import testtrackpro\n'
+            'assert testtrackpro.table_display_name("TestCase") == '
+            '"Test Case"\n'
+            'assert not testtrackpro.is_edit_context_entity(None)\n'
+            'assert testtrackpro.copy_entity([1, [2]]) == [1, [2]]\n'
+            'assert testtrackpro.entity_to_dict({"a": 1}) == {"a": 1}\n'
+            'assert "suds" not in sys.modules, "suds imported"\n'
+            'assert "urllib2" not in sys.modules, "urllib2 imported"\n')
+
+    def test_suds_is_patched_once(self):
+        self.assertRuns(
+            'import threading\n'
+            'import testtrackpro\n'
+            'threads = [threading.Thread(target=testtrackpro._load_suds)\n'
+            '           for i in range(8)]\n'
+            'for thread in threads: thread.start()\n'
+            'for thread in threads: thread.join()\n'
+            'import suds.mx.encoded\n'
+            'cast = suds.mx.encoded.Encoded.cast.im_func\n'
+            'assert cast is testtrackpro._polymprphic_cast\n'
+            'reload(testtrackpro)\n'
+            'testtrackpro._load_suds()\n'
+            'cast = suds.mx.encoded.Encoded.cast.im_func\n'
+            'assert cast is testtrackpro._polymprphic_cast\n')
+
+    def test_date_elements_are_fixed(self):
+        self.assertRuns(
+            'import testtrackpro\n'
+            'testtrackpro._load_suds()\n'
+            'document, patched = testtrackpro._fix_schema_document(\n'
+            '    \'<xsd:element name="datecreated" type="xsd:dateTime"/>\'\n'
+            '    \'<element type="dateTime" name="timestamp"/>\')\n'
+            'assert patched == ["datecreated"], patched\n'
+            'assert document == (\n'
+            '    \'<xsd:element name="datecreated" type="xsd:date"/>\'\n'
+            '    \'<element type="dateTime" name="timestamp"/>\'), document\n')
+
+if __name__ == '__main__':
+    unittest.main()
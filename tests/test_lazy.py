@@ -0,0 +1,40 @@
+"""Lazy entities are fetched in batches, and never share a client between
+threads."""
+import threading
+import unittest
+
+from testtrackpro.lazy import lazy_entities
+from testtrackpro.projection import TTPRecord
+
+
+class FakeClient(object):
+    """Records which thread used which client."""
+    def __init__(self, calls):
+        self.calls = calls
+
+    def clone(self):
+        return FakeClient(self.calls)
+
+    def getDefectByRecordID(self, recordid):
+        self.calls.append((self, threading.current_thread(), recordid))
+        return 'entity %d' % recordid
+
+
+class LazyEntityTests(unittest.TestCase):
+
+    def test_prefetch_uses_a_client_of_its_own(self):
+        calls = []
+        ttp = FakeClient(calls)
+        records = [TTPRecord(recordid, recordid, {}) for recordid in (1, 2)]
+        proxies = lazy_entities(ttp, 'Defect', records, batch_size=1,
+                                workers=2)
+        self.assertEqual(proxies[0].entity, 'entity 1')
+        proxies[0]._loader.prefetcher.join()
+        self.assertEqual(proxies[1].entity, 'entity 2')
+        caller = threading.current_thread()
+        for client, thread, recordid in calls:
+            self.assertEqual(client is ttp, thread is caller, recordid)
+        self.assertEqual(sorted(r for c, t, r in calls), [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
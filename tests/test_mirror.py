@@ -0,0 +1,75 @@
+"""The mirror high-water mark compares dates, not their text."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.mirror import TTPMirror
+from testtrackpro.stub import TTPStubServer
+
+
+class USDateMirror(TTPMirror):
+    """Mirror of a server which formats dates like ``12/31/2012 11:00:00 PM``.
+    """
+    def _record_list(self, table, filtername, columns):
+        listed = TTPMirror._record_list(self, table, filtername, columns)
+        for row in listed.itervalues():
+            if len(row) > 1:
+                row[1] = time.strftime('%m/%d/%Y %I:%M:%S %p', time.strptime(
+                    row[1], '%Y-%m-%d %H:%M:%S')).lstrip('0')
+        return listed
+
+
+class HighWaterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.start()
+        self.directory = tempfile.mkdtemp()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_highwater_is_the_latest_date(self):
+        proj = self.server.project()
+        for modified in ('2012-12-31 23:00:00', '2013-01-02 01:00:00',
+                         '2012-09-30 12:00:00'):
+            proj.add('Defect', {'summary': modified}, time.mktime(
+                time.strptime(modified, '%Y-%m-%d %H:%M:%S')))
+        mirror = USDateMirror(self.ttp, os.path.join(self.directory, 'db'),
+                              tables=['Defect'])
+        mirror.sync()
+        ## as text, '12/31/2012 11:00:00 PM' is after '1/2/2013 1:00:00 AM'
+        self.assertEqual(mirror.highwater('Defect'), '2013-01-02T01:00:00')
+
+    def test_modified_sorts_by_date(self):
+        proj = self.server.project()
+        for modified in ('2012-12-31 23:00:00', '2013-01-02 01:00:00'):
+            proj.add('Defect', {'summary': modified}, time.mktime(
+                time.strptime(modified, '%Y-%m-%d %H:%M:%S')))
+        mirror = USDateMirror(self.ttp, os.path.join(self.directory, 'db'),
+                              tables=['Defect'])
+        mirror.sync()
+        newest = lambda: [tuple(row) for row in mirror.db.execute(
+            'SELECT summary, modified FROM defect ORDER BY modified DESC')]
+        self.assertEqual(newest(), [
+            ('2013-01-02 01:00:00', '2013-01-02T01:00:00'),
+            ('2012-12-31 23:00:00', '2012-12-31T23:00:00')])
+        self.assertEqual(mirror.sync()['Defect']['fetched'], 0)
+
+        ## records mirrored with the server's text are not fetched again
+        for recordid, (number, modified) in mirror._record_list(
+                'Defect', None, ['Number', 'Date Modified']).iteritems():
+            mirror.db.execute('UPDATE defect SET modified = ? '
+                              'WHERE recordid = ?', (modified, recordid))
+        self.assertEqual(mirror.sync()['Defect']['fetched'], 0)
+        self.assertEqual(newest()[0][1], '2013-01-02T01:00:00')
+
+if __name__ == '__main__':
+    unittest.main()
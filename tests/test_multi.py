@@ -0,0 +1,33 @@
+"""Project sessions share one loaded WSDL, with a logon each."""
+import unittest
+
+from testtrackpro.multi import TTPMultiProject
+from testtrackpro.stub import TTPStubServer
+
+
+class MultiProjectTests(unittest.TestCase):
+
+    def setUp(self):
+        self.projects = ['Alpha', 'Beta', 'Gamma', 'Delta']
+        self.server = TTPStubServer(projects=self.projects)
+        for count, project in enumerate(self.projects):
+            self.server.populate(defects=count + 1, project=project)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_one_wsdl_for_all_projects(self):
+        with TTPMultiProject(self.server.url, 'user', 'pass',
+                             workers=4) as multi:
+            counts = multi.map(lambda ttp: len(ttp.record_list('Defect')))
+            cookies = set(ttp._cookie for ttp in multi.sessions.values())
+        self.assertEqual(counts, dict((project, count + 1) for count, project
+                                      in enumerate(self.projects)))
+        self.assertEqual(len(cookies), len(self.projects))
+        self.assertEqual(self.server.calls['GET ttsoapcgi.wsdl'], 1)
+        self.assertEqual(self.server.calls['ProjectLogon'],
+                         self.server.calls['DatabaseLogoff'])
+
+if __name__ == '__main__':
+    unittest.main()
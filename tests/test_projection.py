@@ -0,0 +1,69 @@
+"""get_fields picks between entity gets and the record list."""
+import logging
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.breaker import TTPCircuitBreaker
+from testtrackpro.stub import TTPStubServer
+
+
+class GetFieldsTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TTPStubServer()
+        cls.server.populate(defects=1000)
+        cls.server.start()
+        cls.ttp = testtrackpro.TTP(cls.server.url, 'Stub Project', 'user',
+                                   'pass')
+        logging.disable(logging.ERROR)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+        cls.ttp.DatabaseLogoff()
+        cls.server.stop()
+
+    def test_few_ids_do_not_list_the_table(self):
+        ## the column list is prepared ahead, as a client in use has it
+        self.ttp.getColumnsForTable('Defect')
+        single = self.ttp.getDefect(500)
+        self.server.reset_counters()
+        self.ttp.getDefect(500)
+        get_bytes = self.server.bytes_sent
+        self.server.reset_counters()
+        records = self.ttp.get_fields('Defect', [500], ['Summary'])
+        self.assertEqual([r.number for r in records], [500])
+        self.assertEqual(records[0].summary, single.summary)
+        self.assertEqual(self.server.calls.keys(), ['getDefect'])
+        self.assertTrue(self.server.bytes_sent <= 2 * get_bytes,
+                        self.server.bytes_sent)
+
+    def test_same_values_both_ways(self):
+        ids = [3, 7, 11, 9999]
+        few = self.ttp.get_fields('Defect', ids, ['Summary'])
+        listed = self.ttp.get_fields('Defect', ids, ['Summary'], max_gets=0)
+        self.assertEqual([(r.recordid, r.number, r.summary) for r in few],
+                         [(r.recordid, r.number, r.summary) for r in listed])
+        self.assertEqual([r.number for r in few], [3, 7, 11])
+
+    def test_few_ids_by_recordid(self):
+        recordid = self.ttp.getDefect(42).recordid
+        records = self.ttp.get_fields('Defect', [recordid], ['Summary'],
+                                      by_recordid=True)
+        self.assertEqual([(r.recordid, r.number) for r in records],
+                         [(recordid, 42)])
+
+    def test_connection_errors_are_raised(self):
+        breaker = TTPCircuitBreaker(reset_timeout=3600)
+        ttp = self.ttp.clone()
+        ttp._breaker = breaker
+        ## an open circuit fails every get before it is sent
+        breaker._state = breaker.OPEN
+        breaker._opened = time.time()
+        self.assertRaises(testtrackpro.TTPConnectionError, ttp.get_fields,
+                          'Defect', [3, 7], ['Summary'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Queries over the mirror give the records a scan of it would."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import testtrackpro
+from testtrackpro.mirror import TTPMirror
+from testtrackpro.query import TTPQuery
+from testtrackpro.stub import TTPStubServer
+
+
+class QueryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=40)
+        self.server.start()
+        self.directory = tempfile.mkdtemp()
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass')
+        self.mirror = TTPMirror(self.ttp, os.path.join(self.directory, 'db'),
+                                tables=['Defect'])
+        self.mirror.sync()
+        self.query = TTPQuery(self.mirror)
+
+    def tearDown(self):
+        self.ttp.DatabaseLogoff()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def scan(self, predicate):
+        return sorted(number for number in xrange(1, 41)
+                      if predicate(self.server.get_record('Defect', number)))
+
+    def test_fields(self):
+        expected = self.scan(lambda r: r['priority'] == 'Immediate' and
+                             r['product'] in ('Gizmo', 'Widget'))
+        self.assertTrue(expected)
+        self.assertEqual(self.query.numbers(
+            'Defect', priority='Immediate', product=['Gizmo', 'Widget']),
+            expected)
+        self.assertEqual(self.query.count(
+            'Defect', priority='Immediate', product=['Gizmo', 'Widget']),
+            len(expected))
+
+    def test_text_and_where(self):
+        expected = self.scan(lambda r: 'leak' in r['description'].lower() and
+                             r['status'].startswith('Open'))
+        self.assertTrue(expected)
+        self.assertEqual(self.query.numbers(
+            'Defect', text='leak', where="status LIKE ?", params=('Open%',)),
+            expected)
+
+    def test_entities_in_order(self):
+        defects = self.query.find('Defect', order_by='-number', limit=3)
+        self.assertEqual([d.defectnumber for d in defects], [40, 39, 38])
+        self.assertEqual(defects[0].summary,
+                         self.server.get_record('Defect', 40)['summary'])
+        raw = self.query.find('Defect', raw=True, limit=2,
+                              predicate=lambda d: d['defectnumber'] > 10)
+        self.assertEqual([d['defectnumber'] for d in raw], [11, 12])
+
+    def test_text_index_follows_syncs(self):
+        self.assertEqual(self.query.numbers('Defect', text='zeppelin'), [])
+        self.server.modify_record('Defect', 7, description='Zeppelin crash')
+        self.mirror.sync()
+        self.assertEqual(self.query.numbers('Defect', text='zeppelin'), [7])
+
+    def test_unsynced_table(self):
+        self.assertRaises(testtrackpro.TTPAPIError, self.query.find,
+                          'TestCase')
+
+if __name__ == '__main__':
+    unittest.main()
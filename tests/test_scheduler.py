@@ -0,0 +1,27 @@
+"""Calls waiting for a slot keep to their deadline."""
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.scheduler import TTPScheduler
+
+
+class DeadlineTests(unittest.TestCase):
+
+    def test_waiting_call_gives_up_at_its_deadline(self):
+        scheduler = TTPScheduler(slots=1)
+        scheduler.acquire('interactive', 'first')
+        start = time.time()
+        self.assertRaises(testtrackpro.TTPConnectionError, scheduler.acquire,
+                          'interactive', 'second', start + 0.2)
+        self.assertTrue(time.time() - start < 1.0)
+        self.assertEqual(scheduler.stats()['interactive']['waiting'], 0)
+
+        ## the call which gave up does not get the slot when it is free
+        scheduler.release('interactive')
+        scheduler.acquire('interactive', 'third', time.time())
+        stats = scheduler.stats()['interactive']
+        self.assertEqual((stats['running'], stats['granted']), (1, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Schema bundles are a cache: bad ones must never stop a client."""
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+
+class SchemaBundleTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.WARNING)
+        cls.server = TTPStubServer()
+        cls.server.populate(defects=3)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ttp.schema')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def client(self, path=None):
+        return testtrackpro.TTP(self.server.url,
+                                schema_bundle=path or self.path)
+
+    def test_round_trip(self):
+        first = self.client()
+        self.assertEqual(first.schema_report['source'], 'download')
+        second = self.client()
+        self.assertEqual(second.schema_report['source'], 'bundle')
+        documents = lambda ttp: [
+            (d['url'], d['size'], d['patched'])
+            for d in ttp.schema_report['documents']]
+        self.assertEqual(documents(second), documents(first))
+        self.assertEqual(
+            testtrackpro.entity_to_dict(second.create('CDefect')),
+            testtrackpro.entity_to_dict(first.create('CDefect')))
+
+    def test_clones_share_the_bundled_model(self):
+        self.client()
+        ttp = self.client()
+        self.assertEqual(ttp.schema_report['source'], 'bundle')
+        start = time.time()
+        clone = ttp.clone()
+        self.assertTrue(time.time() - start < 0.05, time.time() - start)
+        self.assertTrue(clone._client.options.cache.definitions is
+                        ttp._client.options.cache.definitions)
+
+    def test_truncated_bundle_is_ignored(self):
+        self.client()
+        with open(self.path, 'rb') as fp:
+            data = fp.read()
+        with open(self.path, 'wb') as fp:
+            fp.write(data[:len(data) // 2])
+        self.assertEqual(self.client().schema_report['source'], 'download')
+
+    def test_garbage_bundle_is_ignored(self):
+        with open(self.path, 'wb') as fp:
+            fp.write('not a bundle')
+        self.assertEqual(self.client().schema_report['source'], 'download')
+        ## and replaced by a good one
+        self.assertEqual(self.client().schema_report['source'], 'bundle')
+
+    def test_unwritable_bundle_is_skipped(self):
+        path = os.path.join(self.directory, 'missing', 'ttp.schema')
+        self.assertEqual(self.client(path).schema_report['source'],
+                         'download')
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
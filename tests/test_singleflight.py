@@ -0,0 +1,115 @@
+"""Coalesced calls share a result without sharing changes to it, and are
+hedged like other reads."""
+import threading
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.hedge import TTPHedger
+from testtrackpro.singleflight import TTPSingleFlight
+from testtrackpro.stub import TTPStubServer
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def lead(self, group, func, outcome):
+        ## starts the leader, whose func runs once a follower joined
+        def wait_for_follower():
+            while group._flights['key'].waiters < 1:
+                time.sleep(0.001)
+            return func()
+
+        def leader():
+            try:
+                outcome.append(group.call('key', wait_for_follower))
+            except BaseException, e:
+                outcome.append(e)
+        thread = threading.Thread(target=leader)
+        thread.start()
+        while 'key' not in group._flights:
+            time.sleep(0.001)
+        return thread
+
+    def test_leader_changes_do_not_reach_followers(self):
+        group = TTPSingleFlight()
+        results = []
+
+        def result():
+            results.append([[1, 2]])
+            return results[0]
+        thread = self.lead(group, result, [])
+        followed = group.call('key', lambda: None)
+        ## the leader's caller changes its result as soon as it has it
+        results[0][0].append(3)
+        thread.join()
+        self.assertEqual(followed, [[1, 2]])
+
+    def test_interrupted_leader_fails_followers(self):
+        def interrupted():
+            raise KeyboardInterrupt()
+        group = TTPSingleFlight()
+        outcome = []
+        thread = self.lead(group, interrupted, outcome)
+        self.assertRaises(testtrackpro.TTPConnectionError, group.call, 'key',
+                          lambda: None)
+        thread.join()
+        ## the leader's own caller gets the interrupt
+        self.assertTrue(isinstance(outcome[0], KeyboardInterrupt))
+
+    def test_followers_wait_no_longer_than_their_timeout(self):
+        group = TTPSingleFlight()
+        release = threading.Event()
+        thread = self.lead(group, lambda: release.wait(5), [])
+        start = time.time()
+        self.assertRaises(testtrackpro.TTPConnectionError, group.call, 'key',
+                          lambda: None, 0.1)
+        self.assertTrue(time.time() - start < 1.0)
+        release.set()
+        thread.join()
+
+class CoalescedClientTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer(latency=0.2)
+        self.server.populate(defects=3)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_concurrent_callers_change_only_their_own_result(self):
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass', coalesce=TTPSingleFlight())
+        summary = self.server.get_record('Defect', 2)['summary']
+        seen = []
+
+        def caller(client, index):
+            defect = client.getDefect(2)
+            ## every caller changes its result as soon as it has it
+            seen.append(defect.summary)
+            defect.summary = 'changed by %d' % index
+            defect.eventlist.append(index)
+        clients = [ttp.clone() for index in xrange(8)]
+        self.server.reset_counters()
+        threads = [threading.Thread(target=caller, args=(client, index))
+                   for index, client in enumerate(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ttp.DatabaseLogoff()
+        self.assertEqual(self.server.calls.get('getDefect'), 1)
+        self.assertEqual(seen, [summary] * 8)
+
+    def test_unhashable_calls_are_still_hedged(self):
+        hedger = TTPHedger()
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass', coalesce=TTPSingleFlight(),
+                               hedge=hedger)
+        ## the column list makes the arguments unhashable
+        ttp.record_list('Defect', None, ['Number', 'Summary'])
+        ttp.DatabaseLogoff()
+        self.assertEqual(hedger.stats()['calls'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""The stand-in server answers the client like a TestTrack server."""
+import datetime
+import logging
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+
+class StubServerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer(users={'user': 'pass'})
+        self.server.populate(defects=10)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.ttp = self.session()
+        ## suds logs every fault the tests provoke
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def session(self):
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass')
+        self.addCleanup(ttp.DatabaseLogoff)
+        return ttp
+
+    def test_populate_is_deterministic(self):
+        with TTPStubServer() as other:
+            other.populate(defects=10)
+            self.assertEqual(self.server.get_record('Defect', 7)['summary'],
+                             other.get_record('Defect', 7)['summary'])
+
+    def test_records_and_dates(self):
+        defect = self.ttp.getDefect(3)
+        self.assertEqual(defect.summary,
+                         self.server.get_record('Defect', 3)['summary'])
+        ## declared as dateTime in the WSDL, returned as a date
+        self.assertTrue(isinstance(defect.datecreated, datetime.date))
+        self.assertEqual(len(self.ttp.record_list('Defect')), 10)
+
+    def test_logon_checks_the_password(self):
+        self.assertRaises(testtrackpro.TTPLogonError, testtrackpro.TTP,
+                          self.server.url, 'Stub Project', 'user', 'bad')
+
+    def test_edit_locks(self):
+        other = self.session()
+        with self.ttp.editDefect(1) as defect:
+            defect.summary = 'Changed'
+            self.assertRaises(testtrackpro.TTPAPIError, other.editDefect, 1)
+        self.assertEqual(self.server.get_record('Defect', 1)['summary'],
+                         'Changed')
+        ## saving released the lock
+        with other.editDefect(1) as defect:
+            pass
+
+    def test_counts_calls(self):
+        self.server.reset_counters()
+        self.ttp.getDefect(1)
+        self.ttp.getDefect(2)
+        self.assertEqual(self.server.calls, {'getDefect': 2})
+        self.assertTrue(self.server.bytes_sent > 0)
+
+if __name__ == '__main__':
+    unittest.main()
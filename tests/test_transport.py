@@ -0,0 +1,141 @@
+"""Recorded sessions replay without the server, and compressed traffic
+decodes to the same answers."""
+import StringIO
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+from testtrackpro.transport import (TTPCompressionTransport,
+                                   TTPRecordingTransport, TTPReplayTransport)
+
+
+def session(ttp):
+    return ([ttp.getDefect(number).summary for number in (1, 2, 1)],
+            sorted(ttp.record_list('Defect')))
+
+
+class RecordReplayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.archive = os.path.join(self.directory, 'session.ttr.gz')
+        server = TTPStubServer()
+        server.populate(defects=5)
+        with server:
+            with TTPRecordingTransport(self.archive) as transport:
+                with testtrackpro.TTP(server.url, 'Stub Project', 'user',
+                                      'pass', transport=transport) as ttp:
+                    self.recorded = session(ttp)
+                    server.modify_record('Defect', 1, summary='Changed')
+                    self.changed = ttp.getDefect(1).summary
+
+    def replay(self, **kwdargs):
+        transport = TTPReplayTransport(self.archive, **kwdargs)
+        ttp = testtrackpro.TTP(transport.wsdl_url, 'Stub Project', 'user',
+                               'pass', transport=transport)
+        return ttp, transport
+
+    def test_replay_answers_like_the_server(self):
+        ttp, transport = self.replay()
+        with ttp:
+            self.assertEqual(session(ttp), self.recorded)
+            ## identical requests are answered in the recorded order
+            self.assertEqual(ttp.getDefect(1).summary, 'Changed')
+        self.assertEqual(self.changed, 'Changed')
+        self.assertTrue(transport.replayed > 0)
+
+    def test_strict_replay_runs_out(self):
+        ttp, transport = self.replay(strict=True)
+        session(ttp)
+        ttp.getDefect(1)
+        logging.disable(logging.ERROR)
+        try:
+            self.assertRaises(Exception, ttp.getDefect, 1)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_unknown_requests_fail(self):
+        ttp, transport = self.replay()
+        logging.disable(logging.ERROR)
+        try:
+            self.assertRaises(Exception, ttp.getDefect, 4)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_not_an_archive(self):
+        path = os.path.join(self.directory, 'other.gz')
+        archive = gzip.open(path, 'wb')
+        archive.write('{"format": "other"}\n')
+        archive.close()
+        self.assertRaises(ValueError, TTPReplayTransport, path)
+
+
+class CompressionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=5)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def client(self, compression=True):
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass', compression=compression)
+        self.addCleanup(ttp.DatabaseLogoff)
+        return ttp
+
+    def test_same_answers_fewer_bytes(self):
+        plain = self.client(compression=None)
+        ttp = self.client()
+        self.assertEqual(plain.compression, None)
+        self.assertEqual(
+            testtrackpro.entity_to_dict(ttp.getDefect(2)),
+            testtrackpro.entity_to_dict(plain.getDefect(2)))
+        ttp.clone().getDefect(3)
+        stats = ttp.compression.stats()
+        self.assertEqual(stats['compressed_responses'], stats['responses'])
+        self.assertTrue(stats['bytes_received'] * 2 <
+                        stats['bytes_received_decoded'])
+        ## the logon and both gets, the clone shares the counters
+        self.assertEqual(stats['requests'], 3)
+
+    def test_faults_are_decoded(self):
+        ttp = self.client()
+        logging.disable(logging.ERROR)
+        try:
+            self.assertRaises(testtrackpro.TTPAPIError, ttp.getDefect, 99)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_compressed_requests(self):
+        ttp = self.client(TTPCompressionTransport(compress_requests=True,
+                                                  min_size=1024))
+        with ttp.editDefect(1) as defect:
+            defect.description = 'long ' * 1000
+        self.assertEqual(self.server.get_record('Defect', 1)['description'],
+                         'long ' * 1000)
+        stats = ttp.compression.stats()
+        self.assertEqual(stats['compressed_requests'], 1)
+
+    def test_not_with_a_transport(self):
+        self.assertRaises(ValueError, testtrackpro.TTP, self.server.url,
+                          compression=True, transport=object())
+
+    def test_deflate_with_and_without_zlib_header(self):
+        transport = TTPCompressionTransport()
+        body = '<xml>%s</xml>' % ('body ' * 100)
+        raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        for data in (zlib.compress(body), raw.compress(body) + raw.flush()):
+            self.assertEqual(transport._decode(
+                StringIO.StringIO(data), {'content-encoding': 'deflate'}),
+                body)
+
+if __name__ == '__main__':
+    unittest.main()
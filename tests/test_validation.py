@@ -0,0 +1,66 @@
+"""Invalid entities are rejected before they are sent."""
+import logging
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+from testtrackpro.validation import TTPValidator
+
+
+class ValidationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=3)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                                    'pass', validate=True)
+        self.addCleanup(self.ttp.DatabaseLogoff)
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_edit_with_a_bad_dropdown_value(self):
+        original = self.server.get_record('Defect', 1)['priority']
+        try:
+            with self.ttp.editDefect(1) as defect:
+                defect.priority = 'Urgent'
+        except testtrackpro.TTPValidationError, e:
+            self.assertEqual([(c, v) for c, v, m in e.problems],
+                             [('Priority', 'Urgent')])
+        else:
+            self.fail('saved an invalid priority')
+        self.assertEqual(self.server.calls.get('saveDefect'), None)
+        self.assertEqual(self.server.calls['cancelSaveDefect'], 1)
+        self.assertEqual(self.server.get_record('Defect', 1)['priority'],
+                         original)
+
+    def test_add_without_a_required_field(self):
+        defect = self.ttp.create('CDefect', recordid=0, summary='New',
+                                 priority='High')
+        self.assertRaises(testtrackpro.TTPValidationError,
+                          self.ttp.addDefect, defect)
+        self.assertEqual(self.server.calls.get('addDefect'), None)
+        defect.product = 'Widget'
+        number = self.ttp.addDefect(defect)
+        self.assertEqual(self.server.get_record('Defect', number)['product'],
+                         'Widget')
+
+    def test_rules_are_loaded_once(self):
+        clone = self.ttp.clone()
+        for ttp, number in ((self.ttp, 1), (clone, 2), (self.ttp, 3)):
+            with ttp.editDefect(number) as defect:
+                defect.priority = 'Low'
+        self.assertEqual(self.server.calls['saveDefect'], 3)
+        self.assertEqual(self.server.calls['getColumnsForTable'], 1)
+        self.assertEqual(self.ttp._validator.stats(),
+                         dict(checked=3, rejected=0, loads=1))
+
+    def test_rules_expire(self):
+        validator = TTPValidator(max_age=0)
+        validator.rules(self.ttp, 'Defect')
+        validator.rules(self.ttp, 'Defect')
+        self.assertEqual(validator.stats()['loads'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Queued updates to a record are applied in one edit."""
+import logging
+import threading
+import time
+import unittest
+
+import testtrackpro
+from testtrackpro.stub import TTPStubServer
+
+
+class WriteBehindTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = TTPStubServer()
+        self.server.populate(defects=3)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.ttp = self.session()
+        self.server.reset_counters()
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def session(self):
+        ttp = testtrackpro.TTP(self.server.url, 'Stub Project', 'user',
+                               'pass')
+        self.addCleanup(ttp.DatabaseLogoff)
+        return ttp
+
+    def recordid(self, number):
+        return self.server.get_record('Defect', number)['recordid']
+
+    def test_updates_are_merged(self):
+        recordid = self.recordid(1)
+        with self.ttp.write_behind(window=0.3) as queue:
+            def update(n):
+                queue.update('Defect', recordid, summary='Update %d' % n)
+            threads = [threading.Thread(target=update, args=(n,))
+                       for n in xrange(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            queue.update('Defect', recordid, summary='Last',
+                         priority='Immediate')
+        record = self.server.get_record('Defect', 1)
+        self.assertEqual((record['summary'], record['priority']),
+                         ('Last', 'Immediate'))
+        self.assertEqual(self.server.calls['editDefectByRecordID'], 1)
+        self.assertEqual(self.server.calls['saveDefect'], 1)
+        stats = queue.stats()
+        self.assertEqual((stats['updates'], stats['merged'], stats['edits']),
+                         (9, 8, 1))
+
+    def test_locked_records_are_retried(self):
+        other = self.session()
+        defect = other.editDefect(2)
+        queue = self.ttp.write_behind(window=0, retry_delay=0.1)
+        queue.update('Defect', self.recordid(2), summary='After the lock')
+        time.sleep(0.3)
+        other.cancelSave(defect)
+        queue.close()
+        self.assertEqual(self.server.get_record('Defect', 2)['summary'],
+                         'After the lock')
+        self.assertTrue(queue.stats()['retries'] > 0)
+        self.assertEqual(queue.errors, [])
+
+    def test_failed_updates_are_dropped(self):
+        other = self.session()
+        other.editDefect(2)
+        dropped = []
+        queue = self.ttp.write_behind(
+            window=0, retries=1, retry_delay=0.05,
+            on_error=lambda *args: dropped.append(args[:3]))
+        queue.update('Defect', self.recordid(2), summary='Locked')
+        recordid = self.recordid(3)
+        self.server.delete_record('Defect', 3)
+        queue.update('Defect', recordid, summary='Deleted')
+        queue.close()
+        expected = [('Defect', self.recordid(2), {'summary': 'Locked'}),
+                    ('Defect', recordid, {'summary': 'Deleted'})]
+        self.assertEqual(sorted(dropped), sorted(expected))
+        self.assertEqual(sorted(e[:3] for e in queue.errors), sorted(expected))
+        self.assertEqual(queue.stats()['dropped'], 2)
+        self.assertRaises(testtrackpro.TTPAPIError, queue.update,
+                          'Defect', recordid, summary='Closed')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Command line interface.
+
+    python -m testtrackpro <command> [options]
+
+Commands:
+
+    export      stream a table, or a filter's results, to JSON Lines or CSV
+    import      add records from JSON Lines or CSV, resumable via a journal
+"""
+import csv
+import getpass
+import json
+import optparse
+import os
+import sys
+
+import testtrackpro
+
+
+def _connection_options(parser):
+    group = optparse.OptionGroup(parser, "Connection")
+    group.add_option('--url', help="TestTrack server or WSDL url")
+    group.add_option('--project', help="project (database) name")
+    group.add_option('--username', help="username to log on with")
+    group.add_option('--password',
+                     help="password, defaults to $TTP_PASSWORD or a prompt")
+    parser.add_option_group(group)
+
+def _connect(parser, options):
+    if not options.url or not options.project or not options.username:
+        parser.error("--url, --project and --username are required")
+    password = options.password or os.environ.get('TTP_PASSWORD')
+    if password is None:
+        password = getpass.getpass()
+    return testtrackpro.TTP(options.url, options.project, options.username,
+                            password)
+
+def export_command(args):
+    from testtrackpro.export import export, FORMATS
+    parser = optparse.OptionParser(
+        prog='python -m testtrackpro export',
+        description="Stream the records of a table to JSON Lines or CSV.")
+    _connection_options(parser)
+    parser.add_option('--table', default='Defect',
+                      help="table to export [default: %default]")
+    parser.add_option('--filter', dest='filtername',
+                      help="only export records passing this server filter")
+    parser.add_option('--format', choices=FORMATS, default='jsonl',
+                      help="jsonl or csv [default: %default]")
+    parser.add_option('--workers', type='int', default=4,
+                      help="parallel fetches [default: %default]")
+    parser.add_option('--processes', type='int', default=0,
+                      help="decode in this many processes [default: in the "
+                           "fetching threads]")
+    parser.add_option('--output', help="output file")
+    parser.add_option('--checkpoint',
+                      help="checkpoint file, to make the export resumable")
+    parser.add_option('--quiet', action='store_true', default=False,
+                      help="do not report progress")
+    options, args = parser.parse_args(args)
+    if not options.output:
+        parser.error("--output is required")
+    with _connect(parser, options) as ttp:
+        export(ttp, options.table, options.output, options.format,
+               options.filtername, options.workers, options.checkpoint,
+               progress=not options.quiet and sys.stderr or None,
+               processes=options.processes)
+    return 0
+
+def _read_records(path, format):
+    with open(path, 'rb') as input:
+        if format == 'csv':
+            for row in csv.DictReader(input):
+                ## empty CSV cells leave the template's field unset
+                yield dict((k, v.decode('utf-8')) for k, v in row.iteritems()
+                           if v != '')
+        else:
+            for line in input:
+                if line.strip():
+                    yield json.loads(line)
+
+def import_command(args):
+    from testtrackpro.importer import bulk_import
+    parser = optparse.OptionParser(
+        prog='python -m testtrackpro import',
+        description="Add records to a table from JSON Lines or CSV, "
+                    "skipping records a previous run already added.")
+    _connection_options(parser)
+    parser.add_option('--table', default='Defect',
+                      help="table to add to [default: %default]")
+    parser.add_option('--input', help="input file")
+    parser.add_option('--format', choices=('jsonl', 'csv'), default='jsonl',
+                      help="jsonl or csv [default: %default]")
+    parser.add_option('--journal',
+                      help="journal file, defaults to the input file "
+                           "name with .journal appended")
+    parser.add_option('--id-field', default='id',
+                      help="field holding the source record id "
+                           "[default: %default]")
+    parser.add_option('--workers', type='int', default=4,
+                      help="parallel adds [default: %default]")
+    parser.add_option('--rate', type='float',
+                      help="maximum adds per second")
+    parser.add_option('--retry-uncertain', action='store_true', default=False,
+                      help="add again records which were in flight when a "
+                           "previous run stopped")
+    parser.add_option('--quiet', action='store_true', default=False,
+                      help="do not report progress")
+    options, args = parser.parse_args(args)
+    if not options.input:
+        parser.error("--input is required")
+    with _connect(parser, options) as ttp:
+        stats = bulk_import(
+            ttp, options.table, _read_records(options.input, options.format),
+            options.journal or options.input + '.journal', options.workers,
+            options.rate, options.id_field,
+            retry_uncertain=options.retry_uncertain,
+            progress=not options.quiet and sys.stderr or None)
+    return stats['failed'] and 1 or 0
+
+_commands = {
+    'export': export_command,
+    'import': import_command,
+}
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in _commands:
+        sys.stderr.write(__doc__.lstrip())
+        return 2
+    try:
+        return _commands[argv[0]](argv[1:])
+    except testtrackpro.TTPAPIError, e:
+        sys.stderr.write("error: %s\n" % e)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Circuit breaker for an unhealthy TestTrack server.
+
+When the TestTrack server hangs, every call waits for the full socket
+timeout, and every thread of a service ends up stuck waiting on it. A
+:py:class:`TTPCircuitBreaker` counts consecutive calls which failed without
+an answer from the server (connection errors, timeouts, HTTP errors). SOAP
+faults are answers, and errors raised before a request is sent, like a bad
+argument, say nothing about the server, so neither is counted. After
+``failures`` of them the circuit *opens*, and calls fail at once with a
+:py:class:`~testtrackpro.TTPConnectionError` instead of going to the server.
+Once ``reset_timeout`` seconds have passed the circuit is *half open*: a
+single trial call is let through, and closes the circuit again if it
+succeeds, or opens it for another ``reset_timeout`` if it fails.
+
+Give a client a breaker with the ``breaker`` argument. ``breaker=True`` uses
+the breaker shared by all clients of the same server URL, including their
+clones. The ``timeout`` argument bounds each call, and
+:py:meth:`TTP.deadline <testtrackpro.TTP.deadline>` bounds a block of calls:
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', breaker=True, timeout=10)
+    try:
+        with ttp.deadline(2.5):
+            defect = ttp.getDefect(42)
+            events = ttp.getDefect(43)
+    except testtrackpro.TTPConnectionError:
+        ## server down, circuit open, or out of time
+        defect = None
+"""
+import httplib
+import socket
+import threading
+import time
+import urllib2
+
+import suds
+import suds.transport
+
+import testtrackpro
+
+
+class TTPCircuitBreaker(object):
+    """Per endpoint circuit breaker.
+
+    :param int failures: Consecutive failed calls which open the circuit.
+    :param float reset_timeout: Seconds the circuit stays open before a trial
+                    call is let through.
+    :param int half_open_calls: Number of trial calls allowed at once while
+                    the circuit is half open.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failures=5, reset_timeout=30.0, half_open_calls=1):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self._state = self.CLOSED
+        self._failed = 0
+        self._opened = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self._stats = dict(calls=0, errors=0, rejected=0, opened=0)
+
+    @property
+    def state(self):
+        """:py:attr:`CLOSED`, :py:attr:`OPEN` or :py:attr:`HALF_OPEN`."""
+        with self._lock:
+            if (self._state == self.OPEN and
+                    time.time() - self._opened >= self.reset_timeout):
+                return self.HALF_OPEN
+            return self._state
+
+    def stats(self):
+        """Counters as a dict: the ``state``, and the number of ``calls`` let
+        through, of those the ``errors``, calls ``rejected`` while open, and
+        the number of times the circuit ``opened``.
+        """
+        state = self.state
+        with self._lock:
+            stats = dict(self._stats)
+        stats['state'] = state
+        return stats
+
+    def reset(self):
+        """Close the circuit."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failed = 0
+            self._trials = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                self._stats['calls'] += 1
+                return False
+            if (self._state == self.OPEN and
+                    time.time() - self._opened >= self.reset_timeout):
+                self._state = self.HALF_OPEN
+            if (self._state == self.HALF_OPEN and
+                    self._trials < self.half_open_calls):
+                self._trials += 1
+                self._stats['calls'] += 1
+                return True
+            self._stats['rejected'] += 1
+        raise testtrackpro.TTPConnectionError(
+            "TestTrack server unavailable, failing fast: the circuit "
+            "opened after %d consecutive failures." % self.failures)
+
+    def _record(self, trial, failed):
+        ## failed is None for calls which did not reach the server
+        with self._lock:
+            if trial:
+                self._trials -= 1
+            if failed is None:
+                return
+            if not failed:
+                self._failed = 0
+                if trial or self._state == self.HALF_OPEN:
+                    self._state = self.CLOSED
+                return
+            self._stats['errors'] += 1
+            self._failed += 1
+            if trial or (self._state == self.CLOSED and
+                         self._failed >= self.failures):
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened = time.time()
+
+    def call(self, func):
+        """Call ``func()``, unless the circuit is open."""
+        trial = self._admit()
+        failed = None
+        try:
+            result = func()
+            failed = False
+        except suds.WebFault:
+            failed = False
+            raise
+        except Exception, e:
+            if transport_failure(e):
+                failed = True
+            raise
+        finally:
+            self._record(trial, failed)
+        return result
+
+
+def transport_failure(error):
+    """Whether ``error`` is a call failing without an answer from the server:
+    a connection error, a timeout or an HTTP error.
+    """
+    if isinstance(error, (testtrackpro.TTPConnectionError, socket.error,
+                          urllib2.URLError, httplib.HTTPException,
+                          suds.transport.TransportError)):
+        return True
+    ## suds raises HTTP errors other than SOAP faults as a plain Exception
+    ## of the status and reason
+    args = getattr(error, 'args', ())
+    return (type(error) is Exception and len(args) == 1 and
+            isinstance(args[0], tuple) and len(args[0]) == 2 and
+            isinstance(args[0][0], int))
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def shared_breaker(url, **kwdargs):
+    """The :py:class:`TTPCircuitBreaker` shared by all clients of the server
+    at ``url``. The keyword arguments are only used when the breaker is
+    created by the first call for a server.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = TTPCircuitBreaker(**kwdargs)
+    return breaker
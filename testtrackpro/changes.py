@@ -0,0 +1,240 @@
+"""Change feed for TestTrack records.
+
+Polling ``getDefect`` for every watched record is slow and puts load on the
+server. :py:meth:`TTP.watch <testtrackpro.TTP.watch>` instead polls a record
+list with just the number and last modified columns, fetches the full
+entities only for records which changed, and yields :py:class:`TTPChange`
+objects with field level differences. The first poll only notes the modified
+date of every record, without fetching any entity, so field level
+differences are known from the second change of a record on.
+
+.. code:: python
+
+    for change in ttp.watch('Defect', 'Watched Defects', interval=60):
+        if change.kind == change.MODIFIED:
+            for path, old, new in change.changes:
+                notify(change.number, path, old, new)
+
+All watches of the same table and filter on the same session share a single
+background poller. The poll interval adapts: it backs off towards
+``max_interval`` while nothing changes, and returns to the shortest requested
+``interval`` as soon as something does. Polls which fail with an API error
+are logged and tried again at the next interval. Any other error is logged
+and raised by every watch of the poller.
+"""
+import Queue
+import logging
+import threading
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+
+class TTPChange(object):
+    """A change to a watched record.
+
+    ``kind`` is one of :py:attr:`ADDED`, :py:attr:`MODIFIED` or
+    :py:attr:`DELETED`. ``entity`` is the new entity (``None`` when deleted)
+    and ``old`` the previous entity data (see
+    :py:func:`testtrackpro.entity_to_dict`), if it was known. ``changes`` is
+    a list of ``(path, old value, new value)`` tuples, where ``path`` looks
+    like ``'priority'`` or ``'eventlist[2].notes'``. It is empty when ``old``
+    is not known, for the first change of a record since the watch started.
+    """
+    ADDED = 'added'
+    MODIFIED = 'modified'
+    DELETED = 'deleted'
+
+    def __init__(self, table, kind, recordid, number, entity, old, changes):
+        self.table = table
+        self.kind = kind
+        self.recordid = recordid
+        self.number = number
+        self.entity = entity
+        self.old = old
+        self.changes = changes
+
+    def __repr__(self):
+        return '<TTPChange %s %s %s: %d changes>' % (
+            self.kind, self.table, self.number, len(self.changes))
+
+
+def diff(old, new, path=''):
+    """Field level differences between two sets of entity data, as a list of
+    ``(path, old value, new value)`` tuples.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(set(old) | set(new)):
+            if key == '__type__':
+                continue
+            changes.extend(diff(old.get(key), new.get(key),
+                                path and path + '.' + key or key))
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        changes = []
+        for index in xrange(max(len(old), len(new))):
+            changes.extend(diff(old[index] if index < len(old) else None,
+                                new[index] if index < len(new) else None,
+                                '%s[%d]' % (path, index)))
+        return changes
+    if old != new:
+        return [(path, old, new)]
+    return []
+
+
+class _Poller(object):
+    """Background poller shared by all watches of a table and filter.
+    """
+    def __init__(self, key, ttp, table, filtername, modified_column, workers):
+        self.key = key
+        self.ttp = ttp.clone()
+        self.table = table
+        self.filtername = filtername
+        self.modified_column = modified_column
+        self.workers = workers
+        self.method_name = 'get%sByRecordID' % table
+        self.number_field = testtrackpro.table_number_field(table)
+        self.subscribers = {}  ## queue -> (interval, max_interval)
+        self.interval = None
+        self.known = {}        ## recordid -> modified
+        self.entities = {}     ## recordid -> entity data
+        self.baseline = False
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def subscribe(self, interval, max_interval):
+        queue = Queue.Queue()
+        with _pollers_lock:
+            self.subscribers[queue] = (interval, max_interval)
+            self.interval = min(i for i, m in self.subscribers.values())
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='TTPWatch-%s' % self.table)
+                self.thread.daemon = True
+                self.thread.start()
+        self.wakeup.set()
+        return queue
+
+    def unsubscribe(self, queue):
+        with _pollers_lock:
+            self.subscribers.pop(queue, None)
+            if not self.subscribers:
+                _pollers.pop(self.key, None)
+        self.wakeup.set()
+
+    def limits(self):
+        with _pollers_lock:
+            values = self.subscribers.values()
+        if not values:
+            return None, None
+        return (min(i for i, m in values), min(m for i, m in values))
+
+    def run(self):
+        while True:
+            base, maximum = self.limits()
+            if base is None:
+                return
+            try:
+                changed = self.poll()
+            except testtrackpro.TTPAPIError, e:
+                logging.warn("Watch poll of %s failed: %s", self.table, e)
+                changed = False
+            except Exception, e:
+                ## not going away by polling again, stop the watches
+                logging.exception("Watch poll of %s failed", self.table)
+                self.publish(_Failure(e))
+                changed = False
+            if changed:
+                self.interval = base
+            else:
+                self.interval = min(max(self.interval, base) * 1.5, maximum)
+            self.wakeup.clear()
+            self.wakeup.wait(self.interval)
+
+    def publish(self, change):
+        with _pollers_lock:
+            queues = list(self.subscribers)
+        for queue in queues:
+            queue.put(change)
+
+    def fetch(self, recordids):
+        fetch = lambda client, recordid: testtrackpro.entity_to_dict(
+            getattr(client, self.method_name)(recordid))
+        pool = TTPWorkerPool(self.ttp, self.workers)
+        for recordid, data, error in pool.imap_unordered(fetch, recordids):
+            if error:
+                logging.warn("Watch could not fetch %s record %s: %s",
+                             self.table, recordid, error)
+                continue
+            yield recordid, data
+
+    def poll(self):
+        listed = dict(self.ttp.record_list(
+            self.table, self.filtername, ['Number', self.modified_column]))
+        if not self.baseline:
+            ## entities are fetched once they change, not for the baseline
+            self.known = dict((r, row[1]) for r, row in listed.iteritems())
+            self.baseline = True
+            return False
+        changed = [r for r, row in listed.iteritems()
+                   if self.known.get(r) != row[1]]
+        deleted = [r for r in self.known if r not in listed]
+        for recordid, data in self.fetch(changed):
+            old = self.entities.get(recordid)
+            if recordid in self.known:
+                kind = TTPChange.MODIFIED
+                changes = old is not None and diff(old, data) or []
+            else:
+                kind = TTPChange.ADDED
+                changes = []
+            self.known[recordid] = listed[recordid][1]
+            self.entities[recordid] = data
+            self.publish(TTPChange(self.table, kind, recordid,
+                                   data.get(self.number_field),
+                                   self.ttp.from_dict(data), old, changes))
+        for recordid in deleted:
+            old = self.entities.pop(recordid, None)
+            del self.known[recordid]
+            self.publish(TTPChange(self.table, TTPChange.DELETED, recordid,
+                                   (old or {}).get(self.number_field), None,
+                                   old, []))
+        return bool(changed or deleted)
+
+
+class _Failure(object):
+    """Error of a poller, raised by the watches it is published to.
+    """
+    def __init__(self, error):
+        self.error = error
+
+
+_pollers = {}
+_pollers_lock = threading.RLock()
+
+
+def watch(ttp, table, filtername=None, interval=60.0, max_interval=None,
+          timeout=None, modified_column='Date Modified', workers=2):
+    """Generator of :py:class:`TTPChange` objects for a table.
+    See :py:meth:`testtrackpro.TTP.watch`.
+    """
+    if max_interval is None:
+        max_interval = interval * 5
+    key = (ttp._wsdl_url, ttp._cookie, table, filtername, modified_column)
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None:
+            poller = _pollers[key] = _Poller(key, ttp, table, filtername,
+                                             modified_column, workers)
+        queue = poller.subscribe(interval, max_interval)
+    try:
+        while True:
+            try:
+                change = queue.get(True, timeout)
+            except Queue.Empty:
+                return
+            if isinstance(change, _Failure):
+                raise change.error
+            yield change
+    finally:
+        poller.unsubscribe(queue)
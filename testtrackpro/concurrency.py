@@ -0,0 +1,178 @@
+"""Adaptive limit on the number of calls in flight to a TestTrack server.
+
+The TestTrack SOAP service is a single CGI, and it slows down badly, or stops
+answering, when too many requests arrive at once. The right number of
+parallel requests depends on how busy the server is at the time, so a fixed
+worker count is either too careful or too aggressive.
+
+:py:class:`TTPAdaptiveLimiter` adjusts the allowed number of calls in flight
+the same way TCP adjusts its window (additive increase, multiplicative
+decrease). Every call which answers quickly raises the limit a little; a call
+which is much slower than the fastest recent calls, or which fails to get an
+answer at all, cuts it. Calls over the limit wait for one to finish.
+
+Give a client a limiter with the ``limiter`` argument. ``limiter=True`` uses
+the limiter shared by all clients of the same host, including their clones,
+so a :py:class:`~testtrackpro.pool.TTPWorkerPool` with many workers is held
+back to what the server can take:
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', limiter=True)
+    pool = TTPWorkerPool(ttp, workers=32)
+    ...
+    print ttp.limiter.stats()
+"""
+import threading
+import time
+import urlparse
+
+import suds
+
+from testtrackpro.breaker import transport_failure
+
+
+class TTPAdaptiveLimiter(object):
+    """AIMD concurrency limiter.
+
+    :param int initial: Starting limit on calls in flight.
+    :param int minimum: The limit never drops below this.
+    :param int maximum: The limit never grows above this.
+    :param float tolerance: A call is *slow* when it takes longer than this
+                    multiple of the baseline latency, the smoothed fastest
+                    recent call time.
+    :param float backoff: Factor the limit is multiplied by after a slow call.
+    :param float error_backoff: Factor the limit is multiplied by after a
+                    call which failed without an answer from the server, like
+                    a connection error, a timeout or an HTTP error. SOAP
+                    faults are answers, and count as normal calls. Other
+                    errors, like a bad argument, do not change the limit.
+
+    The limit is cut at most once per baseline latency period, so a burst of
+    slow calls caused by a single overload only counts once.
+    """
+    def __init__(self, initial=4, minimum=1, maximum=64, tolerance=2.0,
+                 backoff=0.75, error_backoff=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.error_backoff = error_backoff
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._inflight = 0
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition(threading.Lock())
+        self._stats = dict(calls=0, errors=0, slow=0, increases=0,
+                           decreases=0, waits=0, wait_time=0.0)
+
+    @property
+    def limit(self):
+        """Current number of calls allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def inflight(self):
+        """Number of calls in flight now."""
+        return self._inflight
+
+    @property
+    def baseline(self):
+        """Baseline latency in seconds, or ``None`` before the first call."""
+        return self._baseline
+
+    def stats(self):
+        """Counters as a dict: the ``limit``, ``inflight`` and ``baseline``
+        values, and the number of ``calls``, ``errors``, ``slow`` calls, limit
+        ``increases`` and ``decreases``, calls which had to wait (``waits``)
+        and the total ``wait_time`` in seconds.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update(limit=self.limit, inflight=self._inflight,
+                         baseline=self._baseline)
+        return stats
+
+    def acquire(self):
+        with self._condition:
+            if self._inflight >= int(self._limit):
+                start = time.time()
+                while self._inflight >= int(self._limit):
+                    self._condition.wait()
+                self._stats['waits'] += 1
+                self._stats['wait_time'] += time.time() - start
+            self._inflight += 1
+
+    def release(self, latency, failed=False):
+        ## latency is None for calls which did not reach the server
+        with self._condition:
+            self._inflight -= 1
+            self._stats['calls'] += 1
+            now = time.time()
+            if failed:
+                self._stats['errors'] += 1
+                self._decrease(now, self.error_backoff)
+            elif latency is not None:
+                baseline = self._baseline
+                if baseline is None or latency < baseline:
+                    self._baseline = latency
+                else:
+                    ## let the baseline creep up, so it follows the server
+                    ## when it gets slower for good
+                    self._baseline = baseline + (latency - baseline) * 0.01
+                if baseline and latency > baseline * self.tolerance:
+                    self._stats['slow'] += 1
+                    self._decrease(now, self.backoff)
+                elif self._inflight + 1 >= int(self._limit):
+                    ## only grow while the limit is actually being used
+                    if self._limit < self.maximum:
+                        self._limit = min(self.maximum,
+                                          self._limit + 1.0 / self._limit)
+                        self._stats['increases'] += 1
+            self._condition.notify_all()
+
+    def _decrease(self, now, factor):
+        if now - self._last_decrease < (self._baseline or 0.0):
+            return
+        self._last_decrease = now
+        limit = max(self.minimum, self._limit * factor)
+        if limit < self._limit:
+            self._limit = limit
+            self._stats['decreases'] += 1
+
+    def call(self, func):
+        """Call ``func()`` once there is room under the limit."""
+        self.acquire()
+        start = time.time()
+        latency = None
+        failed = False
+        try:
+            result = func()
+            latency = time.time() - start
+        except suds.WebFault:
+            latency = time.time() - start
+            raise
+        except Exception, e:
+            failed = transport_failure(e)
+            raise
+        finally:
+            self.release(latency, failed)
+        return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(url, **kwdargs):
+    """The :py:class:`TTPAdaptiveLimiter` shared by all clients of the host in
+    ``url``. The keyword arguments are only used when the limiter is created
+    by the first call for a host.
+    """
+    host = urlparse.urlsplit(url).netloc.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = TTPAdaptiveLimiter(**kwdargs)
+    return limiter
@@ -0,0 +1,186 @@
+"""Decode bulk fetches in other processes.
+
+Parsing SOAP replies and building `suds`_ objects from them is pure python
+work, and holds the GIL. However many threads fetch records, a bulk fetch
+decodes them one at a time on a single core. :py:func:`fetch_dicts` has the
+threads only fetch the reply XML, and hands it to a pool of processes which
+decode it straight into the plain python data of
+:py:func:`testtrackpro.entity_to_dict`, so decoding runs on every core and
+only small picklable dicts and lists come back.
+
+:py:func:`testtrackpro.export.export` uses it with ``processes``, or
+``--processes`` on the command line::
+
+    python -m testtrackpro export --url http://hostname/ --project Project \\
+        --username user --table Defect --workers 8 --processes 4 \\
+        --output defects.jsonl
+
+The processes decode with a table of the field types of the WSDL schema,
+built once per call, and do not need their own `suds`_ client. SOAP encoded
+multi-references, elements with an ``href`` to an element with that ``id``
+elsewhere in the body, are resolved like `suds`_ does.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import logging
+import multiprocessing
+import xml.etree.cElementTree as etree
+
+import suds.sax.date
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+_ns_env = '{http://schemas.xmlsoap.org/soap/envelope/}'
+_xsi_type = '{http://www.w3.org/2001/XMLSchema-instance}type'
+_xsi_nil = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+_enc_array_type = '{http://schemas.xmlsoap.org/soap/encoding/}arrayType'
+
+_integers = frozenset(('int', 'short', 'byte', 'integer', 'unsignedInt',
+                       'unsignedShort', 'unsignedByte'))
+_floats = frozenset(('float', 'double', 'decimal'))
+_dates = {
+    'date': lambda text: suds.sax.date.Date(text).date,
+    'dateTime': lambda text: suds.sax.date.DateTime(text).datetime,
+    'time': lambda text: suds.sax.date.Time(text).time,
+}
+
+
+def type_table(ttp):
+    """``{type name: {field name: type name}}`` for the complex types of the
+    WSDL schema of a client.
+    """
+    table = {}
+    for schema_type in ttp._client.wsdl.schema.types.values():
+        if schema_type.builtin() or not schema_type.name:
+            continue
+        fields = dict((child.name, child.resolve().name)
+                      for child, ancestry in schema_type.children())
+        if fields:
+            table[schema_type.name] = fields
+    return table
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _scalar(text, kind):
+    if not text:
+        return None
+    if kind in _integers:
+        return int(text)
+    if kind == 'long':
+        return long(text)
+    if kind == 'boolean':
+        return text in ('true', '1')
+    if kind in _floats:
+        return float(text)
+    if kind in _dates:
+        return _dates[kind](text).isoformat()
+    return unicode(text)
+
+def _decode(element, kind, types, refs):
+    href = element.get('href')
+    if href is not None:
+        ## a multi-reference, the value is the element with the id
+        target = refs.get(href.lstrip('#'))
+        if target is None:
+            raise ValueError("Unresolved reference '%s' in reply." % href)
+        element = target
+    if element.get(_xsi_nil) in ('true', '1'):
+        return None
+    xsi_type = element.get(_xsi_type)
+    if xsi_type:
+        kind = xsi_type.rsplit(':', 1)[-1]
+    array_type = element.get(_enc_array_type)
+    if array_type or (kind and kind.startswith('ArrayOf')):
+        if array_type:
+            item = array_type.rsplit(':', 1)[-1].split('[', 1)[0]
+        else:
+            item = kind[7:]
+        return [_decode(child, item, types, refs) for child in element]
+    fields = types.get(kind)
+    if fields is None:
+        return _scalar(element.text, kind)
+    data = {'__type__': kind}
+    for child in element:
+        name = _local(child.tag)
+        data[name] = _decode(child, fields.get(name), types, refs)
+    return data
+
+def decode_reply(reply, types):
+    """Decode the result of a SOAP reply into
+    :py:func:`testtrackpro.entity_to_dict` data.
+
+    :param str reply: Reply XML, as returned by a client with the `suds`_
+                    ``retxml`` option.
+    :param dict types: :py:func:`type_table` of the client's schema.
+    """
+    body = etree.fromstring(reply).find(_ns_env + 'Body')
+    response = body[0]
+    if not len(response):
+        return None
+    ## multi-referenced elements follow the response in the body
+    refs = dict((child.get('id'), child) for child in body[1:]
+                if child.get('id') is not None)
+    return _decode(response[0], None, types, refs)
+
+
+_types = None
+
+def _init_process(types):
+    global _types
+    _types = types
+
+def _decode_item(item):
+    key, reply = item
+    return key, decode_reply(reply, _types)
+
+
+def fetch_dicts(ttp, method_name, keys, workers=4, processes=None,
+                chunksize=4):
+    """Call ``method_name`` for every key, yielding ``(key, data)`` with the
+    :py:func:`testtrackpro.entity_to_dict` data of the result as the calls
+    finish.
+
+    :param TTP ttp: Logged in client.
+    :param str method_name: Method taking a key, like
+                    ``'getDefectByRecordID'``.
+    :param list keys: Keys, like record ids.
+    :param int workers: Number of calls in flight.
+    :param int processes: Number of decoding processes. Defaults to the
+                    number of cores.
+    :param int chunksize: Replies handed to a process at a time.
+
+    Keys whose call fails with a server fault, like records deleted since
+    they were listed, are logged and left out. The first other error of a
+    call is raised once the replies fetched before it are decoded.
+    """
+    raw = ttp.clone()
+    raw._client.set_options(retxml=True)
+    errors = []
+
+    def replies():
+        fetch = lambda client, key: getattr(client, method_name)(key)
+        for key, reply, error in TTPWorkerPool(raw, workers).imap_unordered(
+                fetch, keys):
+            if error:
+                if (isinstance(error, testtrackpro.TTPAPIError)
+                        and not isinstance(error,
+                                           testtrackpro.TTPConnectionError)):
+                    logging.warn("Could not fetch %s %s: %s", method_name,
+                                 key, error)
+                    continue
+                errors.append(error)
+                return
+            yield key, reply
+
+    pool = multiprocessing.Pool(processes, _init_process, (type_table(ttp),))
+    try:
+        for item in pool.imap_unordered(_decode_item, replies(), chunksize):
+            yield item
+    finally:
+        pool.terminate()
+        pool.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,214 @@
+"""Streaming bulk export of TestTrack records.
+
+:py:func:`export` writes every record of a table, or of a server filter's
+results, to JSON Lines or CSV. Records are fetched by a pool of workers (see
+:py:mod:`testtrackpro.pool`) and written as they arrive, so memory use stays
+constant no matter how many records are exported. A checkpoint file makes an
+interrupted export resumable, and progress and throughput are reported while
+it runs.
+
+The same functionality is available on the command line::
+
+    python -m testtrackpro export --url http://hostname/ --project Project \\
+        --username user --table Defect --format jsonl --workers 8 \\
+        --output defects.jsonl --checkpoint defects.ckpt
+
+The order of the exported records is the order they were fetched in, not the
+record number order. Records which can not be fetched, like those deleted
+while the export runs, are logged and left out. Connection errors stop the
+export, to be resumed from its checkpoint.
+"""
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+FORMATS = ('jsonl', 'csv')
+
+
+class _Checkpoint(object):
+    """Append-only log of exported record ids.
+
+    Every batch is written as its record ids followed by ``@<offset>``, the
+    size of the output file once the batch was flushed. On resume, only ids
+    before the last offset marker count as done, and the output is truncated
+    back to that offset, dropping any partially written batch.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.offset = 0
+        if os.path.exists(path):
+            pending = []
+            with open(path) as log:
+                for line in log:
+                    line = line.strip()
+                    if line.startswith('@'):
+                        self.offset = int(line[1:])
+                        self.done.update(pending)
+                        pending = []
+                    elif line:
+                        pending.append(int(line))
+        self._log = open(path, 'a')
+
+    def reset(self):
+        """Start over, for an output file which is gone."""
+        self.done = set()
+        self.offset = 0
+        self._log.close()
+        self._log = open(self.path, 'w')
+
+    def commit(self, recordids, offset):
+        self._log.write(''.join('%d\n' % r for r in recordids))
+        self._log.write('@%d\n' % offset)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self.done.update(recordids)
+
+    def close(self):
+        self._log.close()
+
+
+class _Progress(object):
+    def __init__(self, total, initial, stream, every):
+        self.total = total
+        self.initial = initial
+        self.stream = stream
+        self.every = every
+        self.start = self.last = time.time()
+        self.count = initial
+
+    def update(self, count, final=False):
+        self.count = count
+        now = time.time()
+        if not self.stream or (not final and now - self.last < self.every):
+            return
+        self.last = now
+        elapsed = now - self.start
+        rate = elapsed and (count - self.initial) / elapsed or 0.0
+        eta = rate and (self.total - count) / rate or 0.0
+        self.stream.write('exported %d/%d records, %.1f records/s, '
+                          '%.0fs elapsed, %.0fs remaining\n' % (
+                              count, self.total, rate, elapsed, eta))
+        self.stream.flush()
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if value is None:
+        return ''
+    return value
+
+
+def export(ttp, table, output, format='jsonl', filtername=None, workers=4,
+           checkpoint=None, progress=sys.stderr, progress_interval=5.0,
+           batch_size=100, processes=None):
+    """Export the records of a table.
+
+    :param TTP ttp: Logged in client.
+    :param str table: Table name, like ``'Defect'``.
+    :param str output: Output file path. Appended to when resuming.
+    :param str format: ``'jsonl'`` for one JSON object per line (as
+                    :py:func:`testtrackpro.entity_to_dict` data), or
+                    ``'csv'`` for one row per record, with array fields
+                    encoded as JSON.
+    :param str filtername: Only export the records passing this server filter.
+    :param int workers: Number of records fetched in parallel.
+    :param str checkpoint: Checkpoint file path. When given, an interrupted
+                    export started again with the same arguments continues
+                    where it stopped.
+    :param progress: Stream for progress reports, or ``None``.
+    :param float progress_interval: Seconds between progress reports.
+    :param int batch_size: Records written between checkpoints.
+    :param int processes: Decode the replies in this many processes, see
+                    :py:mod:`testtrackpro.decode`. The default decodes them
+                    in the fetching threads.
+
+    Returns the number of records written by this call.
+    """
+    if format not in FORMATS:
+        raise ValueError("format must be one of: %s" % ', '.join(FORMATS))
+    ckpt = checkpoint and _Checkpoint(checkpoint) or None
+    recordids = [r for r, row in ttp.record_list(table, filtername)]
+    todo = recordids
+    if ckpt:
+        todo = [r for r in recordids if r not in ckpt.done]
+
+    if ckpt and ckpt.offset and (not os.path.exists(output) or
+                                 os.path.getsize(output) < ckpt.offset):
+        logging.warn("Export output %s is missing or shorter than its "
+                     "checkpoint, exporting everything again.", output)
+        ckpt.reset()
+        todo = recordids
+    mode = 'wb'
+    if ckpt and ckpt.offset:
+        mode = 'r+b'
+    out = open(output, mode)
+    if ckpt:
+        out.truncate(ckpt.offset)
+        out.seek(ckpt.offset)
+
+    columns = None
+    writer = None
+    if format == 'csv':
+        columns = [name for name, value in ttp.create('C' + table)]
+        writer = csv.writer(out)
+        if not out.tell():
+            writer.writerow(columns)
+
+    method_name = 'get%sByRecordID' % table
+    fetch = lambda client, recordid: testtrackpro.entity_to_dict(
+        getattr(client, method_name)(recordid))
+
+    count = len(recordids) - len(todo)
+    report = _Progress(len(recordids), count, progress, progress_interval)
+    written = 0
+    batch = []
+    try:
+        if processes:
+            from testtrackpro.decode import fetch_dicts
+            results = ((recordid, data, None) for recordid, data in
+                       fetch_dicts(ttp, method_name, todo, workers,
+                                   processes))
+        else:
+            results = TTPWorkerPool(ttp, workers).imap_unordered(fetch, todo)
+        for recordid, data, error in results:
+            if error:
+                if (isinstance(error, testtrackpro.TTPAPIError)
+                        and not isinstance(error,
+                                           testtrackpro.TTPConnectionError)):
+                    ## deleted between the record list and the fetch
+                    logging.warn("Export could not fetch %s record %s: %s",
+                                 table, recordid, error)
+                    continue
+                raise error
+            if writer:
+                writer.writerow([_csv_value(data.get(c)) for c in columns])
+            else:
+                out.write(json.dumps(data, separators=(',', ':')))
+                out.write('\n')
+            batch.append(recordid)
+            written += 1
+            if len(batch) >= batch_size:
+                out.flush()
+                if ckpt:
+                    ckpt.commit(batch, out.tell())
+                batch = []
+            report.update(count + written)
+        out.flush()
+        if ckpt and batch:
+            ckpt.commit(batch, out.tell())
+        report.update(count + written, final=True)
+    finally:
+        out.close()
+        if ckpt:
+            ckpt.close()
+    return written
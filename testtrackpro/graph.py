@@ -0,0 +1,221 @@
+"""Load records together with the records they link to.
+
+Walking from a defect to its linked test cases and on to their test runs one
+``get`` call at a time makes one round trip per record, and fetches records
+reached by more than one path several times.
+:py:meth:`TTP.load_graph <testtrackpro.TTP.load_graph>` follows the
+relationships level by level instead: all the records referred to by one
+level are gathered, de-duplicated and fetched in parallel before moving on
+to the next.
+
+Relationships are entity fields, declared per table:
+
+* ``linkedrecords`` (or any array of ``CLinkedRecord``) follows the links to
+  other records. Use ``('linkedrecords', 'TestRun')`` to only follow links to
+  one table.
+* A record number field, like the test run ``testcasenumber``, follows the
+  reference to the record with that number.
+
+Events, attachments and other arrays which are part of the entity itself
+need no extra calls; they are in :py:attr:`TTPGraphNode.entity`.
+
+.. code:: python
+
+    graph = ttp.load_graph('Defect', [12, 15], {
+        'Defect': ['linkedrecords'],
+        'TestCase': [('linkedrecords', 'TestRun')],
+    })
+    for defect in graph.roots:
+        for testcase in defect.linked('TestCase'):
+            for run in testcase.linked('TestRun'):
+                print defect.number, testcase.number, run.entity.status
+"""
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+
+class TTPGraphNode(object):
+    """A record in a :py:class:`TTPGraph`.
+
+    ``links`` is a list of ``(field, linktype, node)`` tuples, for the
+    relationships which were followed from this record. ``linktype`` is the
+    ``CLinkedRecord`` link type, or ``None`` for record number fields.
+    """
+    __slots__ = ('table', 'entity', 'links')
+
+    def __init__(self, table, entity):
+        self.table = table
+        self.entity = entity
+        self.links = []
+
+    @property
+    def recordid(self):
+        return self.entity.recordid
+
+    @property
+    def number(self):
+        return getattr(self.entity, testtrackpro.table_number_field(self.table),
+                       None)
+
+    def linked(self, table=None, field=None):
+        """The linked nodes, optionally only those of a table or reached
+        through a field.
+        """
+        return [node for f, linktype, node in self.links
+                if (table is None or node.table == table) and
+                (field is None or f == field)]
+
+    def __repr__(self):
+        return '<TTPGraphNode %s %s: %d links>' % (
+            self.table, self.number, len(self.links))
+
+
+class TTPGraph(object):
+    """Records loaded by :py:meth:`testtrackpro.TTP.load_graph`.
+
+    ``roots`` are the nodes of the starting records, ``nodes`` a dict of all
+    nodes by ``(table, recordid)``, and ``errors`` a list of
+    ``(table, reference, error)`` for records which could not be fetched,
+    where ``reference`` is ``('recordid', value)`` or ``('number', value)``.
+    """
+    def __init__(self):
+        self.roots = []
+        self.nodes = {}
+        self.errors = []
+        self.calls = 0
+
+    def node(self, table, recordid):
+        """The node of a record, or ``None`` if it was not loaded."""
+        return self.nodes.get((table, recordid))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return self.nodes.itervalues()
+
+
+def _table_key(name):
+    ## link tables may be display names, like 'Test Case'
+    return (name or '').replace(' ', '')
+
+
+def _relations(spec, table):
+    for relation in spec.get(table, ()):
+        if isinstance(relation, basestring):
+            yield relation, None
+        else:
+            yield relation[0], _table_key(relation[1])
+
+
+def _references(node, spec, tables):
+    """``(field, linktype, table, (kind, value))`` for the relationships of a
+    node.
+    """
+    for field, only in _relations(spec, node.table):
+        value = getattr(node.entity, field, None)
+        if isinstance(value, list):
+            for link in value:
+                table = _table_key(getattr(link, 'table', None))
+                recordid = getattr(link, 'recordid', None)
+                if table and recordid and (only is None or table == only):
+                    yield (field, getattr(link, 'linktype', None), table,
+                           ('recordid', recordid))
+        elif value and field.endswith('number'):
+            table = tables.get(field)
+            if table and (only is None or table == only):
+                yield field, None, table, ('number', value)
+
+
+def load_graph(ttp, table, roots, spec, depth=None, workers=4):
+    """Load a graph of records. See :py:meth:`testtrackpro.TTP.load_graph`.
+    """
+    graph = TTPGraph()
+    ## record number field name -> table, for every table the service has
+    tables = {}
+    for service in ttp._client.wsdl.services:
+        for port in service.ports:
+            for name in port.methods:
+                if name.startswith('get') and name.endswith('ByRecordID'):
+                    t = name[3:-10]
+                    tables[testtrackpro.table_number_field(t)] = t
+    by_number = {}  ## (table, number) -> node
+    pool = TTPWorkerPool(ttp, workers)
+
+    def fetch(client, item):
+        table, (kind, value) = item
+        if kind == 'number':
+            return getattr(client, 'get' + table)(value)
+        return getattr(client, 'get%sByRecordID' % table)(value)
+
+    def add(table, entity):
+        key = (table, entity.recordid)
+        node = graph.nodes.get(key)
+        if node is None:
+            node = graph.nodes[key] = TTPGraphNode(table, entity)
+            if node.number is not None:
+                by_number[(table, node.number)] = node
+            return node, True
+        return node, False
+
+    def lookup(table, ref):
+        kind, value = ref
+        if kind == 'number':
+            return by_number.get((table, value))
+        return graph.nodes.get((table, value))
+
+    def load(items):
+        loaded = {}
+        if not items:
+            return loaded
+        graph.calls += len(items)
+        for item, entity, error in pool.imap_unordered(fetch, items):
+            if error:
+                graph.errors.append((item[0], item[1], error))
+            else:
+                loaded[item] = entity
+        return loaded
+
+    wanted = []
+    for root in roots:
+        if isinstance(root, (int, long)):
+            item = (table, ('number', root))
+            if item not in wanted:
+                wanted.append(item)
+    loaded = load(wanted)
+    level = []
+    ## roots keep the order they were given in
+    for root in roots:
+        if isinstance(root, (int, long)):
+            entity = loaded.get((table, ('number', root)))
+            if entity is None:
+                continue
+        else:
+            entity = root
+        node, new = add(table, entity)
+        graph.roots.append(node)
+        if new:
+            level.append(node)
+
+    done = 0
+    while level and (depth is None or done < depth):
+        done += 1
+        edges = []
+        wanted = set()
+        for node in level:
+            for field, linktype, target, ref in _references(node, spec,
+                                                            tables):
+                edges.append((node, field, linktype, target, ref))
+                if lookup(target, ref) is None:
+                    wanted.add((target, ref))
+        loaded = load(sorted(wanted))
+        level = []
+        for item, entity in loaded.iteritems():
+            node, new = add(item[0], entity)
+            if new:
+                level.append(node)
+        for node, field, linktype, target, ref in edges:
+            other = lookup(target, ref)
+            if other is not None:
+                node.links.append((field, linktype, other))
+    return graph
@@ -0,0 +1,270 @@
+"""Hedged read calls.
+
+The TestTrack CGI has a long latency tail: most ``getDefect`` calls answer
+in a fraction of a second, but a few take seconds, and waiting for them
+longer does not make them any faster. With a :py:class:`TTPHedger`, a read
+call which has not answered after the ``percentile`` of the recent call
+latencies sends a second, identical request on another session. The first
+response wins, and the other one is discarded when it arrives.
+
+Only read calls are hedged: the dynamically dispatched methods whose name
+starts with ``get``. The extra requests are capped by a ``budget``, the
+share of calls which may be hedged, so a slow server does not get twice
+the load. Hedging starts once ``min_samples`` latencies were seen.
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', hedge=True)
+    defect = ttp.getDefect(1234)
+    print ttp.hedger.stats()
+
+``hedge=True`` uses the hedger shared by all clients of the same host. The
+requests of a hedged call are made on clones of the client (see
+:py:meth:`testtrackpro.TTP.clone`), by threads of the hedger, and both are
+kept for reuse. The client itself is free again as soon as the call returns.
+Server faults are responses, and win like results do. A request which fails
+to connect leaves the call to the other request, if there is one. A call
+waits no longer than the timeout of the client, or its deadline.
+"""
+import Queue
+import collections
+import threading
+import time
+import urlparse
+
+import testtrackpro
+
+
+class _Race(object):
+    __slots__ = ('cond', 'pending', 'done', 'result', 'error', 'hedge_won')
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = 0
+        self.done = False
+        self.result = None
+        self.error = None
+        self.hedge_won = False
+
+
+class _Senders(object):
+    """Threads sending the requests of hedged calls. Threads which are done
+    wait for the next request, up to ``idle`` of them.
+    """
+    def __init__(self, idle):
+        self.idle = idle
+        self._waiting = 0
+        self._tasks = Queue.Queue()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._waiting:
+                self._waiting -= 1
+                self._tasks.put((func, args))
+                return
+        thread = threading.Thread(target=self._work, name='TTPHedger',
+                                  args=(func, args))
+        thread.daemon = True
+        thread.start()
+
+    def _work(self, func, args):
+        while True:
+            func(*args)
+            with self._lock:
+                if self._waiting >= self.idle:
+                    return
+                self._waiting += 1
+            func, args = self._tasks.get()
+
+
+class TTPHedger(object):
+    """Hedging of the read calls of clients.
+
+    :param float percentile: Share of the recent calls which answer before
+                    a call is hedged.
+    :param float budget: Most hedged calls, as a share of all calls.
+    :param int burst: Most hedges that may be sent in a row, when the
+                    budget was not used for a while.
+    :param int min_samples: Latencies needed before calls are hedged.
+    :param int window: Number of recent latencies the percentile is of.
+    :param float min_delay: Least seconds before a call is hedged.
+    :param int sessions: Idle sessions kept for reuse, per client session.
+    :param int threads: Idle threads kept for reuse.
+    """
+    def __init__(self, percentile=0.95, budget=0.05, burst=10,
+                 min_samples=20, window=1000, min_delay=0.0, sessions=4,
+                 threads=8):
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.sessions = sessions
+        self._latencies = collections.deque(maxlen=window)
+        self._delay = None
+        self._tokens = float(burst)
+        self._senders = _Senders(threads)
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('calls', 'hedged', 'hedge_wins',
+                                     'discarded', 'over_budget'), 0)
+
+    def stats(self):
+        """Counters as a dict: the ``calls`` made, the ones ``hedged``, the
+        hedged calls the second request answered first, ``hedge_wins``, the
+        losing responses ``discarded``, the calls which were slow enough to
+        hedge but ``over_budget``, and the current hedging ``delay`` in
+        seconds, ``None`` until there are ``min_samples`` latencies.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['delay'] = self._delay
+        return stats
+
+    def _record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) >= self.min_samples:
+                latencies = sorted(self._latencies)
+                self._delay = max(self.min_delay, latencies[
+                    min(len(latencies) - 1,
+                        int(len(latencies) * self.percentile))])
+
+    def _responded(self, start, error):
+        ## faults are responses too. Requests which failed to connect or
+        ## timed out say nothing about the latency of the server.
+        if not isinstance(error, testtrackpro.TTPConnectionError):
+            self._record(time.time() - start)
+
+    def _session(self, ttp):
+        ## idle clones by session, shared with the clones of the client
+        key = (ttp._cookie, ttp._client.options.retxml)
+        with self._lock:
+            idle = ttp._hedge_sessions.get(key)
+            if idle:
+                return key, idle.pop()
+        return key, ttp.clone()
+
+    def _release(self, ttp, key, session):
+        with self._lock:
+            idle = ttp._hedge_sessions.setdefault(key, [])
+            if len(idle) < self.sessions:
+                idle.append(session)
+
+    def _send(self, ttp, key, session, race, hedge, method_name, args,
+              kwdargs):
+        result = error = None
+        start = time.time()
+        try:
+            result = session._call_method(
+                getattr(session._client.service, method_name),
+                *args, **kwdargs)
+        except Exception, e:
+            error = e
+        finally:
+            session._deadline = None
+            self._release(ttp, key, session)
+        self._responded(start, error)
+        responded = not isinstance(error, testtrackpro.TTPConnectionError)
+        with race.cond:
+            race.pending -= 1
+            if race.done:
+                with self._lock:
+                    self._stats['discarded'] += 1
+                return
+            if responded:
+                race.done = True
+                race.result, race.error = result, error
+                race.hedge_won = hedge
+                race.cond.notify_all()
+            elif not race.pending:
+                ## every request failed to connect, raise the first error
+                race.done = True
+                race.error = race.error or error
+                race.cond.notify_all()
+            elif race.error is None:
+                race.error = error
+
+    def _start(self, ttp, race, hedge, method_name, args, kwdargs):
+        ## in the calling thread, with race.cond held. Sessions are taken
+        ## here, as the client may be in use again while the loser runs.
+        key, session = self._session(ttp)
+        session._deadline = ttp._deadline
+        race.pending += 1
+        self._senders.submit(self._send, ttp, key, session, race, hedge,
+                             method_name, args, kwdargs)
+
+    def call(self, ttp, method_name, method, *args, **kwdargs):
+        """Call a read method of ``ttp``, hedging it when it is slow.
+        ``method`` is the `suds`_ method, used as is when the call can not
+        be hedged.
+
+        .. _suds: https://fedorahosted.org/suds/
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+            delay = self._delay
+            if self._tokens < 1:
+                delay = None
+        if delay is None:
+            start = time.time()
+            try:
+                result = ttp._call_method(method, *args, **kwdargs)
+            except Exception, e:
+                self._responded(start, e)
+                raise
+            self._responded(start, None)
+            return result
+
+        race = _Race()
+        start = time.time()
+        limit = start + ttp._call_timeout()
+        with race.cond:
+            self._start(ttp, race, False, method_name, args, kwdargs)
+            hedge_at = min(start + delay, limit)
+            ## in short waits, so it stays interruptable
+            while not race.done and time.time() < hedge_at:
+                race.cond.wait(min(0.5, hedge_at - time.time()))
+            if not race.done and hedge_at < limit:
+                with self._lock:
+                    hedge = self._tokens >= 1
+                    if hedge:
+                        self._tokens -= 1
+                        self._stats['hedged'] += 1
+                    else:
+                        self._stats['over_budget'] += 1
+                if hedge:
+                    self._start(ttp, race, True, method_name, args, kwdargs)
+            while not race.done:
+                remaining = limit - time.time()
+                if remaining <= 0:
+                    ## the requests still running are discarded
+                    race.done = True
+                    raise testtrackpro.TTPConnectionError(
+                        "Timed out waiting for the hedged call.")
+                race.cond.wait(min(0.5, remaining))
+        if race.hedge_won:
+            with self._lock:
+                self._stats['hedge_wins'] += 1
+        if race.error is not None:
+            raise race.error
+        return race.result
+
+
+_hedgers = {}
+_hedgers_lock = threading.Lock()
+
+
+def shared_hedger(url, **kwdargs):
+    """The :py:class:`TTPHedger` shared by all clients of the host in
+    ``url``. The keyword arguments are only used when the hedger is created
+    by the first call for a host.
+    """
+    host = urlparse.urlsplit(url).netloc.lower()
+    with _hedgers_lock:
+        hedger = _hedgers.get(host)
+        if hedger is None:
+            hedger = _hedgers[host] = TTPHedger(**kwdargs)
+    return hedger
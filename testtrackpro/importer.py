@@ -0,0 +1,254 @@
+"""High throughput bulk import of records.
+
+Migrating from another tracker means a very large number of
+``ttp.create("CDefect")`` and ``ttp.addDefect`` calls. :py:func:`bulk_import`
+adds a stream of records concurrently, at an optional maximum rate, and keeps
+an on-disk journal of which source record became which TestTrack record
+number. Running the same import again after a crash skips everything already
+added, so it does not create duplicates.
+
+Each worker builds its entities from a single template made with
+:py:meth:`TTP.create <testtrackpro.TTP.create>`, reset and refilled for every
+record, instead of building a new entity from the schema each time.
+
+.. code:: python
+
+    from testtrackpro.importer import bulk_import
+
+    records = ({'id': row['key'], 'summary': row['title'],
+                'product': 'Widget', 'priority': row['prio']}
+               for row in source_rows())
+    stats = bulk_import(ttp, 'Defect', records, 'migration.journal',
+                        workers=8, rate=50)
+
+On the command line, reading JSON Lines or CSV::
+
+    python -m testtrackpro import --url http://hostname/ --project Project \\
+        --username user --table Defect --input defects.jsonl \\
+        --journal defects.journal --workers 8 --rate 50
+
+Journal
+-------
+
+The journal is a text file with one line per event: ``P <source id>`` is
+written as an add is handed to the HTTP transport, ``D <source id> <number>``
+once it succeeded and ``E <source id> <message>`` if it failed. A record with
+a ``P`` line but no ``D`` or ``E`` line was in flight when the import
+stopped, and may or may not have been added. These are reported as
+*uncertain* and skipped on restart unless ``retry_uncertain`` is set, so
+check them by hand first. Adds which fail before they are sent, like those
+rejected by an open circuit breaker, leave no line and are tried again on
+restart.
+"""
+import os
+import sys
+import threading
+import time
+
+import suds.plugin
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+
+class _Journal(object):
+    def __init__(self, path):
+        self.done = {}       ## source id -> number
+        self.failed = {}     ## source id -> message
+        self.uncertain = set()
+        pending = set()
+        if os.path.exists(path):
+            with open(path) as journal:
+                for line in journal:
+                    parts = line.rstrip('\n').split(' ', 2)
+                    if len(parts) < 2:
+                        continue  ## torn final line
+                    kind, source = parts[0], parts[1].decode('string_escape')
+                    if kind == 'P':
+                        pending.add(source)
+                    elif kind == 'D' and len(parts) == 3:
+                        pending.discard(source)
+                        self.done[source] = int(parts[2])
+                        self.failed.pop(source, None)
+                    elif kind == 'E':
+                        pending.discard(source)
+                        self.failed[source] = len(parts) == 3 and parts[2] or ''
+        self.uncertain = pending
+        self._lock = threading.Lock()
+        self._journal = open(path, 'a')
+
+    def _write(self, kind, source, extra=None):
+        ## source ids may be any text, keep each entry on a single line
+        line = '%s %s' % (kind, str(source).encode('string_escape')
+                          .replace(' ', '\\x20'))
+        if extra is not None:
+            line += ' ' + str(extra).replace('\n', ' ')
+        with self._lock:
+            self._journal.write(line + '\n')
+            self._journal.flush()
+
+    def pending(self, source):
+        self._write('P', source)
+
+    def added(self, source, number):
+        self._write('D', source, number)
+
+    def error(self, source, message):
+        self._write('E', source, message)
+
+    def close(self):
+        self._journal.close()
+
+
+class _SendingMark(suds.plugin.MessagePlugin):
+    """Journals the pending mark of the add of a worker's client when the
+    request is about to be sent, and not before.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.source = None
+
+    def sending(self, context):
+        if self.source is not None:
+            self.log.pending(self.source)
+            self.source = None
+
+
+class _RateLimiter(object):
+    """Spaces calls at least ``1/rate`` seconds apart across all threads.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next = time.time()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            delay = self.next - now
+            self.next = max(self.next, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _source_key(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
+
+def bulk_import(ttp, table, records, journal, workers=4, rate=None,
+                id_field='id', defaults=None, retry_uncertain=False,
+                progress=sys.stderr, progress_interval=5.0):
+    """Add records to a table, concurrently and idempotently.
+
+    :param TTP ttp: Logged in client.
+    :param str table: Table name, like ``'Defect'``.
+    :param records: Iterable of dicts. Each holds the source record id under
+                    ``id_field`` and the entity fields to set. Field values
+                    may be plain values, or entity data as returned by
+                    :py:func:`testtrackpro.entity_to_dict` for arrays and
+                    nested entities. Dates may be ISO 8601 strings.
+    :param str journal: Journal file path.
+    :param int workers: Number of adds in flight at once.
+    :param float rate: Maximum number of adds per second, or ``None``.
+    :param str id_field: Key of the source record id in each record.
+    :param dict defaults: Field values applied to every record before its
+                    own fields, like ``{'product': 'Widget'}``.
+    :param bool retry_uncertain: Add records again which were in flight when
+                    a previous run stopped. See the module documentation.
+    :param progress: Stream for progress and error reports, or ``None``.
+    :param float progress_interval: Seconds between progress reports.
+
+    Returns a dict with the number of records ``added``, ``skipped`` (already
+    in the journal), ``failed`` and ``uncertain``, the ``elapsed`` seconds,
+    the ``rate`` of adds per second, and ``errors``, a list of
+    ``(source id, message)`` for this run's failures.
+    """
+    log = _Journal(journal)
+    limiter = rate and _RateLimiter(rate) or None
+    method_name = 'add' + table
+    type_name = 'C' + table
+    local = threading.local()
+    stats = {'added': 0, 'skipped': 0, 'failed': 0,
+             'uncertain': len(log.uncertain), 'errors': []}
+    skip = set(log.done)
+    if not retry_uncertain:
+        skip.update(log.uncertain)
+
+    def todo():
+        for record in records:
+            source = _source_key(record[id_field])
+            if source in skip:
+                stats['skipped'] += 1
+                continue
+            yield source, record
+
+    def add(client, item):
+        source, record = item
+        template = getattr(local, 'template', None)
+        if template is None:
+            entity = client.create(type_name)
+            blank = list(entity)
+            mark = _SendingMark(log)
+            ## the worker's clone gets a plugin list of its own
+            client._client.set_options(
+                plugins=list(client._client.options.plugins) + [mark])
+            local.template = template = (entity, blank, mark)
+        entity, blank, mark = template
+        for name, value in blank:
+            setattr(entity, name, value)
+        entity.recordid = 0
+        if defaults:
+            client.from_dict(defaults, entity)
+        client.from_dict(dict((k, v) for k, v in record.iteritems()
+                              if k != id_field), entity)
+        if limiter:
+            limiter.wait()
+        mark.source = source
+        try:
+            number = getattr(client, method_name)(entity)
+        except testtrackpro.TTPConnectionError:
+            ## uncertain when sent, which left a pending mark. When failed
+            ## before sending, there is no mark and it is tried again.
+            mark.source = None
+            raise
+        except testtrackpro.TTPAPIError, e:
+            mark.source = None
+            log.error(source, e)
+            raise
+        log.added(source, number)
+        return number
+
+    start = last = time.time()
+    try:
+        pool = TTPWorkerPool(ttp, workers)
+        for item, number, error in pool.imap_unordered(add, todo()):
+            if error:
+                if item is None:
+                    ## error reading the records
+                    raise error
+                stats['failed'] += 1
+                stats['errors'].append((item[0], str(error)))
+                if progress:
+                    progress.write("import of %s failed: %s\n" % (
+                        item[0], error))
+            else:
+                stats['added'] += 1
+            now = time.time()
+            if progress and now - last >= progress_interval:
+                last = now
+                progress.write("added %d, failed %d, skipped %d, "
+                               "%.1f records/s\n" % (
+                                   stats['added'], stats['failed'],
+                                   stats['skipped'],
+                                   stats['added'] / (now - start)))
+    finally:
+        log.close()
+    stats['elapsed'] = time.time() - start
+    stats['rate'] = stats['elapsed'] and stats['added'] / stats['elapsed'] or 0.0
+    if progress:
+        progress.write("added %(added)d, failed %(failed)d, skipped "
+                       "%(skipped)d, uncertain %(uncertain)d in "
+                       "%(elapsed).1fs, %(rate).1f records/s\n" % stats)
+    return stats
@@ -0,0 +1,202 @@
+"""Entities which are only fetched when they are needed.
+
+Code which lists records often fetches every full entity "just in case", but
+only looks further at a few of them.
+``ttp.get_fields(table, ids, columns, lazy=True)`` (see
+:py:meth:`TTP.get_fields <testtrackpro.TTP.get_fields>`) returns
+:py:class:`TTPLazyEntity` proxies instead. The listed columns are available
+at once, and the full entity is fetched the first time any other field is
+read.
+
+Entities are fetched in batches: reading a field of one proxy fetches it and
+the next proxies of the list in parallel, and the batch after that is
+prefetched in the background, so walking the list in order rarely waits.
+
+.. code:: python
+
+    for defect in ttp.get_fields('Defect', columns=['Status'], lazy=True):
+        if defect.status == 'Open':
+            ## fetches the entity, with the next ones
+            print defect.number, defect.eventlist[-1].notes
+            with defect.edit() as entity:
+                entity.priority = 'Immediate'
+
+:py:meth:`TTPLazyEntity.edit` calls ``edit<Table>ByRecordID``, and returns
+the usual edit context entity (see :py:func:`testtrackpro.edit_lock_failed`
+and friends). The proxy then reads its fields from the edited entity.
+"""
+import threading
+
+import testtrackpro
+from testtrackpro.mirror import column_name
+from testtrackpro.pool import TTPWorkerPool
+
+
+class _Loader(object):
+    """Fetches the entities of a list of proxies, in batches.
+    """
+    def __init__(self, ttp, table, batch_size, workers, prefetch):
+        self.ttp = ttp
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.workers = workers
+        self.prefetch = prefetch
+        self.method_name = 'get%sByRecordID' % table
+        self.proxies = []
+        self.pending = {}   ## index -> threading.Event
+        self.errors = {}    ## index -> exception
+        self.lock = threading.Lock()
+        self.prefetcher = None
+
+    def _claim(self, start):
+        ## with the lock held
+        batch = []
+        index = start
+        while len(batch) < self.batch_size and index < len(self.proxies):
+            proxy = self.proxies[index]
+            if (proxy._entity is None and index not in self.pending and
+                    index not in self.errors):
+                self.pending[index] = threading.Event()
+                batch.append(index)
+            index += 1
+        return batch
+
+    def _fetch(self, batch, client=None):
+        ## client is the one to fetch with when not in parallel, the client
+        ## of the loader by default
+        fetch = lambda client, index: getattr(client, self.method_name)(
+            self.proxies[index].recordid)
+        if self.workers > 1 and len(batch) > 1:
+            results = TTPWorkerPool(self.ttp, self.workers).imap_unordered(
+                fetch, batch)
+        else:
+            ## the single client may only be used from the calling thread
+            results = []
+            for index in batch:
+                try:
+                    results.append((index, fetch(client or self.ttp, index),
+                                    None))
+                except Exception, e:
+                    results.append((index, None, e))
+        for index, entity, error in results:
+            with self.lock:
+                if error:
+                    self.errors[index] = error
+                elif self.proxies[index]._entity is None:
+                    self.proxies[index]._entity = entity
+                self.pending.pop(index).set()
+
+    def _start_prefetch(self, start):
+        with self.lock:
+            if self.prefetcher is not None and self.prefetcher.is_alive():
+                return
+            batch = self._claim(start)
+            if not batch:
+                return
+            ## the background thread gets a client of its own
+            self.prefetcher = threading.Thread(
+                target=self._fetch, args=(batch, self.ttp.clone()),
+                name='TTPLazyEntity-prefetch')
+            self.prefetcher.daemon = True
+            self.prefetcher.start()
+
+    def load(self, index):
+        proxy = self.proxies[index]
+        batch = None
+        with self.lock:
+            if proxy._entity is None and index not in self.errors:
+                event = self.pending.get(index)
+                if event is None:
+                    batch = self._claim(index)
+        if batch:
+            self._fetch(batch)
+        elif proxy._entity is None and index not in self.errors:
+            event.wait()
+        if self.prefetch and self.workers > 1:
+            self._start_prefetch(index + self.batch_size)
+        error = self.errors.get(index)
+        if error is not None:
+            raise error
+        return proxy._entity
+
+
+class TTPLazyEntity(object):
+    """Proxy for an entity which is fetched on first use.
+
+    ``recordid``, ``number`` and the listed columns are available without
+    fetching the entity; columns by the names they were asked for,
+    ``proxy['Assigned To']``, or as attributes named like the entity fields,
+    ``proxy.assignedto``. Reading any other attribute fetches the entity.
+    """
+    __slots__ = ('recordid', 'number', '_values', '_entity', '_loader',
+                 '_index')
+
+    def __init__(self, loader, index, recordid, number, values):
+        self.recordid = recordid
+        self.number = number
+        self._values = values
+        self._entity = None
+        self._loader = loader
+        self._index = index
+
+    @property
+    def loaded(self):
+        """``True`` once the entity has been fetched."""
+        return self._entity is not None
+
+    @property
+    def entity(self):
+        """The full entity, fetched if needed."""
+        if self._entity is None:
+            return self._loader.load(self._index)
+        return self._entity
+
+    def __getitem__(self, column):
+        if self._entity is None and column in self._values:
+            return self._values[column]
+        return getattr(self.entity, column_name(column))
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._entity is None:
+            for column, value in self._values.iteritems():
+                if column_name(column) == name:
+                    return value
+        return getattr(self.entity, name)
+
+    def edit(self, **kwdargs):
+        """Edit the record, returning the edit context entity from
+        ``edit<Table>ByRecordID``. Keyword arguments, like
+        ``ignoreEditLockError``, are passed on.
+
+        .. code:: python
+
+            with proxy.edit() as entity:
+                entity.priority = 'Immediate'
+        """
+        loader = self._loader
+        entity = getattr(loader.ttp, 'edit%sByRecordID' % loader.table)(
+            self.recordid, False, **kwdargs)
+        if not testtrackpro.edit_lock_failed(entity):
+            with loader.lock:
+                self._entity = entity
+                loader.errors.pop(self._index, None)
+        return entity
+
+    def __repr__(self):
+        return '<TTPLazyEntity %s %s%s>' % (
+            self._loader.table, self.number,
+            self._entity is None and ' (not loaded)' or '')
+
+
+def lazy_entities(ttp, table, records, batch_size=50, workers=4,
+                  prefetch=True):
+    """Turn :py:class:`~testtrackpro.projection.TTPRecord` objects into
+    :py:class:`TTPLazyEntity` proxies sharing one loader.
+    """
+    loader = _Loader(ttp, table, batch_size, workers, prefetch)
+    loader.proxies = [TTPLazyEntity(loader, index, record.recordid,
+                                    record.number, record.values)
+                      for index, record in enumerate(records)]
+    return list(loader.proxies)
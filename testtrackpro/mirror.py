@@ -0,0 +1,326 @@
+"""Local SQLite mirror of a TestTrack project.
+
+Reporting and search tools which query the TestTrack server for every request
+do not scale. :py:class:`TTPMirror` keeps a local SQLite copy of the records
+in a set of tables, so reads come from an indexed local store instead.
+
+The first :py:meth:`TTPMirror.sync` pulls every record in parallel using a
+:py:class:`testtrackpro.pool.TTPWorkerPool`. After that each sync only asks
+the server for a record list with the ``Date Modified`` column, and fetches
+the records whose modification date differs from the mirrored one, which
+are those added or modified since the last sync. The latest modification
+date seen, the high-water mark of :py:meth:`TTPMirror.highwater`, is only
+kept for information, and does not select the records. If a server side
+filter that selects recently modified records is available, like "Modified
+in the last 7 days", it can be given per table to make the record list
+smaller. Deleted records are removed, and
+columns which are added to a table on the server are added to the local
+table and back-filled from the stored entity data.
+
+.. code:: python
+
+    import testtrackpro
+    from testtrackpro.mirror import TTPMirror
+
+    with testtrackpro.TTP('http://hostname/', 'Project', 'username', 'password') as ttp:
+        mirror = TTPMirror(ttp, 'project.sqlite', workers=8,
+                           filters={'Defect': 'Modified in the last 7 days'})
+        mirror.sync()
+        defect = mirror.entity('Defect', 42)
+
+Each mirrored table has a ``recordid``, ``number``, ``modified`` (in ISO
+8601 form, like ``'2013-08-28T15:04:05'``, so it sorts by date, or as the
+server wrote it if it is in a format the mirror can not read) and
+``entity`` (the full entity as JSON) column, and one column per record list
+column on the server, named by lower casing the column name and removing
+anything but letters and digits (``Assigned To`` becomes ``assignedto``).
+"""
+import datetime
+import json
+import logging
+import re
+import sqlite3
+import time
+
+import testtrackpro
+from testtrackpro.pool import TTPWorkerPool
+
+_fixed_columns = ('recordid', 'number', 'modified', 'entity')
+
+## record list dates are formatted by the server, in the formats of its locale
+_date_formats = ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M',
+                 '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p',
+                 '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%d.%m.%Y %H:%M:%S',
+                 '%d.%m.%Y %H:%M', '%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y')
+
+
+def column_name(name):
+    """SQLite column name used for a TestTrack record list column.
+    """
+    return re.sub('[^a-z0-9]', '', name.lower())
+
+def _modified_time(text):
+    ## ISO 8601 form of a record list date, which sorts as text, or None
+    text = (text or '').strip()
+    for date_format in _date_formats:
+        try:
+            return datetime.datetime.strptime(text, date_format).isoformat()
+        except ValueError:
+            pass
+    return None
+
+def column_value(data, column):
+    """Value of a record list column taken from entity data, looking at the
+    entity fields first and then the custom fields.
+    """
+    value = data.get(column_name(column))
+    if value is None:
+        for field in data.get('customFieldvalues') or []:
+            if isinstance(field, dict) and field.get('name') == column:
+                value = field.get('value')
+                break
+    if isinstance(value, (dict, list)):
+        return None
+    return value
+
+
+class TTPMirror(object):
+    """Incremental mirror of TestTrack tables into an SQLite database.
+
+    :param TTP ttp: Logged in client to mirror from.
+    :param str path: SQLite database file.
+    :param list tables: Tables to mirror, as named in the API methods.
+    :param int workers: Number of parallel fetches.
+    :param dict filters: Optional ``{table: filtername}`` of server filters
+                    which return at least every record modified since the
+                    previous sync. Used for incremental syncs instead of the
+                    full record list.
+    :param bool check_deletes: When a filter is used for an incremental sync
+                    also fetch the (number only) full record list to find
+                    deleted records.
+    :param str modified_column: Record list column with the last modified
+                    date and time.
+    """
+    def __init__(self, ttp, path, tables=('Defect', 'TestCase', 'Requirement'),
+                 workers=4, filters=None, check_deletes=True,
+                 modified_column='Date Modified'):
+        self.ttp = ttp
+        self.path = path
+        self.tables = list(tables)
+        self.workers = workers
+        self.filters = dict(filters or {})
+        self.check_deletes = check_deletes
+        self.modified_column = modified_column
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS _mirror '
+            '(name TEXT PRIMARY KEY, highwater TEXT, synced REAL, '
+            'columns TEXT)')
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _sql_table(self, table):
+        if table not in self.tables:
+            raise testtrackpro.TTPAPIError("Table %s is not mirrored." % table)
+        return column_name(table)
+
+    def _state(self, table):
+        row = self.db.execute('SELECT * FROM _mirror WHERE name = ?',
+                              (table,)).fetchone()
+        if row is None:
+            return None, []
+        return row['highwater'], json.loads(row['columns'])
+
+    def columns(self, table):
+        """Server record list columns mirrored for a table.
+        """
+        return self._state(table)[1]
+
+    def highwater(self, table):
+        """Latest modification date and time seen for a table, in ISO 8601
+        form like ``'2013-08-28T15:04:05'``, or ``None`` if the table has not
+        been synced.
+        """
+        return self._state(table)[0]
+
+    def _update_schema(self, table, columns):
+        """Create the local table, and add any new server columns. Returns
+        the list of column names.
+        """
+        sql_table = self._sql_table(table)
+        names = [c.name for c in columns
+                 if column_name(c.name) not in _fixed_columns]
+        highwater, previous = self._state(table)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS "%s" (recordid INTEGER PRIMARY KEY, '
+            'number INTEGER, modified TEXT, entity TEXT)' % sql_table)
+        existing = set(r['name'] for r in self.db.execute(
+            'PRAGMA table_info("%s")' % sql_table))
+        added = [n for n in names if column_name(n) not in existing]
+        for name in added:
+            self.db.execute('ALTER TABLE "%s" ADD COLUMN "%s"' % (
+                sql_table, column_name(name)))
+        removed = [n for n in previous if n not in names]
+        for name in removed:
+            ## SQLite can not drop columns, so just clear them
+            if column_name(name) in existing:
+                self.db.execute('UPDATE "%s" SET "%s" = NULL' % (
+                    sql_table, column_name(name)))
+        if added and previous:
+            logging.info("Mirror back-filling new %s columns: %s",
+                         table, ', '.join(added))
+            self._backfill(sql_table, added)
+        self.db.execute(
+            'INSERT OR REPLACE INTO _mirror (name, highwater, synced, columns) '
+            'VALUES (?, ?, ?, ?)', (table, highwater, None, json.dumps(names)))
+        return names
+
+    def _backfill(self, sql_table, names):
+        rows = self.db.execute('SELECT recordid, entity FROM "%s"' % sql_table)
+        updates = []
+        for row in rows.fetchall():
+            data = json.loads(row['entity'])
+            updates.append([column_value(data, n) for n in names] +
+                           [row['recordid']])
+        self.db.executemany('UPDATE "%s" SET %s WHERE recordid = ?' % (
+            sql_table, ', '.join('"%s" = ?' % column_name(n) for n in names)),
+            updates)
+
+    def _record_list(self, table, filtername, columns):
+        return dict(self.ttp.record_list(table, filtername, columns))
+
+    def sync(self, table=None):
+        """Bring the mirror up to date with the server.
+
+        :param str table: Table to sync. All mirrored tables when ``None``.
+
+        Returns a dict of statistics for each table synced: the number of
+        records ``listed``, ``fetched`` and ``deleted``, and the ``elapsed``
+        time in seconds.
+        """
+        if table is None:
+            return dict((t, self.sync(t)) for t in self.tables)
+        start = time.time()
+        sql_table = self._sql_table(table)
+        names = self._update_schema(
+            table, self.ttp.getColumnsForTable(
+                testtrackpro.table_display_name(table)))
+        highwater = _modified_time(self.highwater(table))
+        local = dict((r['recordid'], r['modified']) for r in self.db.execute(
+            'SELECT recordid, modified FROM "%s"' % sql_table))
+
+        filtername = self.filters.get(table) if local else None
+        listed = self._record_list(table, filtername,
+                                   ['Number', self.modified_column])
+        changed = []
+        restamped = []
+        unknown = None
+        for recordid, row in listed.iteritems():
+            ## the dates are compared and stored as dates, not as text
+            when = _modified_time(row[1])
+            modified = when or row[1]
+            if recordid not in local:
+                changed.append((recordid, modified))
+            elif local[recordid] != modified:
+                if local[recordid] == row[1]:
+                    ## mirrored before the dates were stored as ISO 8601
+                    restamped.append((modified, recordid))
+                else:
+                    changed.append((recordid, modified))
+            if when is None:
+                unknown = row[1]
+            elif when > highwater:
+                highwater = when
+        if unknown:
+            logging.warn("Mirror can not read %s dates like '%s', they do not "
+                         "move the high-water mark.", table, unknown)
+
+        deleted = []
+        if not filtername:
+            deleted = [r for r in local if r not in listed]
+        elif self.check_deletes:
+            current = self._record_list(table, None, ['Number'])
+            deleted = [r for r in local if r not in current]
+
+        self._fetch(table, sql_table, names, changed)
+        self.db.executemany(
+            'UPDATE "%s" SET modified = ? WHERE recordid = ?' % sql_table,
+            restamped)
+        self.db.executemany('DELETE FROM "%s" WHERE recordid = ?' % sql_table,
+                            [(r,) for r in deleted])
+        self.db.execute(
+            'UPDATE _mirror SET highwater = ?, synced = ? WHERE name = ?',
+            (highwater, time.time(), table))
+        self.db.commit()
+        return {'listed': len(listed), 'fetched': len(changed),
+                'deleted': len(deleted), 'elapsed': time.time() - start}
+
+    def _fetch(self, table, sql_table, names, changed):
+        method_name = 'get%sByRecordID' % table
+        number_field = testtrackpro.table_number_field(table)
+        insert = 'INSERT OR REPLACE INTO "%s" (%s) VALUES (%s)' % (
+            sql_table,
+            ', '.join('"%s"' % c for c in
+                      list(_fixed_columns) + [column_name(n) for n in names]),
+            ', '.join('?' * (len(_fixed_columns) + len(names))))
+
+        def fetch(client, item):
+            entity = getattr(client, method_name)(item[0])
+            return testtrackpro.entity_to_dict(entity)
+
+        pool = TTPWorkerPool(self.ttp, self.workers)
+        batch = []
+        for (recordid, modified), data, error in pool.imap_unordered(
+                fetch, changed):
+            if error:
+                if (isinstance(error, testtrackpro.TTPAPIError)
+                        and not isinstance(error,
+                                           testtrackpro.TTPConnectionError)):
+                    ## deleted between the record list and the fetch
+                    logging.warn("Mirror could not fetch %s record %s: %s",
+                                 table, recordid, error)
+                    continue
+                raise error
+            batch.append([recordid, data.get(number_field), modified,
+                          json.dumps(data)] +
+                         [column_value(data, n) for n in names])
+            if len(batch) >= 500:
+                self.db.executemany(insert, batch)
+                batch = []
+        self.db.executemany(insert, batch)
+
+    def get(self, table, number):
+        """Mirrored entity data for a record number, as plain python data
+        (see :py:func:`testtrackpro.entity_to_dict`), or ``None``.
+        """
+        row = self.db.execute(
+            'SELECT entity FROM "%s" WHERE number = ?' % self._sql_table(table),
+            (number,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['entity'])
+
+    def entity(self, table, number):
+        """Mirrored record as an entity, like the one returned by
+        ``getDefect``, or ``None``.
+        """
+        data = self.get(table, number)
+        if data is None:
+            return None
+        return self.ttp.from_dict(data)
+
+    def count(self, table):
+        """Number of records mirrored for a table.
+        """
+        return self.db.execute('SELECT COUNT(*) FROM "%s"' %
+                               self._sql_table(table)).fetchone()[0]
@@ -0,0 +1,205 @@
+"""Run the same work across many TestTrack projects.
+
+Company wide reports have to log on to every project of a server, one after
+the other, before querying each of them. :py:class:`TTPMultiProject` keeps a
+:py:class:`~testtrackpro.TTP` session per project and runs a function on all
+of them in parallel. Logons are part of each project's work, so projects
+start answering as soon as their own logon is done, rather than after all of
+them are. The WSDL is loaded once, by the client which lists the projects,
+and every project session is a clone of it (see
+:py:meth:`TTP.clone <testtrackpro.TTP.clone>`) with a logon of its own.
+
+.. code:: python
+
+    from testtrackpro.multi import TTPMultiProject
+
+    with TTPMultiProject('http://hostname/', 'username', 'password') as multi:
+        counts = multi.map(lambda ttp: len(ttp.record_list('Defect')))
+
+        ## merged stream of (project name, record) as records arrive
+        for project, record in multi.stream(lambda ttp: ttp.get_fields(
+                'Defect', columns=['Summary', 'Status'])):
+            print project, record.number, record.summary
+
+Each session is used by one thread at a time, so do not run work on the same
+:py:class:`TTPMultiProject` from several threads at once.
+"""
+import Queue
+import threading
+
+import testtrackpro
+
+_done = object()
+
+
+class TTPMultiProject(object):
+    """Sessions on a set of projects of one server.
+
+    :param str url: Server or WSDL url, as for :py:class:`~testtrackpro.TTP`.
+    :param str username: Username to log on to every project with.
+    :param str password: Password to log on with.
+    :param list projects: Project names. Defaults to every project the user
+                    has access to, from ``getProjectList``.
+    :param int workers: Number of projects worked on at once.
+    :param kwdargs: Other :py:class:`~testtrackpro.TTP` arguments, like
+                    ``limiter`` or ``timeout``, for every session.
+    """
+    def __init__(self, url, username, password, projects=None, workers=8,
+                 **kwdargs):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.workers = max(1, int(workers))
+        self.sessions = {}
+        self._options = kwdargs
+        self._names = projects and list(projects) or None
+        self._cprojects = {}
+        self._base = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        ## with the lock held. The client is never logged on itself.
+        if self._base is None:
+            self._base = testtrackpro.TTP(self.url, username=self.username,
+                                          password=self.password,
+                                          **self._options)
+        return self._base
+
+    def _load_projects(self):
+        if self._names is None or not self._cprojects:
+            with self._lock:
+                if not self._cprojects:
+                    for project in self._client().getProjectList() or []:
+                        self._cprojects[project.database.name] = project
+                if self._names is None:
+                    self._names = sorted(self._cprojects)
+        return self._names
+
+    @property
+    def projects(self):
+        """Names of the projects worked on."""
+        return list(self._load_projects())
+
+    def session(self, project):
+        """The logged on client of a project, logging on if needed."""
+        ttp = self.sessions.get(project)
+        if ttp is not None:
+            return ttp
+        self._load_projects()
+        if project not in self._cprojects:
+            raise testtrackpro.TTPLogonError(
+                "No access to the project '%s'." % project)
+        with self._lock:
+            ## shares the loaded WSDL, but gets a session of its own
+            ttp = self._client().clone()
+        ttp._cookie = None
+        ttp.ProjectLogon(self._cprojects[project])
+        with self._lock:
+            self.sessions[project] = ttp
+        return ttp
+
+    def _run(self, func, args, kwdargs, stream):
+        projects = self.projects
+        tasks = Queue.Queue()
+        for project in projects:
+            tasks.put(project)
+        results = Queue.Queue(self.workers * 64)
+        stop = threading.Event()
+        workers = min(self.workers, len(projects))
+
+        def work():
+            while not stop.is_set():
+                try:
+                    project = tasks.get_nowait()
+                except Queue.Empty:
+                    break
+                try:
+                    result = func(self.session(project), *args, **kwdargs)
+                    if stream:
+                        for item in result:
+                            if stop.is_set():
+                                break
+                            results.put((project, item, None))
+                    else:
+                        results.put((project, result, None))
+                except Exception, e:
+                    results.put((project, None, e))
+            results.put(_done)
+
+        threads = [threading.Thread(target=work, name='TTPMultiProject-%d' % i)
+                   for i in xrange(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        finished = 0
+        try:
+            while finished < workers:
+                try:
+                    ## a timeout keeps the wait interruptable
+                    result = results.get(True, 0.5)
+                except Queue.Empty:
+                    continue
+                if result is _done:
+                    finished += 1
+                else:
+                    yield result
+        finally:
+            stop.set()
+            ## unblock workers waiting to hand over results
+            while finished < workers:
+                try:
+                    if results.get(True, 0.5) is _done:
+                        finished += 1
+                except Queue.Empty:
+                    if not any(t.is_alive() for t in threads):
+                        break
+
+    def imap(self, func, *args, **kwdargs):
+        """Call ``func(ttp, *args, **kwdargs)`` with the session of every
+        project, yielding ``(project, result, error)`` tuples as the projects
+        finish. ``error`` is the exception raised by the logon or ``func``,
+        or ``None``.
+        """
+        return self._run(func, args, kwdargs, False)
+
+    def map(self, func, *args, **kwdargs):
+        """Like :py:meth:`imap`, but returns a dict of the results by project,
+        raising the first error.
+        """
+        results = {}
+        for project, result, error in self.imap(func, *args, **kwdargs):
+            if error:
+                raise error
+            results[project] = result
+        return results
+
+    def stream(self, func, *args, **kwdargs):
+        """Call ``func(ttp, *args, **kwdargs)``, which returns an iterable,
+        for every project, yielding ``(project, item)`` for the items of all
+        of them as they arrive. The first error is raised.
+        """
+        for project, item, error in self._run(func, args, kwdargs, True):
+            if error:
+                raise error
+            yield project, item
+
+    def logon(self):
+        """Log on to all the projects now, in parallel, instead of as part of
+        the first work. Returns a dict of the errors by project.
+        """
+        return dict((project, error) for project, result, error in
+                    self.imap(lambda ttp: None) if error)
+
+    def close(self):
+        """Log off all the sessions."""
+        with self._lock:
+            sessions = self.sessions.values()
+            self.sessions = {}
+        for ttp in sessions:
+            ttp.DatabaseLogoff(ignore_exceptions=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,135 @@
+"""Parallel calls against the TestTrack SOAP API.
+
+The TestTrack server answers many requests at a time, but a single
+:py:class:`testtrackpro.TTP` client (and the `suds`_ client inside it) is not
+safe to use from several threads. :py:class:`TTPWorkerPool` runs a function
+over a stream of items on a set of worker threads, each with its own
+:py:meth:`clone <testtrackpro.TTP.clone>` of a logged in client.
+
+.. code:: python
+
+    import testtrackpro
+    from testtrackpro.pool import TTPWorkerPool
+
+    with testtrackpro.TTP('http://hostname/', 'Project', 'username', 'password') as ttp:
+        pool = TTPWorkerPool(ttp, workers=8)
+        fetch = lambda client, number: client.getDefect(number)
+        for number, defect, error in pool.imap_unordered(fetch, xrange(1, 1001)):
+            if error:
+                raise error
+            print defect.summary
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import Queue
+import threading
+
+_done = object()
+
+
+class TTPWorkerPool(object):
+    """Worker threads which each hold their own clone of a client.
+
+    :param TTP ttp: Logged in client whose session the workers share.
+    :param int workers: Number of worker threads, and so the number of
+                    requests in flight at once.
+
+    The workers are started for each call to :py:meth:`imap_unordered` and
+    stop when it is exhausted or closed. Clones are made in the worker
+    threads, so the WSDL loads happen in parallel too.
+    """
+    def __init__(self, ttp, workers=4):
+        self.ttp = ttp
+        self.workers = max(1, int(workers))
+
+    def imap_unordered(self, func, items):
+        """Call ``func(client, item)`` for every item, yielding
+        ``(item, result, error)`` tuples in completion order.
+
+        :param callable func: Called with a worker's client and an item.
+        :param items: Iterable of items. It is consumed lazily, so only a
+                    small number of items are held in memory at once.
+
+        ``error`` is the exception raised by ``func``, or ``None``. Errors do
+        not stop the other items from being processed. An error raised while
+        iterating ``items`` is yielded with an item of ``None``.
+        """
+        tasks = Queue.Queue(self.workers * 2)
+        results = Queue.Queue(self.workers * 4)
+        stop = threading.Event()
+
+        def feed():
+            try:
+                for item in items:
+                    if stop.is_set():
+                        break
+                    tasks.put(item)
+            except Exception, e:
+                results.put((None, None, e))
+            finally:
+                for i in xrange(self.workers):
+                    tasks.put(_done)
+
+        def work():
+            client = None
+            while True:
+                item = tasks.get()
+                if item is _done:
+                    results.put(_done)
+                    return
+                if stop.is_set():
+                    ## drain the queue so the feeder can finish
+                    continue
+                try:
+                    if client is None:
+                        client = self.ttp.clone()
+                    result = func(client, item)
+                except Exception, e:
+                    results.put((item, None, e))
+                else:
+                    results.put((item, result, None))
+
+        threads = [threading.Thread(target=feed, name='TTPWorkerPool-feed')]
+        for i in xrange(self.workers):
+            threads.append(threading.Thread(
+                target=work, name='TTPWorkerPool-%d' % i))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < self.workers:
+                try:
+                    ## a timeout keeps the wait interruptable
+                    result = results.get(True, 0.5)
+                except Queue.Empty:
+                    continue
+                if result is _done:
+                    finished += 1
+                    continue
+                yield result
+        finally:
+            stop.set()
+            ## unblock workers waiting to hand over results
+            while finished < self.workers:
+                try:
+                    if results.get(True, 0.5) is _done:
+                        finished += 1
+                except Queue.Empty:
+                    if not any(t.is_alive() for t in threads[1:]):
+                        break
+
+    def map(self, func, items):
+        """Like :py:meth:`imap_unordered`, but returns a list of results in
+        the order of ``items``, raising the first error encountered.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        for (index, item), result, error in self.imap_unordered(
+                lambda client, pair: func(client, pair[1]),
+                enumerate(items)):
+            if error:
+                raise error
+            results[index] = result
+        return results
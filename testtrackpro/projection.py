@@ -0,0 +1,182 @@
+"""Fetch only the fields you need.
+
+``getDefect`` returns the whole entity: events, workflow history, attachment
+details and custom fields, all of which has to be sent, parsed and decoded
+even when a report only needs the summary and status.
+:py:meth:`TTP.get_fields <testtrackpro.TTP.get_fields>` answers from a
+single record list query with just the requested columns when it can, and
+only fetches full entities for fields which are not record list columns.
+
+.. code:: python
+
+    for record in ttp.get_fields('Defect', [12, 15, 31],
+                                 ['Summary', 'Status', 'Assigned To']):
+        print record.number, record.summary, record['Assigned To']
+
+Values of record list columns are as the record list returns them, so dates
+and users are formatted by the server. Fields fetched from entities have the
+entity values.
+
+The record list covers the whole table, or the whole filter when one is
+given. A record list row costs a tenth of an entity or so, so for a handful
+of records, ``max_gets`` or fewer, the entities are fetched one by one
+instead, and every field has the entity value. With a filter the record
+list is always used, as only it tells which records the filter matches.
+"""
+import testtrackpro
+from testtrackpro.mirror import column_name
+from testtrackpro.pool import TTPWorkerPool
+
+
+class TTPRecord(object):
+    """A few fields of a record.
+
+    ``recordid`` and ``number`` are always set. The fields are available by
+    the column names they were asked for, ``record['Assigned To']``, or as
+    attributes named like the entity fields, ``record.assignedto``.
+    """
+    __slots__ = ('recordid', 'number', 'values')
+
+    def __init__(self, recordid, number, values):
+        self.recordid = recordid
+        self.number = number
+        self.values = values
+
+    def __getitem__(self, column):
+        return self.values[column]
+
+    def __getattr__(self, name):
+        if not name.startswith('_'):
+            for column, value in self.values.iteritems():
+                if column_name(column) == name:
+                    return value
+        raise AttributeError("'%s' has no field '%s'" % (
+            self.__class__.__name__, name))
+
+    def __getstate__(self):
+        return (self.recordid, self.number, self.values)
+
+    def __setstate__(self, state):
+        self.recordid, self.number, self.values = state
+
+    def __repr__(self):
+        return '<TTPRecord %s %r>' % (self.number, self.values)
+
+
+def _entity_value(data, column):
+    name = column_name(column)
+    if column in data:
+        return data[column]
+    if name in data:
+        return data[name]
+    for field in data.get('customFieldvalues') or []:
+        if isinstance(field, dict) and field.get('name') == column:
+            return field.get('value')
+    return None
+
+
+def _fetch_all(ttp, fetch, items, workers):
+    ## (item, result, error) for every item
+    if workers > 1 and len(items) > 1:
+        return TTPWorkerPool(ttp, workers).imap_unordered(fetch, items)
+    return _fetch_serial(ttp, fetch, items)
+
+def _fetch_serial(ttp, fetch, items):
+    for item in items:
+        try:
+            yield item, fetch(ttp, item), None
+        except Exception, e:
+            yield item, None, e
+
+def _get_records(ttp, table, ids, columns, by_recordid, workers):
+    ## a few entity gets instead of listing the whole table. Returns the
+    ## records and their entities.
+    if by_recordid:
+        method_name = 'get%sByRecordID' % table
+    else:
+        method_name = 'get%s' % table
+    number_field = testtrackpro.table_number_field(table)
+    keys = []
+    for key in ids:
+        if key not in keys:
+            keys.append(key)
+    fetch = lambda client, key: getattr(client, method_name)(key)
+    found = {}
+    for key, entity, error in _fetch_all(ttp, fetch, keys, workers):
+        if error:
+            if (isinstance(error, testtrackpro.TTPAPIError)
+                    and not isinstance(error,
+                                       testtrackpro.TTPConnectionError)):
+                ## no such record
+                continue
+            raise error
+        data = testtrackpro.entity_to_dict(entity)
+        number = data.get(number_field)
+        if number is not None:
+            number = long(number)
+        record = TTPRecord(data.get('recordid'), number, dict(
+            (column, _entity_value(data, column)) for column in columns))
+        found[key] = (record, entity)
+    return [found[key] for key in keys if key in found]
+
+
+def get_fields(ttp, table, ids=None, columns=('Summary',), filtername=None,
+               by_recordid=False, workers=4, lazy=False, batch_size=50,
+               max_gets=10):
+    """Fields of a set of records. See :py:meth:`testtrackpro.TTP.get_fields`.
+    """
+    if ids is not None and not filtername and len(ids) <= max_gets:
+        fetched = _get_records(ttp, table, ids, columns, by_recordid, workers)
+        records = [record for record, entity in fetched]
+        if lazy:
+            from testtrackpro.lazy import lazy_entities
+            proxies = lazy_entities(ttp, table, records, batch_size, workers)
+            for proxy, (record, entity) in zip(proxies, fetched):
+                proxy._entity = entity
+            return proxies
+        return records
+
+    listable = dict((column_name(c.name), c.name)
+                    for c in ttp.getColumnsForTable(
+                        testtrackpro.table_display_name(table)) or [])
+    listed = [c for c in columns if column_name(c) in listable]
+    fetched = [c for c in columns if column_name(c) not in listable]
+    if lazy:
+        ## read from the entities when they are fetched
+        fetched = []
+
+    rows = ttp.record_list(table, filtername,
+                           ['Number'] + [listable[column_name(c)]
+                                         for c in listed])
+    wanted = None
+    if ids is not None:
+        wanted = set(ids)
+    records = []
+    for recordid, row in rows:
+        number = row[0]
+        if number is not None:
+            number = long(number)
+        if wanted is not None and (by_recordid and recordid or
+                                   number) not in wanted:
+            continue
+        records.append(TTPRecord(recordid, number, dict(zip(listed, row[1:]))))
+
+    if fetched and records:
+        method_name = 'get%sByRecordID' % table
+        fetch = lambda client, record: testtrackpro.entity_to_dict(
+            getattr(client, method_name)(record.recordid))
+        for record, data, error in _fetch_all(ttp, fetch, records, workers):
+            if error:
+                raise error
+            for column in fetched:
+                record.values[column] = _entity_value(data, column)
+
+    if ids is not None:
+        ## in the order asked for
+        order = dict((i, n) for n, i in enumerate(ids))
+        records.sort(key=lambda r: order[by_recordid and r.recordid or
+                                         r.number])
+    if lazy:
+        from testtrackpro.lazy import lazy_entities
+        return lazy_entities(ttp, table, records, batch_size, workers)
+    return records
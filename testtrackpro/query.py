@@ -0,0 +1,230 @@
+"""Ad-hoc queries over a local mirror.
+
+TestTrack filters have to be defined on the server ahead of time. With the
+records mirrored locally by :py:class:`testtrackpro.mirror.TTPMirror`,
+:py:class:`TTPQuery` answers ad-hoc questions in milliseconds using SQLite
+secondary indexes on the commonly queried columns (status, priority, product,
+assignee and dates) and a full text index on the summary and description.
+
+.. code:: python
+
+    from testtrackpro.mirror import TTPMirror
+    from testtrackpro.query import TTPQuery
+
+    mirror = TTPMirror(ttp, 'project.sqlite')
+    mirror.sync()
+    query = TTPQuery(mirror)
+
+    ## all open Immediate defects in product X assigned to one of a team
+    defects = query.find('Defect', priority='Immediate', product='X',
+                         assignedto=['Smith, Jan', 'Lee, Alex'],
+                         where="status LIKE 'Open%'")
+
+    ## full text search, newest first
+    crashes = query.find('Defect', text='crash installer',
+                         order_by='-modified', limit=20)
+
+Results are entities of the same shape returned by ``ttp.getDefect`` (see
+:py:meth:`testtrackpro.TTP.from_dict`), or the plain python entity data with
+``raw=True``, which is considerably faster. The indexes are kept up to date
+by SQLite triggers, so later syncs of the mirror maintain them too.
+"""
+import json
+import sqlite3
+
+import testtrackpro
+from testtrackpro.mirror import column_name
+
+## columns which get a secondary index when the mirror has them
+DEFAULT_INDEXES = ('number', 'modified', 'status', 'priority', 'product',
+                   'assignedto', 'dateentered', 'datemodified')
+
+## columns covered by the full text index when the mirror has them
+DEFAULT_FULLTEXT = ('summary', 'description')
+
+
+class TTPQuery(object):
+    """Query engine over the tables of a :py:class:`TTPMirror`.
+
+    :param TTPMirror mirror: Synced mirror to query.
+    :param list indexes: Column names to create secondary indexes for.
+    :param list fulltext: Column names to cover with the full text index.
+
+    Indexes are created for each table when it is first queried. Call
+    :py:meth:`ensure_indexes` again after the server adds columns.
+    """
+    def __init__(self, mirror, indexes=DEFAULT_INDEXES,
+                 fulltext=DEFAULT_FULLTEXT):
+        self.mirror = mirror
+        self.db = mirror.db
+        self.indexes = [column_name(c) for c in indexes]
+        self.fulltext = [column_name(c) for c in fulltext]
+        self._prepared = {}  ## table -> full text columns, or None
+
+    def _columns(self, sql_table):
+        return [r['name'] for r in self.db.execute(
+            'PRAGMA table_info("%s")' % sql_table)]
+
+    def ensure_indexes(self, table):
+        """Create any missing indexes, and the full text index, for a table.
+        """
+        sql_table = self.mirror._sql_table(table)
+        columns = self._columns(sql_table)
+        if not columns:
+            raise testtrackpro.TTPAPIError(
+                "Table %s has not been synced." % table)
+        for column in self.indexes:
+            if column in columns:
+                self.db.execute(
+                    'CREATE INDEX IF NOT EXISTS "ix_%s_%s" ON "%s" ("%s")' % (
+                        sql_table, column, sql_table, column))
+        text = [c for c in self.fulltext if c in columns]
+        fts = None
+        if text:
+            try:
+                fts = self._ensure_fulltext(sql_table, text)
+            except sqlite3.OperationalError:
+                ## no FTS support compiled into this SQLite, fall back to LIKE
+                fts = None
+        self.db.commit()
+        self._prepared[table] = (fts, text)
+        return self._prepared[table]
+
+    def _ensure_fulltext(self, sql_table, text):
+        fts = sql_table + '_fts'
+        existing = self.db.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        spec = ', '.join('"%s"' % c for c in text)
+        if existing and spec not in existing['sql']:
+            ## covered columns changed, rebuild it
+            self.db.execute('DROP TABLE "%s"' % fts)
+            existing = None
+        if existing:
+            return fts
+        self.db.execute('CREATE VIRTUAL TABLE "%s" USING fts4(%s)' % (
+            fts, spec))
+        new = ', '.join('new."%s"' % c for c in text)
+        ## INSERT OR REPLACE does not fire delete triggers, so clear the old
+        ## row before every insert.
+        self.db.executescript('''
+            DROP TRIGGER IF EXISTS "%(t)s_fts_bi";
+            DROP TRIGGER IF EXISTS "%(t)s_fts_ai";
+            DROP TRIGGER IF EXISTS "%(t)s_fts_ad";
+            DROP TRIGGER IF EXISTS "%(t)s_fts_au";
+            CREATE TRIGGER "%(t)s_fts_bi" BEFORE INSERT ON "%(t)s" BEGIN
+                DELETE FROM "%(f)s" WHERE docid = new.recordid;
+            END;
+            CREATE TRIGGER "%(t)s_fts_ai" AFTER INSERT ON "%(t)s" BEGIN
+                INSERT INTO "%(f)s" (docid, %(c)s) VALUES (new.recordid, %(n)s);
+            END;
+            CREATE TRIGGER "%(t)s_fts_ad" AFTER DELETE ON "%(t)s" BEGIN
+                DELETE FROM "%(f)s" WHERE docid = old.recordid;
+            END;
+            CREATE TRIGGER "%(t)s_fts_au" AFTER UPDATE ON "%(t)s" BEGIN
+                DELETE FROM "%(f)s" WHERE docid = old.recordid;
+                INSERT INTO "%(f)s" (docid, %(c)s) VALUES (new.recordid, %(n)s);
+            END;
+        ''' % {'t': sql_table, 'f': fts, 'c': spec, 'n': new})
+        self.db.execute('INSERT INTO "%s" (docid, %s) SELECT recordid, %s '
+                        'FROM "%s"' % (fts, spec, spec, sql_table))
+        return fts
+
+    def _prepare(self, table):
+        if table not in self._prepared:
+            self.ensure_indexes(table)
+        return self._prepared[table]
+
+    def _select(self, table, what, text, where, params, fields):
+        sql_table = self.mirror._sql_table(table)
+        fts, text_columns = self._prepare(table)
+        clauses = []
+        args = []
+        for name, value in sorted(fields.iteritems()):
+            if isinstance(value, (list, tuple, set, frozenset)):
+                value = list(value)
+                clauses.append('"%s" IN (%s)' % (
+                    column_name(name), ', '.join('?' * len(value))))
+                args.extend(value)
+            elif value is None:
+                clauses.append('"%s" IS NULL' % column_name(name))
+            else:
+                clauses.append('"%s" = ?' % column_name(name))
+                args.append(value)
+        if text:
+            if fts:
+                clauses.append('recordid IN (SELECT docid FROM "%s" '
+                               'WHERE "%s" MATCH ?)' % (fts, fts))
+                args.append(text)
+            elif text_columns:
+                for word in text.split():
+                    clauses.append('(%s)' % ' OR '.join(
+                        '"%s" LIKE ?' % c for c in text_columns))
+                    args.extend(['%' + word + '%'] * len(text_columns))
+            else:
+                raise testtrackpro.TTPAPIError(
+                    "Table %s has no text columns to search." % table)
+        if where:
+            clauses.append('(%s)' % where)
+            args.extend(params)
+        sql = 'SELECT %s FROM "%s"' % (what, sql_table)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return sql, args
+
+    def find(self, table, text=None, where=None, params=(), order_by=None,
+             limit=None, predicate=None, raw=False, **fields):
+        """Find mirrored records.
+
+        :param str table: Table name, like ``'Defect'``.
+        :param str text: Full text search (SQLite FTS ``MATCH`` syntax, like
+                        ``'crash installer'`` or ``'"memory leak"'``).
+        :param str where: Extra SQL condition over the mirrored columns, like
+                        ``"datemodified >= ?"``.
+        :param tuple params: Parameters for the ``where`` condition.
+        :param order_by: Column name, or list of them, to sort on. Prefix
+                        with ``-`` for descending order.
+        :param int limit: Maximum number of records to return.
+        :param callable predicate: Optional python filter called with the
+                        entity data of each record. Applied after the SQL
+                        conditions, and before the ``limit``.
+        :param bool raw: Return plain python entity data (see
+                        :py:func:`testtrackpro.entity_to_dict`) instead of
+                        entities.
+        :param fields: Column equality conditions, like
+                        ``priority='Immediate'``. A list value matches any of
+                        the values.
+        """
+        sql, args = self._select(table, 'entity', text, where, params, fields)
+        if order_by:
+            if isinstance(order_by, basestring):
+                order_by = [order_by]
+            sql += ' ORDER BY ' + ', '.join(
+                (o.startswith('-') and '"%s" DESC' % column_name(o[1:]) or
+                 '"%s"' % column_name(o)) for o in order_by)
+        if limit is not None and predicate is None:
+            sql += ' LIMIT %d' % int(limit)
+        results = []
+        for row in self.db.execute(sql, args):
+            data = json.loads(row[0])
+            if predicate is not None and not predicate(data):
+                continue
+            results.append(data)
+            if limit is not None and len(results) >= limit:
+                break
+        if raw:
+            return results
+        return [self.mirror.ttp.from_dict(data) for data in results]
+
+    def count(self, table, text=None, where=None, params=(), **fields):
+        """Number of records matching the same conditions as :py:meth:`find`.
+        """
+        sql, args = self._select(table, 'COUNT(*)', text, where, params, fields)
+        return self.db.execute(sql, args).fetchone()[0]
+
+    def numbers(self, table, text=None, where=None, params=(), **fields):
+        """Record numbers matching the same conditions as :py:meth:`find`.
+        This is the fastest way to query, as no entity data is decoded.
+        """
+        sql, args = self._select(table, 'number', text, where, params, fields)
+        return [row[0] for row in self.db.execute(sql + ' ORDER BY number',
+                                                  args)]
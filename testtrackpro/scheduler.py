@@ -0,0 +1,226 @@
+"""Priority classes for the calls to a TestTrack server.
+
+When web requests and background jobs share a server, a batch job with
+thousands of calls in flight leaves every interactive lookup waiting behind
+it. A :py:class:`TTPScheduler` gives the calls of its clients a number of
+slots, and when they are all taken decides which waiting call goes next:
+
+* Every call has a priority class, ``'interactive'`` or ``'batch'`` by
+  default. Classes get slots in proportion to their weights, so interactive
+  calls go ahead of batch calls, but batch calls keep getting their share
+  and never starve.
+* A class can have a quota, the most slots it may use at once. By default
+  batch calls leave two slots free for interactive ones.
+* Within a class, the waiting calls of different callers (clients, usually
+  one per thread) take turns, so one busy client does not hold up the
+  others of its class.
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', scheduler=True)
+    nightly = ttp.clone()
+    with nightly.priority('batch'):
+        for number in numbers:
+            nightly.getDefect(number)
+
+    print ttp.scheduler.stats()['interactive']['wait_p95']
+
+``scheduler=True`` uses the scheduler shared by all clients of the same
+host. Calls of clients without a scheduler are not counted. A call waiting
+for a slot fails with a :py:class:`~testtrackpro.TTPConnectionError` when
+the deadline of its client (see :py:meth:`testtrackpro.TTP.deadline`) is up.
+"""
+import collections
+import threading
+import time
+import urlparse
+
+import testtrackpro
+
+
+class _Class(object):
+    __slots__ = ('name', 'weight', 'quota', 'running', 'waiting', 'callers',
+                 'passes', 'granted', 'wait_total', 'wait_max', 'waits')
+
+    def __init__(self, name, weight, quota):
+        self.name = name
+        self.weight = float(weight)
+        self.quota = quota
+        self.running = 0
+        self.waiting = 0
+        self.callers = collections.OrderedDict()  ## caller -> deque
+        self.passes = 0.0
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = collections.deque(maxlen=1000)
+
+
+class TTPScheduler(object):
+    """Weighted fair scheduler of calls over a fixed number of slots.
+
+    :param int slots: Calls allowed in flight at once, over all classes.
+    :param dict weights: Share of the slots, by class name, when calls of
+                    several classes are waiting. Defaults to
+                    ``{'interactive': 4, 'batch': 1}``.
+    :param dict quotas: Most slots a class may use at once, by class name.
+                    Defaults to ``slots - 2`` for ``'batch'``.
+    """
+    def __init__(self, slots=8, weights=None, quotas=None):
+        self.slots = max(1, int(slots))
+        if weights is None:
+            weights = {'interactive': 4, 'batch': 1}
+        if quotas is None:
+            quotas = {'batch': max(1, self.slots - 2)}
+        self._classes = dict(
+            (name, _Class(name, weight, quotas.get(name)))
+            for name, weight in weights.iteritems())
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def _eligible(self, cls):
+        return cls.quota is None or cls.running < cls.quota
+
+    def _dispatch(self):
+        ## with the lock held: hand free slots to waiting calls, picking the
+        ## class with the least weighted service so far
+        while self._running < self.slots:
+            best = None
+            for cls in self._classes.itervalues():
+                if cls.waiting and self._eligible(cls) and (
+                        best is None or cls.passes < best.passes):
+                    best = cls
+            if best is None:
+                return
+            caller, queue = best.callers.popitem(last=False)
+            start, event = queue.popleft()
+            if queue:
+                ## round robin over the callers of the class
+                best.callers[caller] = queue
+            best.waiting -= 1
+            self._grant(best, time.time() - start)
+            event.set()
+
+    def _grant(self, cls, waited):
+        cls.running += 1
+        cls.granted += 1
+        cls.passes += 1.0 / cls.weight
+        self._running += 1
+        cls.wait_total += waited
+        cls.wait_max = max(cls.wait_max, waited)
+        cls.waits.append(waited)
+
+    def _class(self, name):
+        cls = self._classes.get(name)
+        if cls is None:
+            raise ValueError("Unknown priority class '%s'." % name)
+        return cls
+
+    def acquire(self, priority='interactive', caller=None, deadline=None):
+        """Wait for a slot for a call of a priority class, until the
+        ``time.time()`` of the ``deadline``, if there is one.
+        """
+        with self._lock:
+            cls = self._class(priority)
+            if not cls.waiting:
+                ## a class coming back to the queue does not get credit for
+                ## the time it was idle
+                active = [c.passes for c in self._classes.itervalues()
+                          if c.waiting or c.running]
+                if active:
+                    cls.passes = max(cls.passes, min(active))
+                if self._running < self.slots and self._eligible(cls):
+                    self._grant(cls, 0.0)
+                    return
+            event = threading.Event()
+            cls.callers.setdefault(caller, collections.deque()).append(
+                (time.time(), event))
+            cls.waiting += 1
+            self._dispatch()
+        try:
+            ## in short waits, so it stays interruptable
+            while not event.is_set():
+                timeout = 0.5
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.time())
+                    if timeout <= 0:
+                        raise testtrackpro.TTPConnectionError(
+                            "Deadline exceeded.")
+                event.wait(timeout)
+        except BaseException:
+            with self._lock:
+                if not event.is_set():
+                    self._withdraw(cls, caller, event)
+                    raise
+            ## granted in the meantime, the slot is not used
+            self.release(priority)
+            raise
+
+    def _withdraw(self, cls, caller, event):
+        ## with the lock held: take a waiting call out of the queue
+        queue = cls.callers[caller]
+        for entry in queue:
+            if entry[1] is event:
+                queue.remove(entry)
+                break
+        if not queue:
+            del cls.callers[caller]
+        cls.waiting -= 1
+
+    def release(self, priority='interactive'):
+        """Give back the slot of a finished call."""
+        with self._lock:
+            self._class(priority).running -= 1
+            self._running -= 1
+            self._dispatch()
+
+    def call(self, func, priority='interactive', caller=None, deadline=None):
+        """Call ``func()`` in a slot of a priority class."""
+        self.acquire(priority, caller, deadline)
+        try:
+            return func()
+        finally:
+            self.release(priority)
+
+    def stats(self):
+        """Dict of the counters of every class by name: calls ``running``
+        and ``waiting`` now, calls ``granted`` a slot so far, and their
+        queue waits in seconds, ``wait_mean`` and ``wait_max`` over all calls
+        and ``wait_p50`` and ``wait_p95`` over the last 1000 calls.
+        """
+        stats = {}
+        with self._lock:
+            for name, cls in self._classes.iteritems():
+                waits = sorted(cls.waits)
+                percentile = lambda p: waits and waits[
+                    min(len(waits) - 1, int(len(waits) * p))] or 0.0
+                stats[name] = {
+                    'running': cls.running,
+                    'waiting': cls.waiting,
+                    'granted': cls.granted,
+                    'quota': cls.quota,
+                    'wait_mean': cls.granted and
+                                 cls.wait_total / cls.granted or 0.0,
+                    'wait_max': cls.wait_max,
+                    'wait_p50': percentile(0.5),
+                    'wait_p95': percentile(0.95),
+                }
+        return stats
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def shared_scheduler(url, **kwdargs):
+    """The :py:class:`TTPScheduler` shared by all clients of the host in
+    ``url``. The keyword arguments are only used when the scheduler is
+    created by the first call for a host.
+    """
+    host = urlparse.urlsplit(url).netloc.lower()
+    with _schedulers_lock:
+        scheduler = _schedulers.get(host)
+        if scheduler is None:
+            scheduler = _schedulers[host] = TTPScheduler(**kwdargs)
+    return scheduler
@@ -0,0 +1,139 @@
+"""Pre-fixed WSDL schema bundles.
+
+Every new :py:class:`testtrackpro.TTP` downloads the WSDL of the server and
+any schema documents it imports, fixes the ``date`` fields which the server
+declares as ``dateTime`` in each of them, and has `suds`_ build its model of
+the services and types from them. Building the model is most of the time a
+new client takes. Short lived scripts pay for all of it on every start.
+
+With ``schema_bundle`` the model built from the fixed documents is saved to
+a bundle file the first time, and later clients load it from the bundle
+without downloading, fixing or building anything:
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', schema_bundle='/var/cache/ttp.schema')
+    print ttp.schema_report['source'], ttp.schema_report['load_time']
+
+A bundle is only used for the WSDL url it was made from, and with the `suds`_
+version which made it. Delete the file to make a new one after upgrading the
+server, as the WSDL may have changed. A bundle which can not be read is
+ignored, and one which can not be written is skipped, with a warning in the
+log. The client is built as usual either way.
+
+The bundle is a pickle, like the object cache of `suds`_. Only use bundle
+files which only trusted users can write.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import cPickle
+import gzip
+import logging
+import os
+import tempfile
+import time
+
+import suds
+import suds.cache
+
+BUNDLE_FORMAT = 'testtrackpro-schema'
+BUNDLE_VERSION = 2
+
+
+def write_bundle(path, url, definitions, documents):
+    """Save the `suds`_ WSDL model of a client to a bundle file. The file is
+    replaced atomically, so clients starting at the same time never see half
+    of it.
+
+    :param str path: Bundle file.
+    :param str url: WSDL url of the client.
+    :param definitions: The ``wsdl`` of the `suds`_ client, loaded from the
+                    fixed documents.
+    :param list documents: ``(url, size, patched element names)`` of every
+                    document the model was loaded from.
+    """
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'suds': suds.__version__,
+        'url': url,
+        'created': time.time(),
+        'documents': [{'url': doc_url, 'size': size,
+                       'patched': list(patched)}
+                      for doc_url, size, patched in documents],
+        'definitions': definitions,
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.ttpschema', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            with gzip.GzipFile(fileobj=fp, mode='wb', compresslevel=1) as zp:
+                zp.write(cPickle.dumps(bundle, cPickle.HIGHEST_PROTOCOL))
+        os.rename(tmp, path)
+    except:
+        os.unlink(tmp)
+        raise
+
+def read_bundle(path, url):
+    """The bundle saved by :py:func:`write_bundle`, or ``None`` when there is
+    no usable bundle for ``url`` in the file. Files which are missing, can
+    not be read or are not bundles all give ``None``.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        ## unpickling from the gzip file reads it in many small pieces
+        with gzip.open(path, 'rb') as zp:
+            bundle = cPickle.loads(zp.read())
+        if (bundle['format'] != BUNDLE_FORMAT or
+                bundle['version'] != BUNDLE_VERSION or
+                bundle['suds'] != suds.__version__):
+            logging.warn("Ignoring schema bundle %s from another version.",
+                         path)
+            return None
+    except Exception, e:
+        ## truncated and corrupt files fail in gzip, zlib or the unpickling
+        logging.warn("Ignoring unreadable schema bundle %s: %s", path, e)
+        return None
+    if bundle['url'] != url:
+        return None
+    return bundle
+
+
+class TTPBundleCache(suds.cache.Cache):
+    """`suds`_ object cache which answers with the WSDL model of a bundle,
+    for clients created with the ``cachingpolicy`` option set to ``1``.
+    """
+    def __init__(self, bundle):
+        ## the id of suds.reader.Reader.mangle
+        self.id = '%s-wsdl' % abs(hash(bundle['url']))
+        self.definitions = bundle['definitions']
+
+    ## suds deep copies the options of a client when cloning it, the model
+    ## is shared like the wsdl of the clone is
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get(self, id):
+        if id == self.id:
+            return self.definitions
+        return None
+
+    def getf(self, id):
+        return None
+
+    def put(self, id, object):
+        pass
+
+    def putf(self, id, fp):
+        pass
+
+    def purge(self, id):
+        pass
+
+    def clear(self):
+        pass
@@ -0,0 +1,143 @@
+"""Coalescing of identical read calls in flight at the same time.
+
+A busy service often asks for the same ``getDefect(1234)`` or
+``getColumnsForTable('Defect')`` from many threads at once. With a
+:py:class:`TTPSingleFlight` group, the first of those calls goes to the
+server, and identical calls made while it is in flight wait for it and share
+its result instead of making their own round trip.
+
+Only read calls are coalesced: the dynamically dispatched methods whose name
+starts with ``get``. Edit, save, add, delete and logon calls always go to the
+server. Calls are identical when they have the same method name, session
+cookie and arguments; calls with unhashable arguments, like lists, are not
+coalesced.
+
+Give a client a group with the ``coalesce`` argument. ``coalesce=True`` uses
+the group shared by all clients of the same server, so the clones used by
+each thread of a service coalesce their calls with each other:
+
+.. code:: python
+
+    ttp = testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                           'password', coalesce=True)
+    ## in each request handling thread
+    defect = thread_client.getDefect(1234)
+
+Each waiting caller gets its own copy of the result (see
+:py:func:`testtrackpro.copy_entity`), so callers can change what they get
+without affecting each other. Pass ``copy=False`` to a
+:py:class:`TTPSingleFlight` to share the one decoded result instead, when the
+results are only read.
+
+Waiting callers wait no longer than their own timeout or deadline (see
+:py:meth:`testtrackpro.TTP.deadline`), and then fail with a
+:py:class:`~testtrackpro.TTPConnectionError`.
+"""
+import sys
+import threading
+import time
+
+import testtrackpro
+
+
+class _Flight(object):
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class TTPSingleFlight(object):
+    """Group of calls in flight, by key.
+
+    :param bool copy: Give the callers which waited a copy of the result
+                    instead of the very same object.
+    """
+    def __init__(self, copy=True):
+        self.copy = copy
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = dict(calls=0, coalesced=0)
+
+    def stats(self):
+        """Counters as a dict: the number of ``calls`` made, and how many of
+        them were ``coalesced`` with a call already in flight.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def call(self, key, func, timeout=None):
+        """Call ``func()``, or wait for the result of the call in flight with
+        the same ``key``, for at most ``timeout`` seconds.
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self._stats['coalesced'] += 1
+        if leader:
+            result = None
+            try:
+                result = func()
+            except BaseException:
+                flight.error = sys.exc_info()
+                raise
+            finally:
+                with self._lock:
+                    ## no more callers join the flight from here on
+                    del self._flights[key]
+                    waiters = flight.waiters
+                if waiters and self.copy and flight.error is None:
+                    ## the waiters copy a snapshot, which the leader's
+                    ## caller can not change under them
+                    flight.result = testtrackpro.copy_entity(result)
+                else:
+                    flight.result = result
+                flight.event.set()
+            return result
+
+        deadline = timeout is not None and time.time() + timeout or None
+        wait = 0.5
+        ## a timeout keeps the wait interruptable
+        while not flight.event.wait(wait):
+            if deadline is not None:
+                wait = min(0.5, deadline - time.time())
+            if wait <= 0:
+                with self._lock:
+                    flight.waiters -= 1
+                raise testtrackpro.TTPConnectionError(
+                    "Timed out waiting for the same call in flight.")
+        if flight.error:
+            error = flight.error
+            if not isinstance(error[1], Exception):
+                ## like a KeyboardInterrupt of the leader's thread
+                raise testtrackpro.TTPConnectionError(
+                    "The same call in flight was interrupted: %r" % (
+                        error[1],))
+            raise error[0], error[1], error[2]
+        if self.copy:
+            return testtrackpro.copy_entity(flight.result)
+        return flight.result
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def shared_single_flight(url, **kwdargs):
+    """The :py:class:`TTPSingleFlight` group shared by all clients of the
+    server at ``url``. The keyword arguments are only used when the group is
+    created by the first call for a server.
+    """
+    with _groups_lock:
+        group = _groups.get(url)
+        if group is None:
+            group = _groups[url] = TTPSingleFlight(**kwdargs)
+    return group
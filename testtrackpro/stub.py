@@ -0,0 +1,866 @@
+"""Stand-in TestTrack SOAP Server
+
+A small, self contained, multi-threaded HTTP server which speaks enough of the
+`TestTrack SOAP API`_ to run the :py:class:`testtrackpro.TTP` client against
+without a live, licensed, TestTrack server. It is meant for benchmarks and
+local development, not as a replacement for the real thing.
+
+The server serves a recorded ``ttsoapcgi.wsdl`` which still has the bad
+``dateTime`` entries that the client repairs as it loads the WSDL, and
+returns date only values for those fields just as the real server does.
+It implements logon/logoff, the table, column, filter and record list queries,
+and the ``get``, ``edit``, ``save``, ``cancelSave``, ``add`` and ``delete``
+calls for the Defect, Test Case, Requirement and Test Run tables, including
+the implicit edit lock semantics (error ``"22"`` when someone else holds the
+lock) and a configurable per-call latency. Like a web server in front of the
+real CGI, it compresses responses for clients which accept ``gzip`` or
+``deflate``, and accepts compressed request bodies.
+
+.. code:: python
+
+    import testtrackpro
+    from testtrackpro.stub import TTPStubServer
+
+    with TTPStubServer(latency=0.05) as server:
+        server.populate(defects=500)
+        with testtrackpro.TTP(server.url, 'Stub Project', 'user', 'pass') as ttp:
+            with ttp.editDefect(42) as defect:
+                defect.priority = "Immediate"
+
+.. _TestTrack SOAP API: http://labs.seapine.com/TestTrackSDK.php
+"""
+import BaseHTTPServer
+import SocketServer
+import datetime
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import zlib
+import xml.etree.cElementTree as etree
+from xml.sax.saxutils import escape
+
+_wsdl_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'ttsoapcgi.wsdl')
+
+_ns_env = 'http://schemas.xmlsoap.org/soap/envelope/'
+_ns_enc = 'http://schemas.xmlsoap.org/soap/encoding/'
+_ns_xsi = 'http://www.w3.org/2001/XMLSchema-instance'
+_ns_xsd = 'http://www.w3.org/2001/XMLSchema'
+_ns_wsdl = 'http://schemas.xmlsoap.org/wsdl/'
+_ns_tt = 'urn:testtrack-interface'
+
+_envelope_head = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<SOAP-ENV:Envelope'
+    ' xmlns:SOAP-ENV="%s" xmlns:SOAP-ENC="%s" xmlns:xsi="%s" xmlns:xsd="%s"'
+    ' xmlns:ns1="%s" SOAP-ENV:encodingStyle="%s">'
+    '<SOAP-ENV:Body>' % (_ns_env, _ns_enc, _ns_xsi, _ns_xsd, _ns_tt, _ns_enc))
+_envelope_tail = '</SOAP-ENV:Body></SOAP-ENV:Envelope>'
+
+## Edit lock error code used by the real server.
+EDIT_LOCK_ERROR = '22'
+
+## table name as used in API method names -> (display name, number field)
+_tables = {
+    'Defect': ('Defect', 'defectnumber'),
+    'TestCase': ('Test Case', 'testcasenumber'),
+    'Requirement': ('Requirement', 'requirementnumber'),
+    'TestRun': ('Test Run', 'testrunnumber'),
+}
+
+## record list column -> (entity field, column type, required)
+_columns = [
+    ('Number', None, 'Integer', False),
+    ('Summary', 'summary', 'String', True),
+    ('Status', 'status', 'Dropdown', False),
+    ('Type', 'type', 'Dropdown', False),
+    ('Priority', 'priority', 'Dropdown', False),
+    ('Product', 'product', 'Dropdown', True),
+    ('Component', 'component', 'Dropdown', False),
+    ('Severity', 'severity', 'Dropdown', False),
+    ('Assigned To', 'assignedto', 'User', False),
+    ('Entered By', 'enteredby', 'User', False),
+    ('Date Entered', 'dateentered', 'Date', False),
+    ('Date Modified', 'datemodified', 'Date', False),
+    ('Description', 'description', 'String', False),
+]
+
+_dropdowns = {
+    'status': ['Open', 'Open (Verify)', 'Fixed', 'Closed', 'Closed (Verified)'],
+    'type': ['Bug', 'Feature Request', 'Documentation', 'Incorrect Functionality'],
+    'priority': ['Immediate', 'High', 'Medium', 'Low', 'Future'],
+    'product': ['Widget', 'Gadget', 'Gizmo', 'Toolkit'],
+    'component': ['Core', 'UI', 'Installer', 'Reporting', 'API'],
+    'severity': ['Crash', 'Major', 'Minor', 'Cosmetic'],
+}
+
+_users = ['Administrator', 'Napoleone, Doug', 'Smith, Jan', 'Lee, Alex',
+          'Garcia, Sam', 'Kim, Robin']
+
+_words = ('widget crash login report export import toolbar dialog install '
+          'timeout memory leak save print layout unicode filter query sort '
+          'button menu font network proxy license upgrade slow hang').split()
+
+_epoch = datetime.date(2013, 1, 1)
+
+
+class _StubFault(Exception):
+    """SOAP fault to be returned to the client.
+    """
+    def __init__(self, faultstring, detail=None, faultcode='SOAP-ENV:Client'):
+        super(_StubFault, self).__init__(faultstring)
+        self.faultstring = faultstring
+        self.detail = detail
+        self.faultcode = faultcode
+
+
+class _Schema(object):
+    """Minimal reader for the complexType definitions in the recorded WSDL.
+    Only what is needed to encode responses in SOAP section 5 style, and to
+    know the part names of each operation.
+    """
+    def __init__(self, wsdl):
+        root = etree.fromstring(wsdl)
+        self.types = {}     ## name -> [(field, type)]
+        self.arrays = {}    ## name -> item type
+        self.bases = {}     ## name -> base type name
+        self.messages = {}  ## message name -> [(part, type)]
+        for ct in root.iter('{%s}complexType' % _ns_xsd):
+            name = ct.get('name')
+            fields = [(e.get('name'), e.get('type'))
+                      for e in ct.iter('{%s}element' % _ns_xsd)]
+            restriction = ct.find('{%s}complexContent/{%s}restriction' %
+                                  (_ns_xsd, _ns_xsd))
+            extension = ct.find('{%s}complexContent/{%s}extension' %
+                                (_ns_xsd, _ns_xsd))
+            if restriction is not None:
+                self.arrays[name] = fields[0][1]
+            else:
+                if extension is not None:
+                    self.bases[name] = extension.get('base').split(':')[-1]
+                self.types[name] = fields
+        for msg in root.findall('{%s}message' % _ns_wsdl):
+            self.messages[msg.get('name')] = [
+                (p.get('name'), p.get('type'))
+                for p in msg.findall('{%s}part' % _ns_wsdl)]
+
+    def fields(self, name):
+        fields = []
+        base = self.bases.get(name)
+        if base:
+            fields.extend(self.fields(base))
+        fields.extend(self.types.get(name, []))
+        return fields
+
+    def response_part(self, method_name):
+        return self.messages[method_name + 'Response'][0]
+
+    def encode(self, out, name, typ, value):
+        local = typ.split(':')[-1]
+        if value is None:
+            out.append('<%s xsi:nil="true"/>' % name)
+        elif local in self.arrays:
+            itype = self.arrays[local]
+            out.append('<%s xsi:type="ns1:%s" SOAP-ENC:arrayType="%s[%d]">' %
+                       (name, local, itype, len(value)))
+            for item in value:
+                self.encode(out, 'item', itype, item)
+            out.append('</%s>' % name)
+        elif local in self.types:
+            ## polymorphic entries carry their real type
+            local = value.get('__type__', local)
+            out.append('<%s xsi:type="ns1:%s">' % (name, local))
+            for fname, ftype in self.fields(local):
+                if fname in value:
+                    self.encode(out, fname, ftype, value[fname])
+            out.append('</%s>' % name)
+        else:
+            if isinstance(value, bool):
+                value = value and 'true' or 'false'
+            elif not isinstance(value, basestring):
+                value = str(value)
+            ## no xsi:type on simple values, so the client decodes these
+            ## using its (fixed) copy of the WSDL like the real server.
+            out.append('<%s>%s</%s>' % (name, escape(value), name))
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _decode(node):
+    """Decode a SOAP encoded request element into python values.
+    Structures become dicts (with their ``xsi:type`` as ``__type__``),
+    arrays become lists.
+    """
+    xtype = node.get('{%s}type' % _ns_xsi) or ''
+    xtype = xtype.split(':')[-1]
+    if node.get('{%s}nil' % _ns_xsi) in ('true', '1'):
+        return None
+    children = list(node)
+    if (node.get('{%s}arrayType' % _ns_enc) is not None
+            or xtype.startswith('ArrayOf')):
+        return [_decode(c) for c in children]
+    if children:
+        value = dict((_local(c.tag), _decode(c)) for c in children)
+        if xtype:
+            value['__type__'] = xtype
+        return value
+    text = node.text or ''
+    if xtype in ('int', 'long', 'short'):
+        return text and int(text) or 0
+    if xtype in ('double', 'float', 'decimal'):
+        return text and float(text) or 0.0
+    if xtype == 'boolean':
+        return text.strip() in ('true', '1')
+    return text
+
+
+class _StubProject(object):
+    """Data for one project (database) served by the stub server.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.tables = dict((t, {}) for t in _tables)  ## table -> {recordid: record}
+        self.numbers = dict((t, {}) for t in _tables) ## table -> {number: recordid}
+        self.next_number = dict((t, 1) for t in _tables)
+        self.next_recordid = 1
+        self.locks = {}     ## (table, recordid) -> (cookie, expires)
+        self.filters = {}   ## name -> (table, predicate)
+        self.deleted = dict((t, set()) for t in _tables)
+
+    def add(self, table, record, modified=None):
+        recordid = self.next_recordid
+        self.next_recordid += 1
+        number = self.next_number[table]
+        self.next_number[table] += 1
+        record = dict(record)
+        record['recordid'] = recordid
+        record[_tables[table][1]] = number
+        if modified is None:
+            modified = time.time()
+        record['__modified__'] = modified
+        day = datetime.date.fromtimestamp(modified).isoformat()
+        record.setdefault('dateentered', day)
+        record.setdefault('datecreated', day)
+        record['datemodified'] = day
+        self.tables[table][recordid] = record
+        self.numbers[table][number] = recordid
+        return number
+
+    def touch(self, record, user=None):
+        now = time.time()
+        record['__modified__'] = now
+        record['datemodified'] = datetime.date.fromtimestamp(now).isoformat()
+        if user:
+            record['modifiedbyuser'] = user
+
+
+class _StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        logging.debug("stub server: " + format, *args)
+
+    def _reply(self, status, body, content_type='text/xml; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        ## compress like a web server in front of the CGI would
+        accepted = [e.split(';')[0].strip() for e in
+                    (self.headers.getheader('accept-encoding') or '').split(',')]
+        if 'gzip' in accepted:
+            encoder = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = encoder.compress(body) + encoder.flush()
+            self.send_header('Content-Encoding', 'gzip')
+        elif 'deflate' in accepted:
+            body = zlib.compress(body, 6)
+            self.send_header('Content-Encoding', 'deflate')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stub._count_bytes(0, len(body))
+
+    def do_GET(self):
+        if not self.path.split('?')[0].endswith('ttsoapcgi.wsdl'):
+            return self._reply(404, 'Not Found', 'text/plain')
+        self.server.stub._count_call('GET ttsoapcgi.wsdl')
+        self._reply(200, self.server.stub.wsdl)
+
+    def do_POST(self):
+        if not self.path.split('?')[0].endswith('ttsoapcgi.exe'):
+            return self._reply(404, 'Not Found', 'text/plain')
+        length = int(self.headers.getheader('content-length') or 0)
+        body = self.rfile.read(length)
+        self.server.stub._count_bytes(length, 0)
+        encoding = (self.headers.getheader('content-encoding') or '').lower()
+        if encoding in ('gzip', 'x-gzip'):
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        status, response = self.server.stub.dispatch(body)
+        self._reply(status, response)
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        ## clients which timed out hung up before the reply, not an error
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class TTPStubServer(object):
+    """Stand-in TestTrack SOAP server.
+
+    :param str host: Interface to listen on.
+    :param int port: Port to listen on. The default of ``0`` picks a free port.
+    :param float latency: Seconds of artificial latency added to every SOAP
+                    call, to simulate a remote server.
+    :param dict method_latency: Per-method latency overrides, keyed by SOAP
+                    method name, like ``{'getDefect': 0.12}``.
+    :param float slow_calls: Share of the SOAP calls which take
+                    ``slow_latency`` seconds instead, like the latency tail
+                    of the real CGI.
+    :param float slow_latency: Seconds of latency of the slow calls.
+    :param float lock_timeout: Seconds before an abandoned edit lock expires.
+                    The real server uses 15 minutes.
+    :param list projects: Names of the projects (databases) to serve.
+    :param dict users: Optional ``{username: password}`` mapping. When not
+                    supplied any username and password are accepted.
+
+    The server can be used as a context, in which case it is started on enter
+    and stopped on exit.
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0,
+                 method_latency=None, lock_timeout=900.0,
+                 projects=('Stub Project',), users=None, slow_calls=0.0,
+                 slow_latency=0.0):
+        self.latency = latency
+        self.method_latency = dict(method_latency or {})
+        self.slow_calls = slow_calls
+        self.slow_latency = slow_latency
+        self.lock_timeout = lock_timeout
+        self.users = users
+        self._lock = threading.RLock()
+        self._projects = {}
+        for name in projects:
+            self._projects[name] = _StubProject(name)
+        self._default_project = projects[0]
+        self._sessions = {}  ## cookie -> (project name, username)
+        self._next_cookie = 1000
+        self.calls = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        with open(_wsdl_path) as wsdl:
+            self._wsdl_template = wsdl.read()
+        self.schema = _Schema(self._wsdl_template)
+        self._httpd = _ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self._httpd.stub = self
+        self._thread = None
+        self.wsdl = self._wsdl_template.replace(
+            'http://127.0.0.1:80/ttsoapcgi.exe', self.url + 'ttsoapcgi.exe')
+
+    @property
+    def url(self):
+        """Base URL of the server, suitable for passing to
+        :py:class:`testtrackpro.TTP`.
+        """
+        host, port = self._httpd.server_address[:2]
+        return 'http://%s:%d/' % (host, port)
+
+    def start(self):
+        """Start serving requests on a background daemon thread.
+        """
+        if self._thread:
+            return self
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name='TTPStubServer')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving requests and close the listening socket.
+        """
+        if not self._thread:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset_counters(self):
+        """Reset the :py:attr:`calls` and byte counters.
+        """
+        with self._lock:
+            self.calls = {}
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def _count_call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _count_bytes(self, received, sent):
+        with self._lock:
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+    ## Data management
+
+    def project(self, name=None):
+        return self._projects[name or self._default_project]
+
+    def populate(self, defects=0, testcases=0, requirements=0, testruns=0,
+                 project=None, seed=0):
+        """Fill a project with generated, but deterministic, records.
+
+        :param int defects: Number of defects to add.
+        :param int testcases: Number of test cases to add.
+        :param int requirements: Number of requirements to add.
+        :param int testruns: Number of test runs to add. Each is linked to a
+                        test case when there are any.
+        :param str project: Project to populate, defaults to the first one.
+        :param int seed: Random seed used to generate field values.
+        """
+        rnd = random.Random(seed)
+        proj = self.project(project)
+        with self._lock:
+            for table, count in (('TestCase', testcases),
+                                 ('Requirement', requirements),
+                                 ('TestRun', testruns),
+                                 ('Defect', defects)):
+                for i in xrange(count):
+                    record = self._generate(rnd, proj, table)
+                    number = proj.add(
+                        table, record,
+                        modified=time.time() - rnd.randint(0, 86400*90))
+                    if table == 'TestRun' and 'testcasenumber' in record:
+                        recordid = proj.numbers[table][number]
+                        tc = proj.tables['TestCase'][
+                            record['linkedrecords'][0]['recordid']]
+                        tc['linkedrecords'].append({
+                            'table': 'TestRun', 'recordid': recordid,
+                            'linktype': 'Test Run'})
+
+    def _generate(self, rnd, proj, table):
+        def choice(field):
+            return rnd.choice(_dropdowns[field])
+        def day():
+            return (_epoch + datetime.timedelta(rnd.randint(0, 365))).isoformat()
+        user = rnd.choice(_users)
+        summary = ' '.join(rnd.sample(_words, 5)).capitalize()
+        record = {
+            'summary': summary,
+            'description': summary + '. ' + ' '.join(rnd.sample(_words, 12)),
+            'status': choice('status'),
+            'type': choice('type'),
+            'priority': choice('priority'),
+            'product': choice('product'),
+            'component': choice('component'),
+            'assignedto': rnd.choice(_users),
+            'enteredby': user,
+            'createdbyuser': user,
+            'modifiedbyuser': user,
+            'dateentered': day(),
+            'datecreated': day(),
+            'eventlist': [
+                {'recordid': i, 'name': name, 'user': rnd.choice(_users),
+                 'date': day(), 'notes': ' '.join(rnd.sample(_words, 6)),
+                 'resultingstate': 'Open', 'assigntolist': [rnd.choice(_users)]}
+                for i, name in enumerate(['Assign', 'Estimate', 'Comment'][
+                    :rnd.randint(0, 3)])],
+            'linkedrecords': [],
+            'customFieldvalues': [
+                {'__type__': 'CStringField', 'name': 'Build', 'recordid': 0,
+                 'value': '1.%d.%d' % (rnd.randint(0, 9), rnd.randint(0, 999))},
+                {'__type__': 'CIntegerField', 'name': 'Votes', 'recordid': 0,
+                 'value': rnd.randint(0, 50)},
+                {'__type__': 'CBooleanField', 'name': 'Regression',
+                 'recordid': 0, 'value': rnd.random() < 0.2},
+                {'__type__': 'CDropdownField', 'name': 'Platform',
+                 'recordid': 0, 'value': rnd.choice(['Windows', 'Linux', 'Mac'])},
+            ],
+        }
+        if table == 'Defect':
+            record.update({
+                'state': 'Open', 'disposition': '', 'reference': '',
+                'severity': choice('severity'), 'actualhourstofix': 0.0,
+                'reportedbylist': [{
+                    'recordid': 0, 'foundby': user, 'datefound': day(),
+                    'foundinversion': '1.%d' % rnd.randint(0, 9),
+                    'comments': record['description']}],
+                'attachmentlist': [],
+            })
+            if proj.tables['TestCase']:
+                tc = rnd.choice(list(proj.tables['TestCase']))
+                record['linkedrecords'].append(
+                    {'table': 'TestCase', 'recordid': tc, 'linktype': 'Parent'})
+        elif table == 'TestCase':
+            record.update({
+                'steps': '1. ' + ' '.join(rnd.sample(_words, 4)),
+                'expectedresults': ' '.join(rnd.sample(_words, 4)),
+            })
+        elif table == 'TestRun':
+            record['testrunset'] = 'Release 1.%d' % rnd.randint(0, 5)
+            if proj.numbers['TestCase']:
+                number = rnd.choice(list(proj.numbers['TestCase']))
+                record['testcasenumber'] = number
+                tc = proj.tables['TestCase'][proj.numbers['TestCase'][number]]
+                record['linkedrecords'].append({
+                    'table': 'TestCase', 'recordid': tc['recordid'],
+                    'linktype': 'Test Case'})
+        return record
+
+    def add_record(self, table, project=None, **fields):
+        """Add a record, returning its number.
+        """
+        with self._lock:
+            return self.project(project).add(table, fields)
+
+    def modify_record(self, table, number, project=None, **fields):
+        """Change fields on a record as if another user saved it.
+        """
+        proj = self.project(project)
+        with self._lock:
+            record = proj.tables[table][proj.numbers[table][number]]
+            record.update(fields)
+            proj.touch(record)
+
+    def delete_record(self, table, number, project=None):
+        """Delete a record as if another user deleted it.
+        """
+        proj = self.project(project)
+        with self._lock:
+            recordid = proj.numbers[table].pop(number)
+            del proj.tables[table][recordid]
+            proj.deleted[table].add(recordid)
+
+    def get_record(self, table, number, project=None):
+        """Return a copy of the stored record data.
+        """
+        proj = self.project(project)
+        with self._lock:
+            return dict(proj.tables[table][proj.numbers[table][number]])
+
+    def add_filter(self, name, table, predicate, project=None):
+        """Define a server side filter usable with ``getRecordListForTable``.
+
+        :param str name: Filter name.
+        :param str table: Table name the filter applies to, like ``'Defect'``.
+        :param callable predicate: Called with each record dict, returns
+                        ``True`` for records which pass the filter.
+        """
+        with self._lock:
+            self.project(project).filters[name] = (
+                self._table(table), predicate)
+
+    ## SOAP dispatch
+
+    def dispatch(self, body):
+        """Handle one SOAP request body, returning ``(status, response)``.
+        """
+        try:
+            root = etree.fromstring(body)
+            call = root.find('{%s}Body' % _ns_env)[0]
+        except Exception, e:
+            return 500, self._fault(_StubFault(
+                "Malformed request: %s" % e, faultcode='SOAP-ENV:Client'))
+        method_name = _local(call.tag)
+        self._count_call(method_name)
+        delay = self.method_latency.get(method_name, self.latency)
+        if self.slow_calls and random.random() < self.slow_calls:
+            delay = self.slow_latency
+        if delay:
+            time.sleep(delay)
+        args = dict((_local(c.tag), _decode(c)) for c in call)
+        handler = getattr(self, '_op_' + method_name, None)
+        if handler is None:
+            for prefix in ('getByRecordID', 'get', 'editByRecordID', 'edit',
+                           'save', 'cancelSave', 'add', 'delete'):
+                table = self._table_from_method(method_name, prefix)
+                if table:
+                    handler = getattr(self, '_op_' + prefix)
+                    args['__table__'] = table
+                    break
+        if handler is None:
+            return 500, self._fault(_StubFault(
+                "Method '%s' not implemented" % method_name))
+        try:
+            with self._lock:
+                result = handler(**args)
+        except _StubFault, e:
+            return 500, self._fault(e)
+        part, typ = self.schema.response_part(method_name)
+        out = [_envelope_head, '<ns1:%sResponse>' % method_name]
+        self.schema.encode(out, part, typ, result)
+        out.append('</ns1:%sResponse>' % method_name)
+        out.append(_envelope_tail)
+        return 200, ''.join(out).encode('utf-8')
+
+    def _table_from_method(self, method_name, prefix):
+        if prefix.endswith('ByRecordID'):
+            if not method_name.endswith('ByRecordID'):
+                return None
+            method_name = method_name[:-10]
+            prefix = prefix[:-10]
+        elif method_name.endswith('ByRecordID'):
+            return None
+        if not method_name.startswith(prefix):
+            return None
+        table = method_name[len(prefix):]
+        if table in _tables:
+            return table
+        return None
+
+    def _fault(self, fault):
+        detail = ''
+        if fault.detail is not None:
+            detail = '<detail>%s</detail>' % escape(fault.detail)
+        return (_envelope_head +
+                '<SOAP-ENV:Fault><faultcode>%s</faultcode>'
+                '<faultstring>%s</faultstring>%s</SOAP-ENV:Fault>' % (
+                    fault.faultcode, escape(fault.faultstring), detail) +
+                _envelope_tail).encode('utf-8')
+
+    def _table(self, name):
+        name = (name or '').replace(' ', '')
+        if name not in _tables:
+            raise _StubFault("Invalid table name: %s" % name)
+        return name
+
+    def _session(self, cookie):
+        try:
+            project, user = self._sessions[int(cookie or 0)]
+        except KeyError:
+            raise _StubFault('Session Dropped.')
+        return self._projects[project], user
+
+    def _logon(self, database, username, password):
+        if database not in self._projects:
+            raise _StubFault("Project not found: %s" % database)
+        if self.users is not None and self.users.get(username) != password:
+            raise _StubFault("Invalid username or password.")
+        cookie = self._next_cookie
+        self._next_cookie += 1
+        self._sessions[cookie] = (database, username)
+        return cookie
+
+    def _op_DatabaseLogon(self, dbname=None, username=None, password=None,
+                          **kwdargs):
+        return self._logon(dbname, username, password)
+
+    def _op_ProjectLogon(self, pProj=None, username=None, password=None,
+                         **kwdargs):
+        database = ((pProj or {}).get('database') or {}).get('name')
+        return self._logon(database, username, password)
+
+    def _op_DatabaseLogoff(self, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        cookie = int(cookie)
+        for key, (owner, expires) in proj.locks.items():
+            if owner == cookie:
+                del proj.locks[key]
+        del self._sessions[cookie]
+        return 0
+
+    def _op_getProjectList(self, username=None, password=None, **kwdargs):
+        if self.users is not None and self.users.get(username) != password:
+            raise _StubFault("Invalid username or password.")
+        return [{'database': {'name': name},
+                 'options': [{'name': 'TestTrack Pro'},
+                             {'name': 'TestTrack TCM'},
+                             {'name': 'TestTrack RM'}]}
+                for name in sorted(self._projects)]
+
+    def _op_getTableList(self, cookie=None, **kwdargs):
+        self._session(cookie)
+        return [{'name': display, 'id': i}
+                for i, (display, num) in enumerate(sorted(_tables.values()))]
+
+    def _op_getColumnsForTable(self, cookie=None, tablename=None, **kwdargs):
+        self._session(cookie)
+        self._table(tablename)
+        return [{'name': name, 'type': typ, 'required': required}
+                for name, field, typ, required in _columns]
+
+    def _op_getFilterList(self, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        return [{'name': name, 'table': _tables[table][0], 'comment': ''}
+                for name, (table, predicate) in sorted(proj.filters.items())]
+
+    def _op_getDropdownFieldValuesForTable(self, cookie=None, tablename=None,
+                                           fieldname=None, **kwdargs):
+        self._session(cookie)
+        self._table(tablename)
+        field = self._column_field(fieldname)
+        if field not in _dropdowns:
+            raise _StubFault("Not a dropdown field: %s" % fieldname)
+        return list(_dropdowns[field])
+
+    def _column_field(self, name):
+        for column, field, typ, required in _columns:
+            if column == name:
+                return field
+        return (name or '').replace(' ', '').lower()
+
+    def _op_getRecordListForTable(self, cookie=None, tablename=None,
+                                  filtername=None, columnlist=None, **kwdargs):
+        proj, user = self._session(cookie)
+        table = self._table(tablename)
+        predicate = None
+        if filtername:
+            if filtername not in proj.filters:
+                raise _StubFault("Invalid filter name: %s" % filtername)
+            ftable, predicate = proj.filters[filtername]
+            if ftable != table:
+                raise _StubFault("Filter %s is not for table %s" % (
+                    filtername, tablename))
+        columns = [c['name'] for c in columnlist or []] or ['Number', 'Summary']
+        number_field = _tables[table][1]
+        records = []
+        for recordid in sorted(proj.tables[table]):
+            record = proj.tables[table][recordid]
+            if predicate and not predicate(record):
+                continue
+            row = []
+            for column in columns:
+                if column == 'Number':
+                    value = record[number_field]
+                elif column == 'Date Modified':
+                    value = time.strftime(
+                        '%Y-%m-%d %H:%M:%S',
+                        time.localtime(record['__modified__']))
+                else:
+                    value = record.get(self._column_field(column))
+                if value is None:
+                    value = ''
+                row.append({'value': unicode(value)})
+            records.append({'recordid': recordid, 'row': row})
+        return {'columnlist': [{'name': c, 'type': None, 'required': None}
+                               for c in columns],
+                'records': records}
+
+    def _record(self, proj, table, number=None, recordid=None):
+        if recordid is None:
+            recordid = proj.numbers[table].get(int(number or 0))
+        record = proj.tables[table].get(int(recordid or 0))
+        if record is None:
+            raise _StubFault("%s not found." % _tables[table][0])
+        return record
+
+    def _entity(self, record):
+        return dict((k, v) for k, v in record.iteritems()
+                    if not k.startswith('__'))
+
+    def _lock_record(self, proj, table, record, cookie):
+        key = (table, record['recordid'])
+        owner = proj.locks.get(key)
+        now = time.time()
+        if owner and owner[0] != cookie and owner[1] > now:
+            raise _StubFault(
+                "The %s is locked by another user." % _tables[table][0],
+                detail=EDIT_LOCK_ERROR)
+        proj.locks[key] = (cookie, now + self.lock_timeout)
+
+    def _unlock_record(self, proj, table, recordid, cookie):
+        key = (table, int(recordid or 0))
+        owner = proj.locks.get(key)
+        if not owner or owner[0] != cookie or owner[1] <= time.time():
+            proj.locks.pop(key, None)
+            raise _StubFault("The %s is not locked for edit by this session." %
+                             _tables[table][0])
+        del proj.locks[key]
+
+    def _number_arg(self, table, kwdargs):
+        for key, value in kwdargs.iteritems():
+            if key.endswith('Number'):
+                return value
+        return None
+
+    def _entity_arg(self, table, kwdargs):
+        return kwdargs.get('p' + table) or {}
+
+    def _op_get(self, __table__, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        return self._entity(self._record(
+            proj, __table__, self._number_arg(__table__, kwdargs)))
+
+    def _op_getByRecordID(self, __table__, cookie=None, recordID=None,
+                          **kwdargs):
+        proj, user = self._session(cookie)
+        return self._entity(self._record(proj, __table__, recordid=recordID))
+
+    def _op_edit(self, __table__, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        record = self._record(proj, __table__,
+                              self._number_arg(__table__, kwdargs))
+        self._lock_record(proj, __table__, record, int(cookie))
+        return self._entity(record)
+
+    def _op_editByRecordID(self, __table__, cookie=None, recordID=None,
+                           **kwdargs):
+        proj, user = self._session(cookie)
+        record = self._record(proj, __table__, recordid=recordID)
+        self._lock_record(proj, __table__, record, int(cookie))
+        return self._entity(record)
+
+    def _op_save(self, __table__, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        entity = self._entity_arg(__table__, kwdargs)
+        record = self._record(proj, __table__, recordid=entity.get('recordid'))
+        self._unlock_record(proj, __table__, record['recordid'], int(cookie))
+        number_field = _tables[__table__][1]
+        for key, value in entity.iteritems():
+            if key.startswith('__') or key in ('recordid', number_field):
+                continue
+            record[key] = value
+        proj.touch(record, user)
+        return 0
+
+    def _op_cancelSave(self, __table__, cookie=None, recordID=None,
+                       **kwdargs):
+        proj, user = self._session(cookie)
+        self._unlock_record(proj, __table__, recordID, int(cookie))
+        return 0
+
+    def _op_add(self, __table__, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        entity = self._entity_arg(__table__, kwdargs)
+        if not entity.get('summary'):
+            raise _StubFault("Summary is a required field.")
+        entity = dict((k, v) for k, v in entity.iteritems()
+                      if not k.startswith('__') and v is not None)
+        entity.pop('recordid', None)
+        entity.setdefault('enteredby', user)
+        entity.setdefault('createdbyuser', user)
+        entity['modifiedbyuser'] = user
+        return proj.add(__table__, entity)
+
+    def _op_delete(self, __table__, cookie=None, **kwdargs):
+        proj, user = self._session(cookie)
+        record = self._record(proj, __table__,
+                              self._number_arg(__table__, kwdargs))
+        key = (__table__, record['recordid'])
+        owner = proj.locks.get(key)
+        if owner and owner[0] != int(cookie) and owner[1] > time.time():
+            raise _StubFault(
+                "The %s is locked by another user." % _tables[__table__][0],
+                detail=EDIT_LOCK_ERROR)
+        del proj.tables[__table__][record['recordid']]
+        del proj.numbers[__table__][record[_tables[__table__][1]]]
+        proj.deleted[__table__].add(record['recordid'])
+        return 0
@@ -0,0 +1,409 @@
+"""Transports for the TestTrack SOAP client.
+
+Wrappers around the `suds`_ HTTP transport which can be handed to
+:py:class:`testtrackpro.TTP` with the ``transport`` argument.
+
+Record and Replay
+-----------------
+
+:py:class:`TTPRecordingTransport` captures every WSDL download and SOAP
+exchange, along with how long each one took, into a compact gzip compressed
+archive. :py:class:`TTPReplayTransport` serves the recorded responses back
+without any network access, either as fast as possible or with the recorded
+timings. This makes it possible to capture real traffic from a production
+server once, and then profile the encode and decode paths, or track
+performance regressions, offline and reproducibly.
+
+.. code:: python
+
+    import testtrackpro
+    from testtrackpro.transport import (TTPRecordingTransport,
+                                        TTPReplayTransport)
+
+    ## capture
+    with TTPRecordingTransport('session.ttr.gz') as transport:
+        with testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                              'password', transport=transport) as ttp:
+            run_report(ttp)
+
+    ## replay, no server needed
+    transport = TTPReplayTransport('session.ttr.gz')
+    with testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                          'password', transport=transport) as ttp:
+        run_report(ttp)
+
+Requests are matched on the URL, SOAP action and request body, so the replayed
+client code must make the same calls as the recorded one. Identical requests
+are answered in the order they were recorded.
+
+Compression
+-----------
+
+SOAP envelopes are verbose XML, which compresses to a fraction of its size.
+:py:class:`TTPCompressionTransport` asks the server for ``gzip`` or
+``deflate`` encoded responses and decompresses them as they arrive, and can
+also gzip large ``save`` and ``add`` requests. Its :py:meth:`stats
+<TTPCompressionTransport.stats>` count the bytes on the wire and the decoded
+bytes, to see what it saves.
+
+.. code:: python
+
+    with testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                          'password', compression=True) as ttp:
+        run_report(ttp)
+        print ttp.compression.stats()
+
+Only enable ``compress_requests`` for servers known to accept compressed
+request bodies; many CGI setups do not.
+
+.. _suds: https://fedorahosted.org/suds/
+"""
+import StringIO
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib2
+import zlib
+
+import suds.transport
+import suds.transport.https
+
+_archive_format = 'testtrackpro-replay'
+_archive_version = 1
+
+
+def _request_key(kind, url, headers, message):
+    action = ''
+    if headers:
+        action = headers.get('SOAPAction', '')
+    digest = hashlib.sha1()
+    for part in (kind, url, action, message or ''):
+        if isinstance(part, unicode):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update('\0')
+    return digest.hexdigest()
+
+def _bytes_to_text(data):
+    ## latin-1 maps every byte to a code point, so this is lossless
+    if data is None:
+        return None
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    return data.decode('latin-1')
+
+def _text_to_bytes(text):
+    if text is None:
+        return None
+    return text.encode('latin-1')
+
+
+class TTPRecordingTransport(suds.transport.Transport):
+    """Transport which records all traffic through another transport.
+
+    :param str path: Archive file to write. It is gzip compressed JSON lines.
+    :param transport: `suds`_ transport to record. Defaults to the same
+                    ``HttpAuthenticated`` transport suds uses.
+
+    The archive is written as the traffic happens, and must be closed with
+    :py:meth:`close` or by using the transport as a context.
+    """
+    def __init__(self, path, transport=None):
+        suds.transport.Transport.__init__(self)
+        if transport is None:
+            transport = suds.transport.https.HttpAuthenticated()
+        self.transport = transport
+        ## share options so client options (timeout, proxy) reach the
+        ## wrapped transport.
+        self.options = transport.options
+        self._lock = threading.Lock()
+        self._archive = gzip.open(path, 'wb')
+        self._write({'format': _archive_format, 'version': _archive_version})
+
+    def _write(self, entry):
+        with self._lock:
+            self._archive.write(json.dumps(entry, separators=(',', ':')))
+            self._archive.write('\n')
+
+    def _record(self, kind, request, code, headers, body, elapsed):
+        self._write({
+            'kind': kind,
+            'key': _request_key(kind, request.url, request.headers,
+                                request.message),
+            'url': request.url,
+            'request': _bytes_to_text(request.message),
+            'code': code,
+            'headers': dict(headers or {}),
+            'response': _bytes_to_text(body),
+            'elapsed': elapsed,
+        })
+
+    def open(self, request):
+        start = time.time()
+        try:
+            fp = self.transport.open(request)
+        except suds.transport.TransportError, e:
+            body = e.fp and e.fp.read() or ''
+            self._record('open', request, e.httpcode, {}, body,
+                         time.time() - start)
+            raise suds.transport.TransportError(
+                e.args[0], e.httpcode, StringIO.StringIO(body))
+        body = fp.read()
+        self._record('open', request, 200, {}, body, time.time() - start)
+        return StringIO.StringIO(body)
+
+    def send(self, request):
+        start = time.time()
+        try:
+            reply = self.transport.send(request)
+        except suds.transport.TransportError, e:
+            body = e.fp and e.fp.read() or ''
+            self._record('send', request, e.httpcode, {}, body,
+                         time.time() - start)
+            raise suds.transport.TransportError(
+                e.args[0], e.httpcode, StringIO.StringIO(body))
+        elapsed = time.time() - start
+        if reply is None:
+            self._record('send', request, 202, {}, None, elapsed)
+        else:
+            self._record('send', request, reply.code, reply.headers,
+                         reply.message, elapsed)
+        return reply
+
+    def close(self):
+        """Flush and close the archive.
+        """
+        with self._lock:
+            if self._archive:
+                self._archive.close()
+                self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TTPReplayTransport(suds.transport.Transport):
+    """Transport which answers requests from a recorded archive.
+
+    :param str path: Archive written by :py:class:`TTPRecordingTransport`.
+    :param bool realtime: Sleep for the recorded duration of each exchange.
+                    The default is to answer immediately (zero latency).
+    :param bool strict: Raise an error when a request has already been
+                    answered as many times as it was recorded. When ``False``
+                    the last recorded response is repeated.
+
+    Unknown requests raise a ``suds.transport.TransportError`` with a 599
+    HTTP code. The URL of the first recorded WSDL download is available as
+    ``wsdl_url``, for constructing the replaying client.
+    """
+    def __init__(self, path, realtime=False, strict=False):
+        suds.transport.Transport.__init__(self)
+        self.realtime = realtime
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.recorded_elapsed = 0.0
+        self.replayed = 0
+        self.wsdl_url = None
+        archive = gzip.open(path, 'rb')
+        try:
+            header = json.loads(archive.readline())
+            if (header.get('format') != _archive_format or
+                    header.get('version') != _archive_version):
+                raise ValueError("%s is not a replay archive." % path)
+            for line in archive:
+                entry = json.loads(line)
+                if self.wsdl_url is None and entry['kind'] == 'open':
+                    self.wsdl_url = entry['url']
+                self._entries.setdefault(entry['key'], []).append(entry)
+                self.recorded_elapsed += entry['elapsed']
+        finally:
+            archive.close()
+
+    def _lookup(self, kind, request):
+        key = _request_key(kind, request.url, request.headers, request.message)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise suds.transport.TransportError(
+                    "No recorded response for %s to %s" % (kind, request.url),
+                    599, StringIO.StringIO(''))
+            if len(entries) > 1:
+                entry = entries.pop(0)
+            elif self.strict:
+                entry = entries.pop(0)
+            else:
+                entry = entries[0]
+            self.replayed += 1
+        if self.realtime:
+            time.sleep(entry['elapsed'])
+        body = _text_to_bytes(entry['response'])
+        if entry['code'] not in (200, 202, 204):
+            raise suds.transport.TransportError(
+                "Recorded HTTP error %d" % entry['code'], entry['code'],
+                StringIO.StringIO(body or ''))
+        return entry, body
+
+    def open(self, request):
+        entry, body = self._lookup('open', request)
+        return StringIO.StringIO(body)
+
+    def send(self, request):
+        entry, body = self._lookup('send', request)
+        if body is None:
+            return None
+        return suds.transport.Reply(
+            entry['code'], dict(entry['headers']), body)
+
+
+## the SOAP method of an rpc request, as TestTrack has no SOAP actions
+_soap_method_re = re.compile(r'<(?:[\w.-]+:)?Body[^>]*>\s*<(?:[\w.-]+:)?(\w+)')
+_chunk_size = 64 * 1024
+
+
+class TTPCompressionTransport(suds.transport.https.HttpAuthenticated):
+    """HTTP transport which negotiates compressed responses, and optionally
+    compresses large requests.
+
+    :param bool compress_requests: gzip the bodies of large requests to the
+                    methods in ``methods``. Off by default, as the server
+                    has to accept ``Content-Encoding: gzip`` requests.
+    :param int min_size: Smallest request body, in bytes, worth compressing.
+    :param tuple methods: Prefixes of the SOAP methods whose requests may be
+                    compressed.
+    :param kwdargs: `suds`_ ``HttpAuthenticated`` options, like ``timeout``.
+
+    Copies of the transport, made by `suds`_ when the client is cloned,
+    share the counters of :py:meth:`stats`.
+    """
+    def __init__(self, compress_requests=False, min_size=8192,
+                 methods=('save', 'add'), **kwdargs):
+        suds.transport.https.HttpAuthenticated.__init__(self, **kwdargs)
+        self.compress_requests = compress_requests
+        self.min_size = min_size
+        self.methods = tuple(methods)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys((
+            'requests', 'compressed_requests', 'bytes_sent',
+            'bytes_sent_decoded', 'responses', 'compressed_responses',
+            'bytes_received', 'bytes_received_decoded'), 0)
+
+    def __deepcopy__(self, memo={}):
+        clone = suds.transport.https.HttpAuthenticated.__deepcopy__(self, memo)
+        clone.compress_requests = self.compress_requests
+        clone.min_size = self.min_size
+        clone.methods = self.methods
+        clone._lock = self._lock
+        clone._counters = self._counters
+        return clone
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.iteritems():
+                self._counters[name] += value
+
+    def stats(self):
+        """Dict of the request and response counts, the ``bytes_sent`` and
+        ``bytes_received`` on the wire, and the ``bytes_sent_decoded`` and
+        ``bytes_received_decoded`` before compression and after
+        decompression.
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def _should_compress(self, message):
+        if not self.compress_requests or len(message) < self.min_size:
+            return False
+        match = _soap_method_re.search(message)
+        return bool(match and match.group(1).startswith(self.methods))
+
+    def _decode(self, fp, headers):
+        ## decompress the body as it is read, without holding on to the
+        ## compressed bytes
+        encoding = (headers.get('content-encoding') or '').strip().lower()
+        decoder = None
+        if encoding in ('gzip', 'x-gzip'):
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            decoder = True
+        chunks = []
+        received = 0
+        while True:
+            chunk = fp.read(_chunk_size)
+            if not chunk:
+                break
+            received += len(chunk)
+            if decoder is True:
+                ## 'deflate' is meant to be zlib wrapped, but some servers
+                ## send raw deflate data
+                if ord(chunk[0]) & 0x0f == 8:
+                    decoder = zlib.decompressobj()
+                else:
+                    decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)
+            chunks.append(chunk)
+        if decoder not in (None, True):
+            chunks.append(decoder.flush())
+        body = ''.join(chunks)
+        self._count(responses=1, compressed_responses=int(decoder is not None),
+                    bytes_received=received,
+                    bytes_received_decoded=len(body))
+        return body
+
+    def _error(self, e):
+        body = ''
+        if e.fp is not None:
+            body = self._decode(e.fp, e.hdrs or {})
+        return suds.transport.TransportError(
+            e.msg, e.code, StringIO.StringIO(body))
+
+    def open(self, request):
+        self.addcredentials(request)
+        u2request = urllib2.Request(request.url)
+        u2request.add_header('Accept-Encoding', 'gzip, deflate')
+        self.proxy = self.options.proxy
+        try:
+            fp = self.u2open(u2request)
+        except urllib2.HTTPError, e:
+            raise self._error(e)
+        return StringIO.StringIO(self._decode(fp, fp.headers))
+
+    def send(self, request):
+        self.addcredentials(request)
+        message = request.message
+        headers = dict(request.headers)
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        compressed = self._should_compress(message)
+        if compressed:
+            data = StringIO.StringIO()
+            archive = gzip.GzipFile(fileobj=data, mode='wb', compresslevel=6)
+            archive.write(message)
+            archive.close()
+            body = data.getvalue()
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            body = message
+        self._count(requests=1, compressed_requests=int(compressed),
+                    bytes_sent=len(body or ''),
+                    bytes_sent_decoded=len(message or ''))
+        u2request = urllib2.Request(request.url, body, headers)
+        self.addcookies(u2request)
+        self.proxy = self.options.proxy
+        try:
+            fp = self.u2open(u2request)
+        except urllib2.HTTPError, e:
+            if e.code in (202, 204):
+                return None
+            raise self._error(e)
+        self.getcookies(fp, u2request)
+        reply_headers = dict(fp.headers.dict)
+        reply_headers.pop('content-encoding', None)
+        return suds.transport.Reply(200, reply_headers,
+                                    self._decode(fp, fp.headers))
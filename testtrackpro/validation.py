@@ -0,0 +1,144 @@
+"""Check entities before they are sent.
+
+A ``saveDefect`` with a value which is not in a dropdown list costs an
+encode, a round trip and a server fault, and then a ``cancelSave`` and a
+retry. With ``TTP(..., validate=True)`` the client loads the columns of a
+table, and the allowed values of its dropdown columns, the first time an
+entity of that table is saved or added. Every ``save`` and ``add`` is then
+checked locally, and raises a :py:class:`~testtrackpro.TTPValidationError`
+without sending anything when a dropdown value is not allowed or a required
+field is empty.
+
+.. code:: python
+
+    with testtrackpro.TTP('http://hostname/', 'Project', 'username',
+                          'password', validate=True) as ttp:
+        try:
+            with ttp.editDefect(11) as defect:
+                defect.priority = 'Urgent'
+        except testtrackpro.TTPValidationError, e:
+            print e.problems    ## [('Priority', 'Urgent', '...')]
+
+Rules are kept per project and table. They are dropped when the client logs
+on, and reloaded after ``max_age`` seconds, so changes to the project
+configuration are picked up. Only fields which are record list columns, or
+custom fields with the name of one, are checked; the server still has the
+last word on everything else, like workflow rules.
+"""
+import threading
+import time
+
+import testtrackpro
+from testtrackpro.mirror import column_name
+
+_missing = object()
+
+
+class TTPValidator(object):
+    """Cached field rules and the checks made with them.
+
+    :param float max_age: Seconds the rules of a table are used before they
+                    are loaded again.
+
+    One validator can be shared by several clients, and is shared by a
+    client and its clones.
+    """
+    def __init__(self, max_age=3600.0):
+        self.max_age = max_age
+        self._rules = {}    ## (project, table) -> (loaded, rules)
+        self._loading = {}  ## (project, table) -> lock held while loading
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('checked', 'rejected', 'loads'), 0)
+
+    def refresh(self, project=None):
+        """Drop the rules of a project, or of all projects."""
+        with self._lock:
+            for key in self._rules.keys():
+                if project is None or key[0] == project:
+                    del self._rules[key]
+
+    def stats(self):
+        """Dict of the entities ``checked`` and ``rejected``, and the rule
+        ``loads``.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def rules(self, ttp, table):
+        """``(column, field, required, allowed)`` tuples for a table, where
+        ``allowed`` is the set of dropdown values, or ``None``.
+        """
+        key = (ttp._database_name, table)
+        with self._lock:
+            cached = self._rules.get(key)
+            if cached and time.time() - cached[0] < self.max_age:
+                return cached[1]
+            loading = self._loading.setdefault(key, threading.Lock())
+        ## loaded with the lock of the table held, so a table loads only
+        ## once, while the rules of other tables can still be used
+        with loading:
+            with self._lock:
+                cached = self._rules.get(key)
+            if cached and time.time() - cached[0] < self.max_age:
+                return cached[1]
+            rules = self._load(ttp, table)
+            with self._lock:
+                self._rules[key] = (time.time(), rules)
+                self._stats['loads'] += 1
+        return rules
+
+    def _load(self, ttp, table):
+        display = testtrackpro.table_display_name(table)
+        rules = []
+        for column in ttp.getColumnsForTable(display) or []:
+            allowed = None
+            if 'dropdown' in (column.type or '').lower():
+                try:
+                    allowed = frozenset(ttp.getDropdownFieldValuesForTable(
+                        display, column.name) or [])
+                except testtrackpro.TTPAPIError, e:
+                    ## no values to check against, leave it to the server
+                    if isinstance(e, testtrackpro.TTPConnectionError):
+                        raise
+            if allowed is not None or column.required:
+                rules.append((unicode(column.name), column_name(column.name),
+                              bool(column.required), allowed))
+        return rules
+
+    def check(self, ttp, table, entity):
+        """List of ``(column, value, message)`` problems of an entity."""
+        problems = []
+        custom = None
+        for column, field, required, allowed in self.rules(ttp, table):
+            value = getattr(entity, field, _missing)
+            if value is _missing:
+                if custom is None:
+                    custom = dict(
+                        (getattr(f, 'name', None), getattr(f, 'value', None))
+                        for f in getattr(entity, 'customFieldvalues', None)
+                        or [])
+                value = custom.get(column, _missing)
+                if value is _missing:
+                    continue
+            if value is None or value == '':
+                if required:
+                    problems.append((column, value,
+                                     "%s is a required field." % column))
+            elif (allowed is not None and isinstance(value, basestring) and
+                    value not in allowed):
+                problems.append((column, value,
+                                 "'%s' is not a valid %s." % (value, column)))
+        with self._lock:
+            self._stats['checked'] += 1
+            self._stats['rejected'] += bool(problems)
+        return problems
+
+    def validate(self, ttp, table, entity):
+        """Raise a :py:class:`~testtrackpro.TTPValidationError` if the entity
+        has problems.
+        """
+        problems = self.check(ttp, table, entity)
+        if problems:
+            raise testtrackpro.TTPValidationError(
+                ' '.join(message for column, value, message in problems),
+                problems)
@@ -0,0 +1,199 @@
+"""Merge updates to the same record into one edit.
+
+Event handlers which each update a field of the same record a few seconds
+apart take the edit lock, send the whole entity and release the lock once
+per handler. A :py:class:`TTPWriteBehind` queue collects the field updates
+instead. Updates to a record from any thread are merged, and a background
+thread applies them in a single ``edit<Table>ByRecordID`` and ``save<Table>``
+once the record's window is over.
+
+.. code:: python
+
+    queue = ttp.write_behind(window=2.0)
+
+    ## in any number of handlers, in any threads
+    queue.update('Defect', recordid, priority='Immediate')
+    queue.update('Defect', recordid, assignedto='Smith, Jan')
+
+    ## at shutdown, apply what is still waiting
+    queue.close()
+
+When two updates set the same field, the later one wins. Records which are
+locked by someone else are tried again after ``retry_delay`` seconds, with
+any updates which arrived in the meantime. Updates which fail for other
+reasons are dropped and reported in :py:attr:`TTPWriteBehind.errors` and to
+the ``on_error`` callback.
+
+Updates are only sent when their window is over, or on :py:meth:`flush
+<TTPWriteBehind.flush>` and :py:meth:`close <TTPWriteBehind.close>`, so
+updates still queued when the process dies are lost. Use it for updates
+which can be, like status notes from monitoring hooks.
+"""
+import heapq
+import logging
+import threading
+import time
+
+import testtrackpro
+
+
+class TTPWriteBehind(object):
+    """Queue of field updates, applied per record after a window.
+
+    :param ttp: Client to clone for the background thread.
+    :param float window: Seconds from the first queued update of a record to
+                    its edit.
+    :param int retries: Times a record locked by someone else is tried
+                    again before its updates are dropped.
+    :param float retry_delay: Seconds before trying a locked record again.
+    :param on_error: Optional ``on_error(table, recordid, fields, error)``
+                    callback for dropped updates.
+    """
+    def __init__(self, ttp, window=2.0, retries=5, retry_delay=1.0,
+                 on_error=None):
+        self.window = window
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_error = on_error
+        #: ``(table, recordid, fields, error)`` of dropped updates
+        self.errors = []
+        self._client = ttp.clone()
+        self._pending = {}  ## (table, recordid) -> [fields, due, attempts]
+        self._due = []      ## heap of (due, key)
+        self._applying = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = dict.fromkeys(('updates', 'merged', 'edits', 'retries',
+                                     'dropped'), 0)
+        self._thread = threading.Thread(target=self._run,
+                                        name='TTPWriteBehind')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def update(self, table, recordid, **fields):
+        """Queue new values for fields of a record, like
+        ``update('Defect', recordid, priority='Immediate')``.
+        """
+        key = (table, recordid)
+        with self._cond:
+            if self._closed:
+                raise testtrackpro.TTPAPIError("Write-behind queue is closed.")
+            self._stats['updates'] += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                due = time.time() + self.window
+                self._pending[key] = [dict(fields), due, 0]
+                heapq.heappush(self._due, (due, key))
+                self._cond.notify_all()
+            else:
+                self._stats['merged'] += 1
+                pending[0].update(fields)
+
+    def stats(self):
+        """Dict of the ``updates`` queued, the ones ``merged`` into an
+        already queued edit, the ``edits`` saved, lock ``retries`` and
+        ``dropped`` edits, and the records ``pending`` now.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+    def _apply(self, table, recordid, fields):
+        ## True when saved, False when locked by someone else
+        entity = getattr(self._client, 'edit%sByRecordID' % table)(
+            recordid, False, ignoreEditLockError=True)
+        if testtrackpro.edit_lock_failed(entity):
+            return False
+        with entity:
+            for name, value in fields.iteritems():
+                setattr(entity, name, value)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    while self._due and (
+                            self._due[0][1] not in self._pending or
+                            self._pending[self._due[0][1]][1] !=
+                            self._due[0][0]):
+                        ## superseded by a flush or retry
+                        heapq.heappop(self._due)
+                    if self._due and self._due[0][0] <= now:
+                        due, key = heapq.heappop(self._due)
+                        fields, due, attempts = self._pending.pop(key)
+                        self._applying += 1
+                        break
+                    if self._closed and not self._pending:
+                        return
+                    self._cond.wait(self._due and self._due[0][0] - now or
+                                    None)
+            table, recordid = key
+            error = None
+            try:
+                saved = self._apply(table, recordid, fields)
+            except testtrackpro.TTPConnectionError, e:
+                saved, error = False, e
+            except Exception, e:
+                saved, error = None, e
+            with self._cond:
+                self._applying -= 1
+                if saved:
+                    self._stats['edits'] += 1
+                elif saved is False and attempts < self.retries:
+                    self._stats['retries'] += 1
+                    ## later updates win over the ones being retried
+                    pending = self._pending.get(key)
+                    if pending is not None:
+                        fields.update(pending[0])
+                    due = time.time() + self.retry_delay
+                    if self._closed:
+                        due = time.time()
+                    self._pending[key] = [fields, due, attempts + 1]
+                    heapq.heappush(self._due, (due, key))
+                else:
+                    self._stats['dropped'] += 1
+                    if error is None:
+                        error = testtrackpro.TTPAPIError(
+                            "%s %s stayed locked by another user." % (
+                                table, recordid))
+                    self.errors.append((table, recordid, fields, error))
+                self._cond.notify_all()
+            if not saved and self.on_error and (
+                    saved is None or attempts >= self.retries):
+                try:
+                    self.on_error(table, recordid, fields, error)
+                except Exception, e:
+                    logging.warn(
+                        "Exception in write-behind error callback: %s", e)
+
+    def flush(self):
+        """Apply all queued updates now, and wait until they are done,
+        including the retries of locked records.
+        """
+        with self._cond:
+            now = time.time()
+            for key, pending in self._pending.iteritems():
+                if pending[1] > now:
+                    pending[1] = now
+                    heapq.heappush(self._due, (now, key))
+            self._cond.notify_all()
+            while self._pending or self._applying:
+                self._cond.wait(0.5)
+
+    def close(self):
+        """Apply the queued updates, retrying locked records at once, and
+        stop the background thread. No more updates can be queued.
+        """
+        with self._cond:
+            self._closed = True
+        self.flush()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()